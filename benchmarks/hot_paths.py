@@ -0,0 +1,311 @@
+"""Check the allocation and latency budgets of the control hot paths.
+
+Every hot path runs on synthetic data and is measured three ways:
+
+- blocks: memory blocks still allocated per call after ``--iterations``
+  calls (``tracemalloc``, at least ``MIN_BLOCK_CALLS``), anything above zero
+  is a leak or a growing cache. A fixed warm-up comes first, so the result
+  does not depend on the number of iterations.
+- peak_bytes: the largest memory in use above the baseline during a call,
+  it catches per-call buffers even when they are freed before returning.
+- p99_us: the 99th percentile latency, measured without tracing.
+
+The budgets are in ``hot_path_budgets.yaml`` next to this file, the exit
+status is 1 when one is exceeded. ``--report`` lists the call sites holding
+memory at the peak of a call, it is also shown for the failing paths.
+
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --report HighState.parse_data
+    python benchmarks/hot_paths.py --iterations 1000
+"""
+
+import argparse
+import gc
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.command import HighCmd  # noqa: E402
+from src.connections import Go1Mqtt  # noqa: E402
+from src.states import HighState  # noqa: E402
+from src.transport import LoopbackTransport  # noqa: E402
+from src.utils.common import gen_crc  # noqa: E402
+from src.utils.custom_types import Velocity  # noqa: E402
+
+BUDGETS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "hot_path_budgets.yaml"
+)
+# Decoded size of a Go1 camera stream.
+CAMERA_SHAPE = (800, 928, 3)
+_IGNORED_FILES = (tracemalloc.__file__, os.path.abspath(__file__))
+# Traced calls before counting the retained blocks, enough to replace the
+# content of the bounded queues and deques even when most stick commands
+# are coalesced and never complete.
+WARMUP_CALLS = 5000
+# Fewer calls would let a few in-flight objects look like a leak.
+MIN_BLOCK_CALLS = 2000
+
+
+class Measurement(NamedTuple):
+    blocks: float  # per call
+    peak_bytes: int
+    p50_us: float
+    p99_us: float
+
+
+def synthetic_frame() -> bytes:
+    frame = bytearray(random.getrandbits(8) for _ in range(1087))
+    frame[0:2] = bytes.fromhex("FEEF")
+    frame[885] = 1  # MotorModeHigh.FORCE_STAND
+    frame[890] = 1  # GaitType.TROT
+    frame[1083:1087] = gen_crc(frame[:1080])
+    return bytes(frame)
+
+
+###########################################
+# Hot paths, every one returns the function to call and a cleanup.
+def parse_data_case():
+    state = HighState()
+    frame = synthetic_frame()
+    return lambda: state.parse_data(frame), None
+
+
+def build_cmd_case():
+    cmd = HighCmd()
+    return cmd.build_cmd, None
+
+
+def send_cmd_vel_case():
+    # In-process broker, only the client side is measured.
+    transport = LoopbackTransport()
+    mqttc = Go1Mqtt("127.0.0.1", 0, 5, transport=transport)
+    mqttc.connected.wait(1.0)
+    cmd_vel = Velocity(0.1, 0.0, 0.2)
+
+    # The robot consumes the commands.
+    stop = threading.Event()
+
+    def consume() -> None:
+        while not stop.is_set():
+            try:
+                transport.robot.get_message(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+
+    def cleanup() -> None:
+        mqttc.disconnect()
+        stop.set()
+        consumer.join()
+        transport.close()
+
+    return lambda: mqttc.send_cmd_vel(cmd_vel), cleanup
+
+
+def camera_case():
+    import numpy as np
+
+    from src.camera import Go1Camera
+
+    # Only the frame hand-off, the capture thread needs a streaming Nano.
+    camera = Go1Camera.__new__(Go1Camera)
+    frame = np.zeros(CAMERA_SHAPE, dtype=np.uint8)
+    return lambda: camera._store_frame(frame), None
+
+
+CASES = {
+    "HighState.parse_data": parse_data_case,
+    "HighCmd.build_cmd": build_cmd_case,
+    "Go1Mqtt.send_cmd_vel": send_cmd_vel_case,
+    "Go1Camera.capture": camera_case,
+}
+
+
+###########################################
+# Measurements
+def _traced_files(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces(
+        [tracemalloc.Filter(False, name) for name in _IGNORED_FILES]
+    )
+
+
+def _latencies(func: Callable[[], None], iterations: int) -> List[float]:
+    perf_counter = time.perf_counter
+    latencies = [0.0] * iterations
+    for idx in range(iterations):
+        start = perf_counter()
+        func()
+        latencies[idx] = perf_counter() - start
+    return latencies
+
+
+def _retained_blocks(func: Callable[[], None], iterations: int) -> float:
+    # Replace the objects allocated before the tracing started, e.g. the
+    # content of bounded queues, so only new growth is counted.
+    for _ in range(WARMUP_CALLS):
+        func()
+    iterations = max(iterations, MIN_BLOCK_CALLS)
+    # The first filtering compiles and caches its patterns.
+    _traced_files(tracemalloc.take_snapshot())
+    gc.collect()
+    before = _traced_files(tracemalloc.take_snapshot())
+    for _ in range(iterations):
+        func()
+    gc.collect()
+    after = _traced_files(tracemalloc.take_snapshot())
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, "filename")
+    )
+    return max(blocks, 0) / iterations
+
+
+def peak_snapshot(func: Callable[[], None]):
+    """The memory held at the peak of one call, by line.
+
+    A profile hook follows the traced memory on every call and return
+    inside ``func`` and snapshots it whenever it reaches a new maximum.
+    """
+    gc.collect()
+    baseline = tracemalloc.take_snapshot()
+    peak = {"memory": tracemalloc.get_traced_memory()[0], "held": 0}
+    peak["snapshot"] = baseline
+
+    def profile(frame, event, arg) -> None:
+        # Without the memory of the last snapshot itself.
+        current = tracemalloc.get_traced_memory()[0] - peak["held"]
+        if current > peak["memory"]:
+            peak["memory"] = current
+            peak["snapshot"] = None
+            before = tracemalloc.get_traced_memory()[0]
+            peak["snapshot"] = tracemalloc.take_snapshot()
+            peak["held"] = tracemalloc.get_traced_memory()[0] - before
+
+    sys.setprofile(profile)
+    try:
+        func()
+    finally:
+        sys.setprofile(None)
+
+    stats = _traced_files(peak["snapshot"]).compare_to(
+        _traced_files(baseline), "lineno"
+    )
+    return [stat for stat in stats if stat.size_diff > 0]
+
+
+def _peak_bytes(func: Callable[[], None]) -> int:
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func()
+    return tracemalloc.get_traced_memory()[1] - start
+
+
+def measure(func: Callable[[], None], iterations: int) -> Measurement:
+    # Warm up the caches, queues and lazily created objects first.
+    _latencies(func, 1000)
+    latencies = _latencies(func, iterations)
+    quantiles = statistics.quantiles(latencies, n=100)
+
+    tracemalloc.start(10)
+    try:
+        blocks = _retained_blocks(func, iterations)
+        peak_bytes = max(_peak_bytes(func) for _ in range(5))
+    finally:
+        tracemalloc.stop()
+
+    return Measurement(
+        blocks, peak_bytes, quantiles[49] * 1e6, quantiles[98] * 1e6
+    )
+
+
+def report(func: Callable[[], None], top: int) -> None:
+    tracemalloc.start(10)
+    try:
+        func()
+        stats = peak_snapshot(func)
+    finally:
+        tracemalloc.stop()
+
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        name = os.path.relpath(frame.filename, ROOT)
+        print(
+            f"\t{stat.size_diff:>10} B {stat.count_diff:>6} blocks  "
+            f"{name}:{frame.lineno}"
+        )
+
+
+###########################################
+# Budgets
+def load_budgets(fn: str) -> Dict[str, Dict[str, float]]:
+    with open(fn, "r") as f_obj:
+        return yaml.safe_load(f_obj) or {}
+
+
+def check(name: str, result: Measurement, budget: Optional[dict]) -> bool:
+    failures = []
+    for key in ("blocks", "peak_bytes", "p99_us"):
+        limit = (budget or {}).get(key)
+        value = getattr(result, key)
+        if limit is not None and value > limit:
+            failures.append(f"{key} {value:.3g} > {limit}")
+
+    status = "FAIL" if failures else ("ok" if budget else "no budget")
+    print(
+        f"{name:<24}{result.blocks:10.3f} blocks{result.peak_bytes:10d} B"
+        f"{result.p50_us:10.1f} us p50{result.p99_us:10.1f} us p99"
+        f"  {status}"
+    )
+    for failure in failures:
+        print(f"\t{failure}")
+    return not failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=list(CASES))
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--budgets", default=BUDGETS)
+    parser.add_argument(
+        "--report", action="store_true", help="Show the allocating lines."
+    )
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    budgets = load_budgets(args.budgets)
+    passed = True
+    for name in args.paths:
+        try:
+            func, cleanup = CASES[name]()
+        except ImportError as err:
+            print(f"{name:<24}skipped: {err}")
+            continue
+
+        try:
+            result = measure(func, args.iterations)
+            ok = check(name, result, budgets.get(name))
+            if args.report or not ok:
+                report(func, args.top)
+        finally:
+            if cleanup is not None:
+                cleanup()
+        passed &= ok
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measure the import time of the package entry points.
+
+Every module is imported in a fresh interpreter with ``-X importtime``, the
+median over the runs is reported together with the slowest dependencies and
+the heavy optional packages (NumPy, OpenCV, IPython) that got loaded.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 src.states src.go1
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["src.states", "src.connections", "src.go1", "src.history"]
+HEAVY_MODULES = ["numpy", "cv2", "IPython"]
+
+
+def import_once(module: str) -> Tuple[Dict[str, int], List[str]]:
+    """Import a module in a new interpreter.
+
+    Returns the cumulative import time (us) of the direct dependencies of
+    ``module`` and of the module itself, and the heavy modules loaded.
+    """
+    check = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        # Nesting is shown by a 2 spaces indent per level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            cumulative[name.strip()] = int(cumulative_us)
+
+    heavy = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative, heavy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals = []
+        runs = []
+        for _ in range(args.runs):
+            cumulative, heavy = import_once(module)
+            totals.append(cumulative[module])
+            runs.append(cumulative)
+
+        print(
+            f"{module}: {statistics.median(totals) / 1000:.1f} ms "
+            f"(heavy: {', '.join(heavy) or 'none'})"
+        )
+        top_level = {
+            name: statistics.median(run.get(name, 0) for run in runs)
+            for name in runs[0]
+            if name != module
+        }
+        slowest = sorted(top_level.items(), key=lambda x: -x[1])
+        for name, cumulative_us in slowest[: args.top]:
+            print(f"\t{name:<32}{cumulative_us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
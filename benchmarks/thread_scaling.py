@@ -0,0 +1,197 @@
+"""Measure how state decoding and camera processing scale with threads.
+
+Every worker thread runs one workload for ``--duration`` seconds, with 1, 2,
+4... up to ``--threads`` workers:
+
+- states: ``HighState.parse_data`` on synthetic frames, one state per
+  thread like the Go1 and telemetry receivers.
+- camera: the hand-off copy of a camera frame and a grayscale thumbnail,
+  with OpenCV when it is installed, NumPy otherwise.
+- mixed: half the threads on each, the client with its cameras open.
+
+With the GIL the pure Python decoding does not scale, NumPy and OpenCV
+release it for the large copies. On a free-threaded build (3.13t)
+``--compare`` runs the benchmark twice, with ``-X gil=1`` and ``-X gil=0``.
+
+    python benchmarks/thread_scaling.py
+    python3.13t benchmarks/thread_scaling.py --compare --threads 8
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import sysconfig
+import threading
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.transport_throughput import make_frames  # noqa: E402
+from src.states import HighState  # noqa: E402
+
+# Decoded size of a Go1 camera stream.
+CAMERA_SHAPE = (800, 928, 3)
+WORKLOADS = ["states", "camera", "mixed"]
+
+
+def gil_enabled() -> bool:
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_enabled is None else is_enabled()
+
+
+###########################################
+# Workloads, every one returns the function of a worker thread.
+def states_worker() -> Callable[[], None]:
+    state = HighState()
+    frames = make_frames(16)
+    cycle = [0]
+
+    def work() -> None:
+        state.parse_data(frames[cycle[0] % len(frames)])
+        cycle[0] += 1
+
+    return work
+
+
+def camera_worker() -> Callable[[], None]:
+    frame = np.random.randint(0, 256, CAMERA_SHAPE, dtype=np.uint8)
+    try:
+        import cv2
+    except ImportError:
+        cv2 = None
+
+    def work() -> None:
+        latest = frame.copy()
+        if cv2 is not None:
+            gray = cv2.cvtColor(latest, cv2.COLOR_BGR2GRAY)
+            cv2.resize(gray, (232, 200), interpolation=cv2.INTER_AREA)
+        else:
+            thumbnail = latest[::4, ::4]
+            thumbnail.mean(axis=2, dtype=np.float32)
+
+    return work
+
+
+def make_workers(
+    workload: str, threads: int
+) -> Tuple[List[Callable[[], None]], int]:
+    """The workers, the states ones first, and the number of those."""
+    if workload == "states":
+        states = threads
+    elif workload == "camera":
+        states = 0
+    else:
+        # At least one of each.
+        states = max(threads // 2, 1)
+        threads = max(threads, 2)
+    workers = [states_worker() for _ in range(states)]
+    workers += [camera_worker() for _ in range(threads - states)]
+    return workers, states
+
+
+###########################################
+# Measurements
+def run(workers: List[Callable[[], None]], duration: float) -> List[int]:
+    """Run the workers together, returns the calls done by each."""
+    counts = [0] * len(workers)
+    start = threading.Barrier(len(workers) + 1)
+    stop = threading.Event()
+
+    def loop(idx: int, work: Callable[[], None]) -> None:
+        start.wait()
+        count = 0
+        while not stop.is_set():
+            work()
+            count += 1
+        counts[idx] = count
+
+    threads = [
+        threading.Thread(target=loop, args=(idx, work))
+        for idx, work in enumerate(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def thread_counts(max_threads: int, min_threads: int = 1) -> List[int]:
+    counts = []
+    threads = min_threads
+    while threads < max_threads:
+        counts.append(threads)
+        threads *= 2
+    return counts + [max(max_threads, min_threads)]
+
+
+def bench(workload: str, max_threads: int, duration: float) -> None:
+    print(f"{workload}")
+    base = None
+    min_threads = 2 if workload == "mixed" else 1
+    for threads in thread_counts(max_threads, min_threads):
+        workers, states = make_workers(workload, threads)
+        # Warm up the caches and lazily created objects.
+        for work in workers:
+            work()
+        counts = run(workers, duration)
+
+        # Speedup of the calls per second over the first run.
+        total = sum(counts) / duration
+        base = base or total
+        print(
+            f"\t{len(workers):3d} threads"
+            f"{sum(counts[:states]) / duration:12.0f} states/s"
+            f"{sum(counts[states:]) / duration:10.0f} frames/s"
+            f"{total / base:8.2f}x"
+        )
+
+
+def compare(args) -> None:
+    """Run the benchmark with and without the GIL in subprocesses."""
+    if not sysconfig.get_config_var("Py_GIL_DISABLED"):
+        sys.exit(
+            "--compare needs a free-threaded build (e.g. python3.13t), "
+            "run this script under both builds instead."
+        )
+    command = [os.path.abspath(__file__), *args.workloads]
+    command += ["--threads", str(args.threads)]
+    command += ["--duration", str(args.duration)]
+    for gil in ("1", "0"):
+        subprocess.run(
+            [sys.executable, "-X", f"gil={gil}", *command], check=True
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("workloads", nargs="*", default=WORKLOADS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--duration", type=float, default=1.0)
+    parser.add_argument(
+        "--compare", action="store_true", help="GIL and no-GIL runs."
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args)
+        return
+
+    gil = "enabled" if gil_enabled() else "disabled"
+    print(f"Python {sys.version.split()[0]}, GIL {gil}")
+    for workload in args.workloads:
+        if workload not in WORKLOADS:
+            parser.error(f"unknown workload {workload}.")
+        bench(workload, args.threads, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Measure the state and command throughput of the client without network.
+
+States are sent by the robot side of a local transport as fast as possible
+(or at ``--rate``) to a ``Go1UDP`` validating and parsing them, commands are
+``send_cmd_vel`` calls through ``Go1Mqtt`` until the robot side got them.
+The stick commands coalesce, so fewer are delivered than sent.
+
+    python benchmarks/transport_throughput.py
+    python benchmarks/transport_throughput.py --frames 50000 --rate 2000
+"""
+
+import argparse
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.connections import Go1Mqtt, Go1UDP  # noqa: E402
+from src.states import HighState  # noqa: E402
+from src.transport import create_transport  # noqa: E402
+from src.utils.common import gen_crc  # noqa: E402
+from src.utils.custom_types import Velocity  # noqa: E402
+from src.validator import FrameValidator  # noqa: E402
+
+LOCAL_TRANSPORTS = ["loopback", "socketpair"]
+
+
+def make_frames(count: int):
+    """Distinct valid HighState frames, the validator drops duplicates."""
+    frames = []
+    for _ in range(count):
+        frame = bytearray(random.getrandbits(8) for _ in range(1087))
+        frame[0:2] = bytes.fromhex("FEEF")
+        frame[885] = 1  # MotorModeHigh.FORCE_STAND
+        frame[890] = 1  # GaitType.TROT
+        frame[1083:1087] = gen_crc(frame[:1080])
+        frames.append(bytes(frame))
+    return frames
+
+
+def bench_states(transport, frames, total: int, rate: float) -> None:
+    high_state = HighState()
+    validator = FrameValidator()
+    received = [0]
+    last_time = [0.0]
+    done = threading.Event()
+
+    def on_frame(frame, ts) -> None:
+        high_state.parse_data(frame)
+        received[0] += 1
+        last_time[0] = time.perf_counter()
+        if received[0] == total:
+            done.set()
+
+    udp = Go1UDP("127.0.0.1", 0, validator=validator, transport=transport)
+    udp.add_receive_callback(on_frame)
+
+    period = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    for idx in range(total):
+        if period:
+            delay = start + idx * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        transport.robot.send_state(frames[idx % len(frames)])
+    sent_elapsed = time.perf_counter() - start
+    # Whatever is not received shortly after the last frame is lost.
+    done.wait(1.0)
+    udp.disconnect()
+    elapsed = max(last_time[0] - start, sent_elapsed)
+
+    lost = total - received[0]
+    print(
+        f"\tstates   sent {total / sent_elapsed:10.0f} /s"
+        f"   received {received[0] / elapsed:10.0f} /s"
+        f"   lost {lost / total:6.1%}"
+    )
+
+
+def bench_commands(transport, total: int) -> None:
+    mqttc = Go1Mqtt("127.0.0.1", 0, 5, transport=transport)
+    mqttc.connected.wait(1.0)
+    robot = transport.robot
+    delivered_before = robot.received_messages
+
+    start = time.perf_counter()
+    for idx in range(total):
+        mqttc.send_cmd_vel(Velocity(idx % 2 * 0.1, 0.0, 0.0))
+    sent_elapsed = time.perf_counter() - start
+    mqttc.flush(timeout=5.0)
+    elapsed = time.perf_counter() - start
+    delivered = robot.received_messages - delivered_before
+    mqttc.disconnect()
+
+    # Drain the robot side for the next run.
+    try:
+        while True:
+            robot.get_message(timeout=0)
+    except queue.Empty:
+        pass
+
+    print(
+        f"\tcommands sent {total / sent_elapsed:10.0f} /s"
+        f"   delivered {delivered / elapsed:9.0f} /s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("transports", nargs="*", default=LOCAL_TRANSPORTS)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--commands", type=int, default=20000)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="states per second, 0 is max"
+    )
+    args = parser.parse_args()
+
+    frames = make_frames(64)
+    for name in args.transports:
+        if name == "network":
+            parser.error("only the local transports have a robot side.")
+        print(name)
+        transport = create_transport(name)
+        bench_states(transport, frames, args.frames, args.rate)
+        bench_commands(transport, args.commands)
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,16 @@
-import time
-
-from IPython import embed
-
 from src.config import Config
 from src.go1 import Go1
 from src.utils.custom_types import LED, Pose, Velocity
 
 if __name__ == "__main__":
+    # Imported lazily, IPython is only needed for the interactive shell.
+    from IPython import embed
+
     config = Config("configs/default.yaml")
     go1 = Go1(config)
 
-    time.sleep(1)
+    if not go1.ready(timeout=10.0):
+        print("Go1 is not fully connected yet, it keeps reconnecting.")
     embed()
 
     go1.close_all_connection()
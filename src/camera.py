@@ -1,17 +1,36 @@
 import platform
 import threading
+import time
 import warnings
+from typing import Optional
 
 import cv2
 
 
 class Go1Camera:
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        reconnect_min_delay: float = 1.0,
+        reconnect_max_delay: float = 16.0,
+        source: Optional[str] = None,
+    ) -> None:
         self._host = host
         self._port = port
+        self._reconnect_min_delay = reconnect_min_delay
+        self._reconnect_max_delay = reconnect_max_delay
         self._gst_pipeline = self._build_gstreamer_cmd()
 
-        self.latest_frame = None
+        self._cap = None
+        # Decoded into again and again, only the copy handed out is new.
+        self._read_buffer = None
+        # Frame and time.monotonic() at reception, swapped together.
+        self._latest = (None, None)
+        self.source = source  # the computer streaming the camera
+        self.ready = threading.Event()  # Set once a frame is received.
+        # Number of frames grabbed without being decoded between two frames.
+        self.frame_skip = 0
         self._capturing = threading.Event()
         self._capturing_thread = threading.Thread(
             target=self._capturing_thread_func,
@@ -19,10 +38,21 @@ class Go1Camera:
         )
         self._capturing_thread.start()
 
+    @property
+    def latest_frame(self):
+        return self._latest[0]
+
+    @property
+    def latest_frame_time(self) -> Optional[float]:
+        return self._latest[1]
+
+    def latest(self):
+        """The latest frame and its receive time, from the same frame."""
+        return self._latest
+
     def close(self) -> None:
         self._capturing.set()
         self._capturing_thread.join()
-        self._cap.release()
 
     def _get_cpu_arch_decoder(self) -> str:
         if platform.machine() == "x86_64":
@@ -37,18 +67,42 @@ class Go1Camera:
 
         return str_address + str_application + str_decoder
 
+    def _store_frame(self, frame) -> None:
+        received_time = time.monotonic()
+        self._latest = (frame.copy(), received_time)
+
     def _capturing_thread_func(self, event) -> None:
         print(f"Capturing Thread Port: {self._port} Started.")
 
-        self._cap = cv2.VideoCapture(self._gst_pipeline)
+        delay = self._reconnect_min_delay
+        skipped = 0
         while not event.is_set():
-            ret, frame = self._cap.read()
+            if self._cap is None:
+                self._cap = cv2.VideoCapture(self._gst_pipeline)
+
+            if skipped < self.frame_skip:
+                ret, frame = self._cap.grab(), None
+                skipped += 1
+            else:
+                ret, frame = self._cap.read(self._read_buffer)
+                skipped = 0
             if not ret:
                 warnings.warn("Make sure to run gstreamer client on each Jetson Nano.")
                 warnings.warn("Make sure to compile opencv from source not from pip install.")
-                self.close()
+                # Reopen the stream with backoff, e.g. after a link loss.
+                self.ready.clear()
+                self._cap.release()
+                self._cap = None
+                event.wait(delay)
+                delay = min(delay * 2.0, self._reconnect_max_delay)
+                continue
 
+            delay = self._reconnect_min_delay
             if frame is not None:
-                self.latest_frame = frame.copy()
+                self._read_buffer = frame
+                self._store_frame(frame)
+                self.ready.set()
 
+        if self._cap is not None:
+            self._cap.release()
         print(f"Capturing Thread Port: {self._port} Stopped.")
@@ -0,0 +1,465 @@
+"""Command line tools to diagnose a Go1 robot without a Python session.
+
+python -m src stream --fields position velocity imu.rpy --rate 20
+python -m src record states.go1rec --duration 60
+python -m src replay states.go1rec --fields bms.SOC --speed 2
+python -m src bench --iterations 10000
+python -m src top
+python -m src watch --fields imu bms motor_states
+python -m src monitor --fields imu bms
+python -m src shell
+"""
+
+import argparse
+import os
+import random
+import socket
+import sys
+import time
+from typing import Callable, List, Optional
+
+from src.config import Config
+from src.formatter import (StateFormatter, TerminalDashboard, field_getter,
+                           format_value)
+from src.recorder import FrameRecorder, read_recording
+from src.states import HighState
+from src.utils.common import gen_crc, sum_total_voltage
+from src.validator import FrameValidator
+
+DEFAULT_CONFIG = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "configs",
+    "default.yaml",
+)
+DEFAULT_FIELDS = ["mode", "position", "velocity", "imu.rpy", "bms.SOC"]
+
+
+def _create_go1(args: argparse.Namespace, passive: bool = True):
+    """Connect to the robot, ``passive`` for the tools that only watch it.
+
+    A passive tool never commands the robot, its safety watchdog would
+    otherwise damp a robot being carried or send zero sticks over the
+    remote of the operator.
+    """
+    # Imported here, so offline commands do not load the network stack.
+    from src.go1 import Go1
+
+    config = Config(args.config)
+    if not args.camera:
+        config.camera_enable = False
+    if passive:
+        config.watchdog_enable = False
+    go1 = Go1(config)
+    if not go1.ready(timeout=args.timeout):
+        print("Go1 is not fully connected yet.", file=sys.stderr)
+
+    return go1
+
+
+def _sleep_until(deadline: float) -> None:
+    remaining = deadline - time.monotonic()
+    if remaining > 0.0:
+        time.sleep(remaining)
+
+
+###########################################
+# Commands
+def cmd_stream(args: argparse.Namespace) -> None:
+    """Print the selected fields of the latest state at a fixed rate."""
+    getters = [field_getter(field) for field in args.fields]
+    formatter = StateFormatter(args.fields, compact=True)
+    go1 = _create_go1(args)
+    state = HighState()
+    write = sys.stdout.write
+    period = 1.0 / args.rate
+
+    if not args.compact:
+        write("time\t" + "\t".join(args.fields) + "\n")
+    last_stamp = None
+    deadline = time.monotonic()
+    try:
+        while True:
+            deadline += period
+            frame, stamp = go1.latest_frame()
+            if frame is not None and stamp != last_stamp:
+                last_stamp = stamp
+                state.parse_data(frame)
+                if args.compact:
+                    write(f"{stamp:.3f} {formatter.format(state)}")
+                else:
+                    values = "\t".join(
+                        format_value(getter(state)) for getter in getters
+                    )
+                    write(f"{stamp:.3f}\t{values}\n")
+                sys.stdout.flush()
+            _sleep_until(deadline)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        go1.close_all_connection()
+
+
+def cmd_record(args: argparse.Namespace) -> None:
+    """Record the raw HighState frames to a file."""
+    go1 = _create_go1(args)
+    recorder = FrameRecorder(args.output)
+    go1.add_state_callback(recorder.write)
+    print(f"Recording to {args.output}, Ctrl+C to stop.")
+    try:
+        end = (
+            None if args.duration is None else time.monotonic() + args.duration
+        )
+        while end is None or time.monotonic() < end:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        go1.remove_state_callback(recorder.write)
+        recorder.close()
+        go1.close_all_connection()
+    print(f"Recorded {recorder.frames} frames.")
+
+
+def cmd_replay(args: argparse.Namespace) -> None:
+    """Replay a recording with its original timing."""
+    getters = [field_getter(field) for field in args.fields]
+    state = HighState()
+    write = sys.stdout.write
+
+    sock = None
+    address = None
+    if args.udp is not None:
+        host, port = args.udp.rsplit(":", 1)
+        address = (host, int(port))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    write("time\t" + "\t".join(args.fields) + "\n")
+    start_time = None
+    start_stamp = None
+    try:
+        for stamp, frame in read_recording(args.recording):
+            if start_time is None:
+                start_time, start_stamp = time.monotonic(), stamp
+            if args.speed > 0.0:
+                _sleep_until(start_time + (stamp - start_stamp) / args.speed)
+
+            if sock is not None:
+                sock.sendto(frame, address)
+            if getters:
+                state.parse_data(frame)
+                values = "\t".join(
+                    format_value(getter(state)) for getter in getters
+                )
+                write(f"{stamp - start_stamp:.3f}\t{values}\n")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if sock is not None:
+            sock.close()
+
+
+def _synthetic_frame() -> bytes:
+    frame = bytearray(random.getrandbits(8) for _ in range(1087))
+    frame[0:2] = bytes.fromhex("FEEF")
+    frame[885] = 1  # MotorModeHigh.FORCE_STAND
+    frame[890] = 1  # GaitType.TROT
+    frame[1083:1087] = gen_crc(frame[:1080])
+    return bytes(frame)
+
+
+def _bench(name: str, func: Callable[[], None], iterations: int) -> None:
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<28}{elapsed / iterations * 1e6:10.2f} us"
+        f"{iterations / elapsed:12.0f} /s"
+    )
+
+
+def cmd_bench(args: argparse.Namespace) -> None:
+    """Benchmark the decode/encode hot paths offline."""
+    from src.command import HighCmd
+
+    if args.recording is not None:
+        frame = next(read_recording(args.recording))[1]
+    else:
+        frame = _synthetic_frame()
+
+    state = HighState()
+    cmd = HighCmd()
+    _bench(
+        "HighState.parse_data",
+        lambda: state.parse_data(frame),
+        args.iterations,
+    )
+    _bench("HighCmd.build_cmd", cmd.build_cmd, args.iterations)
+
+    validator = FrameValidator()
+
+    def validate() -> None:
+        # Forget the last frame, it would be rejected as a duplicate.
+        validator.reset()
+        validator.validate(frame)
+
+    _bench("FrameValidator.validate", validate, args.iterations)
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("NumPy is not installed, skipping the vectorized paths.")
+        return
+
+    from src.estimator import StateEstimator
+    from src.history import StateHistory
+    from src.utils.compact_types import CompactHighState
+
+    compact = CompactHighState()
+    history = StateHistory(5000)
+    estimator = StateEstimator()
+    clock = [0.0]
+
+    def append() -> None:
+        clock[0] += 0.002
+        history.append(frame, clock[0])
+
+    def estimate() -> None:
+        clock[0] += 0.002
+        estimator.update(frame, clock[0])
+
+    _bench(
+        "CompactHighState.update",
+        lambda: compact.update(frame, 0.0),
+        args.iterations,
+    )
+    _bench("StateHistory.append", append, args.iterations)
+    _bench("StateEstimator.update", estimate, args.iterations)
+
+
+def cmd_top(args: argparse.Namespace) -> None:
+    """Live view of rates, latencies, battery and motor temperatures."""
+    from src.utils.topics import PubTopic
+
+    go1 = _create_go1(args)
+    counter = [0]
+
+    def count(frame: bytes, timestamp: float) -> None:
+        counter[0] += 1
+
+    go1.add_state_callback(count)
+    state = HighState()
+    dashboard = TerminalDashboard()
+    try:
+        last_time = time.monotonic()
+        while True:
+            time.sleep(args.interval)
+            now = time.monotonic()
+            rate = counter[0] / (now - last_time)
+            counter[0] = 0
+            last_time = now
+
+            lines = [f"Go1 top - {time.strftime('%H:%M:%S')}"]
+            lines.append(f"State rate:\t{rate:.1f} Hz")
+            connected = "connected" if go1.publisher.connected else "down"
+            lines.append(
+                f"MQTT:\t\t{connected}"
+                f", queue {go1.publisher.queue_depth()}"
+                f", inflight {go1.publisher.inflight}"
+            )
+            for topic in (PubTopic.stick, PubTopic.action):
+                mean, peak = go1.publisher.latency(topic)
+                lines.append(
+                    f"  {topic:<20}latency {mean * 1e3:.1f} ms"
+                    f" (max {peak * 1e3:.1f} ms)"
+                    f", dropped {go1.publisher.dropped(topic)}"
+                )
+            if go1.link_monitor is not None:
+                lines.append(f"Link:\t\t{go1.link_monitor.quality.name}")
+            if go1.validator is not None:
+                rejected = ", ".join(
+                    f"{reason} {count}"
+                    for reason, count in go1.validator.rejected.items()
+                )
+                lines.append(f"Rejected:\t{rejected}")
+
+            frame, _ = go1.latest_frame()
+            if frame is not None:
+                state.parse_data(frame)
+                bms = state.bms
+                lines.append(
+                    f"Battery:\t{bms.SOC} %, "
+                    f"{sum_total_voltage(bms.cell_vol):.2f} V, "
+                    f"{bms.current} mA"
+                )
+                temps = [
+                    motor.temperature for motor in state.motor_states[:12]
+                ]
+                lines.append(f"Motor temp:\tmax {max(temps)} °C {temps}")
+                lines.append(f"IMU temp:\t{state.imu.temperature} °C")
+                lines.append(
+                    f"Mode:\t\t{state.mode.name} {state.gait_type.name}"
+                )
+
+            dashboard.draw("\n".join(lines))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.close()
+        go1.close_all_connection()
+
+
+def cmd_watch(args: argparse.Namespace) -> None:
+    """Full state view redrawn in place, optionally of selected fields."""
+    formatter = StateFormatter(args.fields)
+    go1 = _create_go1(args)
+    state = HighState()
+    dashboard = TerminalDashboard()
+    period = 1.0 / args.rate
+    last_stamp = None
+    deadline = time.monotonic()
+    try:
+        while True:
+            deadline += period
+            frame, stamp = go1.latest_frame()
+            if frame is not None and stamp != last_stamp:
+                last_stamp = stamp
+                state.parse_data(frame)
+                dashboard.draw(formatter.format(state))
+            _sleep_until(deadline)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.close()
+        go1.close_all_connection()
+
+
+def cmd_monitor(args: argparse.Namespace) -> None:
+    """State view of the telemetry forwarded by a robot, on a base station."""
+    from src.telemetry import TelemetryReceiver
+
+    port = args.port
+    if port is None:
+        port = Config(args.config).telemetry_port
+    receiver = TelemetryReceiver(port)
+    formatter = StateFormatter(args.fields)
+    dashboard = TerminalDashboard()
+    period = 1.0 / args.rate
+    last_stamp = None
+    last_bytes = 0
+    deadline = last_draw = time.monotonic()
+    try:
+        while True:
+            deadline += period
+            if receiver.latest_time != last_stamp:
+                last_stamp = receiver.latest_time
+                now = time.monotonic()
+                bandwidth = (receiver.received_bytes - last_bytes) / (
+                    now - last_draw
+                )
+                last_bytes, last_draw = receiver.received_bytes, now
+                dashboard.draw(
+                    f"{receiver.frames} frames, {bandwidth / 1000:.1f} kB/s, "
+                    f"{receiver.lost_datagrams} lost datagrams\n"
+                    + formatter.format(receiver.high_state)
+                )
+            _sleep_until(deadline)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.close()
+        receiver.close()
+
+
+def cmd_shell(args: argparse.Namespace) -> None:
+    """Interactive IPython shell with a connected ``go1``."""
+    from IPython import embed
+
+    from src.utils.custom_types import LED, Pose, Velocity  # noqa: F401
+
+    go1 = _create_go1(args, passive=False)
+    embed()
+    go1.close_all_connection()
+
+
+###########################################
+# Argument parsing
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="go1", description="Unitree Go1 command line tools."
+    )
+    parser.add_argument("--config", default=DEFAULT_CONFIG)
+    parser.add_argument(
+        "--camera",
+        action="store_true",
+        help="Start the cameras (disabled by default for the tools).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=5.0,
+        help="Seconds to wait for the robot connection.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stream = subparsers.add_parser("stream", help=cmd_stream.__doc__)
+    stream.add_argument("--fields", nargs="+", default=DEFAULT_FIELDS)
+    stream.add_argument("--rate", type=float, default=10.0, help="Hz")
+    stream.add_argument(
+        "--compact",
+        action="store_true",
+        help="Print name=value pairs instead of tab separated columns.",
+    )
+    stream.set_defaults(func=cmd_stream)
+
+    record = subparsers.add_parser("record", help=cmd_record.__doc__)
+    record.add_argument("output")
+    record.add_argument("--duration", type=float, default=None, help="s")
+    record.set_defaults(func=cmd_record)
+
+    replay = subparsers.add_parser("replay", help=cmd_replay.__doc__)
+    replay.add_argument("recording")
+    replay.add_argument("--fields", nargs="*", default=DEFAULT_FIELDS)
+    replay.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Playback speed, 0 replays as fast as possible.",
+    )
+    replay.add_argument(
+        "--udp", default=None, help="Also send the frames to host:port."
+    )
+    replay.set_defaults(func=cmd_replay)
+
+    bench = subparsers.add_parser("bench", help=cmd_bench.__doc__)
+    bench.add_argument("--iterations", type=int, default=10000)
+    bench.add_argument("--recording", default=None)
+    bench.set_defaults(func=cmd_bench)
+
+    top = subparsers.add_parser("top", help=cmd_top.__doc__)
+    top.add_argument("--interval", type=float, default=1.0, help="s")
+    top.set_defaults(func=cmd_top)
+
+    watch = subparsers.add_parser("watch", help=cmd_watch.__doc__)
+    watch.add_argument("--fields", nargs="+", default=None)
+    watch.add_argument("--rate", type=float, default=5.0, help="Hz")
+    watch.set_defaults(func=cmd_watch)
+
+    monitor = subparsers.add_parser("monitor", help=cmd_monitor.__doc__)
+    monitor.add_argument(
+        "--port", type=int, default=None, help="Default from the config."
+    )
+    monitor.add_argument("--fields", nargs="+", default=None)
+    monitor.add_argument("--rate", type=float, default=5.0, help="Hz")
+    monitor.set_defaults(func=cmd_monitor)
+
+    shell = subparsers.add_parser("shell", help=cmd_shell.__doc__)
+    shell.set_defaults(func=cmd_shell)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
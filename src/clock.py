@@ -0,0 +1,259 @@
+import socket
+import statistics
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Seconds between the NTP (1900) and UNIX (1970) epochs.
+_NTP_EPOCH = 2208988800
+# LI, version and mode, stratum, poll, precision, root delay and dispersion,
+# reference id, then the reference, originate, receive and transmit times.
+_NTP_PACKET = struct.Struct("!BBbb3I4Q")
+_NTP_CLIENT = (4 << 3) | 3  # version 4, client mode
+
+
+class ClockEstimate(NamedTuple):
+    """Remote clock: ``remote = host + offset + drift * (host - ref)``."""
+
+    reference: float  # (unit: s) host time of the offset
+    offset: float  # (unit: s) remote minus host clock at the reference
+    drift: float  # (unit: s/s) remote clock rate error, 1e-6 is 1 ppm
+    delay: Optional[float]  # (unit: s) best round trip, None if one-way
+    samples: int
+
+
+class ClockEstimator(object):
+    """Offset and drift of a remote clock against the host clock.
+
+    Samples come from NTP-style exchanges (``add_exchange``) or from remote
+    timestamps received on the host (``add_one_way``). Queueing only ever
+    adds delay, so the window is split in time buckets and only the best
+    sample of each (smallest round trip, or smallest one-way latency) goes
+    into a least squares fit of the offset over time, whose slope is the
+    drift. One-way samples measure the offset minus the minimum latency.
+    """
+
+    def __init__(
+        self, window: int = 64, buckets: int = 8, min_span: float = 10.0
+    ) -> None:
+        """Create a clock estimator.
+
+        Parameters
+        ----------
+
+        window: int
+            Number of samples kept.
+        buckets: int
+            Number of time buckets the best samples are taken from.
+        min_span: float
+            (unit: s) time span of the best samples to estimate the drift,
+            below it the drift is zero and the offset the median.
+        """
+        self.buckets = buckets
+        self.min_span = min_span
+        self._lock = threading.Lock()
+        # (host time, offset, ranking delay, round trip delay or None)
+        self._samples = deque(maxlen=window)
+        self._estimate = None
+
+    def add_exchange(
+        self, t0: float, t1: float, t2: float, t3: float
+    ) -> Tuple[float, float]:
+        """Add a request/response exchange, returns ``(offset, delay)``.
+
+        ``t0`` and ``t3`` are the host send and receive times, ``t1`` and
+        ``t2`` the remote receive and send times.
+        """
+        delay = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0
+        self._add((t0 + t3) / 2.0, offset, delay, delay)
+        return offset, delay
+
+    def add_one_way(self, remote_time: float, host_time: float) -> None:
+        """Add a remote send time and the host time it was received at."""
+        offset = remote_time - host_time
+        # The higher the sample the lower its latency.
+        self._add(host_time, offset, -offset, None)
+
+    def _add(self, host_time, offset, rank, delay) -> None:
+        with self._lock:
+            self._samples.append((host_time, offset, rank, delay))
+            self._estimate = None
+
+    @property
+    def synchronized(self) -> bool:
+        return bool(self._samples)
+
+    def estimate(self) -> Optional[ClockEstimate]:
+        """The current clock model, None without samples."""
+        with self._lock:
+            if self._estimate is None and self._samples:
+                self._estimate = self._fit(list(self._samples))
+            return self._estimate
+
+    def _fit(self, samples) -> ClockEstimate:
+        count = len(samples)
+        buckets = min(self.buckets, count)
+        best = []
+        for idx in range(buckets):
+            bucket = samples[
+                idx * count // buckets : (idx + 1) * count // buckets
+            ]
+            best.append(min(bucket, key=lambda sample: sample[2]))
+
+        times = [sample[0] for sample in best]
+        offsets = [sample[1] for sample in best]
+        reference = times[-1]
+        drift = 0.0
+        if len(best) > 1 and times[-1] - times[0] >= self.min_span:
+            drift, intercept = statistics.linear_regression(
+                [t - reference for t in times], offsets
+            )
+            offset = intercept
+        else:
+            offset = statistics.median(offsets)
+
+        delays = [sample[3] for sample in samples if sample[3] is not None]
+        return ClockEstimate(
+            reference, offset, drift, min(delays) if delays else None, count
+        )
+
+    def to_remote(self, host_time: float) -> float:
+        """Convert a host time to the remote clock."""
+        est = self.estimate()
+        if est is None:
+            raise ValueError("The clock is not synchronized yet.")
+        return host_time + est.offset + est.drift * (host_time - est.reference)
+
+    def to_host(self, remote_time: float) -> float:
+        """Convert a remote time to the host clock."""
+        est = self.estimate()
+        if est is None:
+            raise ValueError("The clock is not synchronized yet.")
+        return (remote_time - est.offset + est.drift * est.reference) / (
+            1.0 + est.drift
+        )
+
+    @property
+    def latency(self) -> float:
+        """(unit: s) one-way network latency, half the best round trip."""
+        est = self.estimate()
+        if est is None or est.delay is None:
+            return 0.0
+        return max(est.delay, 0.0) / 2.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._estimate = None
+
+
+def sntp_exchange(
+    sock: socket.socket, host: str, port: int = 123
+) -> Tuple[float, float, float, float]:
+    """One SNTP request/response with an NTP server on ``sock``.
+
+    Returns ``(t0, t1, t2, t3)``, the host times are ``time.monotonic`` and
+    the remote ones UNIX times. Raises ``socket.timeout`` and ``OSError``.
+    """
+    # The server echoes the transmit time, it identifies the reply.
+    cookie = int.from_bytes(struct.pack("!d", time.time()), "big")
+    request = _NTP_PACKET.pack(_NTP_CLIENT, 0, 0, 0, 0, 0, 0, 0, 0, 0, cookie)
+
+    t0 = time.monotonic()
+    sock.sendto(request, (host, port))
+    while True:
+        data, _ = sock.recvfrom(512)
+        t3 = time.monotonic()
+        if len(data) < _NTP_PACKET.size:
+            continue
+        fields = _NTP_PACKET.unpack_from(data)
+        if fields[8] == cookie:
+            break
+
+    t1 = fields[9] / 2**32 - _NTP_EPOCH
+    t2 = fields[10] / 2**32 - _NTP_EPOCH
+    return t0, t1, t2, t3
+
+
+class ClockSync(object):
+    """Estimate the clock of every robot computer with periodic SNTP queries.
+
+    The robot computers must serve NTP (e.g. chrony with an ``allow`` line),
+    a computer that never answers keeps an unsynchronized estimator and a
+    zero latency. ``correct`` turns a host receive time into an estimate of
+    the send time by removing the one-way network latency.
+    """
+
+    def __init__(
+        self,
+        hosts: Dict[str, str],
+        port: int = 123,
+        period: float = 2.0,
+        timeout: float = 0.5,
+    ) -> None:
+        """Create the clock synchronization.
+
+        Parameters
+        ----------
+
+        hosts: Dict[str, str]
+            The IP address of every robot computer by name.
+        port: int
+            The NTP port of the robot computers.
+        period: float
+            (unit: s) time between two queries of a computer.
+        timeout: float
+            (unit: s) time to wait for a reply.
+        """
+        self.hosts = dict(hosts)
+        self.port = port
+        self.period = period
+        self.estimators = {name: ClockEstimator() for name in self.hosts}
+        self.failures = {name: 0 for name in self.hosts}
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.settimeout(timeout)
+        self._stop = threading.Event()
+        self._sync_thread = threading.Thread(target=self._sync_thread_func)
+        self._sync_thread.daemon = True
+        self._sync_thread.start()
+
+    def latency(self, name: str) -> float:
+        """(unit: s) one-way latency to a computer, 0 if unknown."""
+        estimator = self.estimators.get(name)
+        return 0.0 if estimator is None else estimator.latency
+
+    def correct(self, name: str, receive_time: float) -> float:
+        """Host time at which a message received at ``receive_time`` left."""
+        return receive_time - self.latency(name)
+
+    def to_host(self, name: str, remote_time: float) -> float:
+        """Convert a time of a computer clock to the host clock."""
+        return self.estimators[name].to_host(remote_time)
+
+    def query(self, name: str) -> Optional[Tuple[float, float]]:
+        """Query a computer now, returns ``(offset, delay)`` or None."""
+        try:
+            exchange = sntp_exchange(self._sock, self.hosts[name], self.port)
+        except OSError as err:
+            self.failures[name] += 1
+            if self.failures[name] == 1:
+                print(f"[Clock] No NTP reply from {name}: {err}.")
+            return None
+        return self.estimators[name].add_exchange(*exchange)
+
+    def _sync_thread_func(self) -> None:
+        while not self._stop.is_set():
+            for name in self.hosts:
+                if self._stop.is_set():
+                    break
+                self.query(name)
+            self._stop.wait(self.period)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._sync_thread.join()
+        self._sock.close()
@@ -1,8 +1,12 @@
 from typing import Tuple
 
-from src.utils.common import byte_print, encrypt_crc, float_to_hex, gen_crc
+from src.utils.codec import get_struct
+from src.utils.common import byte_print, encrypt_crc, gen_crc
 from src.utils.modes import GaitType, MotorModeHigh, SpeedLevel
 
+# foot_raise_height, body_height, position, euler, velocity and yaw_speed.
+_CMD_FLOATS_STRUCT = get_struct("10f")
+
 
 class BMSCmd:
     """The command to retrieve bms state."""
@@ -83,20 +87,16 @@ class HighCmd(object):
         cmd[23] = self.gait_type.value
         cmd[24] = self.speed_level.value
 
-        cmd[25:29] = float_to_hex(self.foot_raise_height)
-        cmd[29:33] = float_to_hex(self.body_height)
-
-        cmd[33:37] = float_to_hex(self.position[0])
-        cmd[37:41] = float_to_hex(self.position[1])
-
-        cmd[41:45] = float_to_hex(self.euler[0])
-        cmd[45:49] = float_to_hex(self.euler[1])
-        cmd[49:53] = float_to_hex(self.euler[2])
-
-        cmd[53:57] = float_to_hex(self.velocity[0])
-        cmd[57:61] = float_to_hex(self.velocity[1])
-
-        cmd[61:65] = float_to_hex(self.yawSpeed)
+        _CMD_FLOATS_STRUCT.pack_into(
+            cmd,
+            25,
+            self.foot_raise_height,
+            self.body_height,
+            *self.position,
+            *self.euler,
+            *self.velocity,
+            self.yawSpeed,
+        )
         cmd[65:69] = self.bms.get_bytes()
         cmd[69:73] = self.led.get_bytes()
         cmd[73:113] = self.wireless_remote
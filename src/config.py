@@ -15,6 +15,16 @@ class Config(object):
         connections = yaml_data["connection"]
         self.pc_host = connections["pc_host"]
         self.go1_host = connections["go1_host"]
+        self.nano_hosts = {
+            f"nano{idx}": connections[f"nano{idx}_host"]
+            for idx in range(1, 4)
+            if f"nano{idx}_host" in connections
+        }
+        self.transport = connections.get("transport", "network")
+
+        reconnect = connections.get("reconnect", {})
+        self.reconnect_min_delay = reconnect.get("min_delay", 1.0)
+        self.reconnect_max_delay = reconnect.get("max_delay", 16.0)
 
         mqttc = connections["mqttc"]
         self.go1_mqttc_port = mqttc["port"]
@@ -32,3 +42,68 @@ class Config(object):
         self.port_left = camera["port_left"]
         self.port_right = camera["port_right"]
         self.port_belly = camera["port_belly"]
+
+        link_monitor = yaml_data.get("link_monitor", {})
+        self.link_monitor_enable = link_monitor.get("enable", False)
+        self.link_monitor_max_loss = link_monitor.get("max_loss", 0.1)
+        self.link_monitor_max_latency = link_monitor.get("max_latency", 0.3)
+
+        state = yaml_data.get("state", {})
+        self.state_history_size = state.get("history_size", 0)
+
+        validation = state.get("validation", {})
+        self.state_validation_enable = validation.get("enable", False)
+        self.state_validation_crc = validation.get("check_crc", True)
+
+        estimator = state.get("estimator", {})
+        self.estimator_enable = estimator.get("enable", False)
+        self.estimator_contact_threshold = estimator.get(
+            "contact_threshold", 20.0
+        )
+        self.estimator_leg_odometry_gain = estimator.get(
+            "leg_odometry_gain", 0.2
+        )
+
+        gait = state.get("gait", {})
+        self.gait_enable = gait.get("enable", False)
+        self.gait_touchdown_threshold = gait.get("touchdown_threshold", 30.0)
+        self.gait_liftoff_threshold = gait.get("liftoff_threshold", 15.0)
+
+        controller = yaml_data.get("controller", {})
+        self.controller_kp_linear = controller.get("kp_linear", 1.0)
+        self.controller_kp_yaw = controller.get("kp_yaw", 1.0)
+        self.controller_max_linear = controller.get("max_linear", 0.5)
+        self.controller_max_angular = controller.get("max_angular", 0.5)
+        self.controller_position_tolerance = controller.get(
+            "position_tolerance", 0.05
+        )
+        self.controller_yaw_tolerance = controller.get("yaw_tolerance", 0.05)
+
+        watchdog = yaml_data.get("watchdog", {})
+        self.watchdog_enable = watchdog.get("enable", False)
+        self.watchdog_rules = {
+            name: (rule.get("limit"), rule.get("action", "zero_velocity"))
+            for name, rule in watchdog.get("rules", {}).items()
+        }
+
+        clock = yaml_data.get("clock", {})
+        self.clock_enable = clock.get("enable", False)
+        self.clock_port = clock.get("port", 123)
+        self.clock_period = clock.get("period", 2.0)
+
+        telemetry = yaml_data.get("telemetry", {})
+        self.telemetry_enable = telemetry.get("enable", False)
+        self.telemetry_host = telemetry.get("host", self.pc_host)
+        self.telemetry_port = telemetry.get("port", 9300)
+        self.telemetry_rate = telemetry.get("rate", 20.0)
+        self.telemetry_keyframe_interval = telemetry.get(
+            "keyframe_interval", 20
+        )
+        self.telemetry_level = telemetry.get("level", 1)
+
+        streaming = yaml_data.get("streaming", {})
+        self.streaming_enable = streaming.get("enable", False)
+        self.streaming_host = streaming.get("host", "0.0.0.0")
+        self.streaming_port = streaming.get("port", 8080)
+        self.streaming_qualities = streaming.get("qualities", [50, 80])
+        self.streaming_max_fps = streaming.get("max_fps", 30.0)
@@ -1,24 +1,40 @@
 import binascii
 import random
 import socket
-import struct
-import sys
 import threading
-
-import numpy as np
-import paho.mqtt.client as mqtt_client
-
-from src.utils.custom_types import LED, Pose, Velocity
+import time
+from typing import Callable, Optional, Tuple
+
+from src.publisher import MqttPublisher, PublishBatch, QueuePolicy
+from src.subscriber import MqttSubscriber
+from src.transport import NetworkTransport
+from src.utils.codec import get_struct
+from src.utils.common import clip
+from src.utils.custom_types import LED, Pose, ReceiveCallback, Velocity
 from src.utils.modes import Mode
 from src.utils.topics import PubTopic
+from src.validator import FrameValidator
+
+_STICK_STRUCT = get_struct("4f")
 
 
 class Go1Mqtt(object):
     """MQTT client communication with Go1 Robot."""
 
-    def __init__(self, host: str, port: int, keepalive: int) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        keepalive: int,
+        reconnect_min_delay: float = 1.0,
+        reconnect_max_delay: float = 16.0,
+        transport=None,
+    ) -> None:
         """Create an instance of Go1 MQTT client connection.
 
+        The connection is established in the background and retried with an
+        exponential backoff, wait on ``connected`` to know when it is up.
+
         Parameters
         ----------
 
@@ -28,66 +44,115 @@ class Go1Mqtt(object):
             The network port of the server host to connect to.
         keepalive: int
             Maximum period in seconds between communications with the broker.
+        reconnect_min_delay: float
+            First delay in seconds before reconnecting after a link loss.
+        reconnect_max_delay: float
+            The reconnect delay doubles up to this value.
+        transport
+            Creates the MQTT client, the network by default, see
+            ``src.transport``.
 
         """
         self._host = host
         self._port = port
         self._keepalive = keepalive
+        self._reconnect_min_delay = reconnect_min_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self.connected = threading.Event()
         self._client_id = f"python-mqtt-{random.randint(0, 1000)}"
         self._protocol = None
 
-        self._mqttc = mqtt_client.Client(
-            client_id=self._client_id,
-            callback_api_version=mqtt_client.CallbackAPIVersion.VERSION2,
+        self._transport = transport or NetworkTransport()
+        self._mqttc = self._transport.create_mqtt_client(self._client_id)
+        self.publisher = MqttPublisher(self._mqttc, connected=False)
+        # Only the latest LED color matters, it is kept while the link is
+        # down and sent on reconnect.
+        self.publisher.set_policy(PubTopic.led, QueuePolicy.COALESCE, qos=1)
+        # Only the latest stick command matters, stale ones are discarded
+        # while the link is down.
+        self.publisher.set_policy(
+            PubTopic.stick, QueuePolicy.COALESCE, qos=0, buffer_offline=False
+        )
+        # Actions are buffered while the link is down and executed in order.
+        self.publisher.set_policy(
+            PubTopic.action, QueuePolicy.DROP_OLDEST, maxsize=8, qos=1
         )
+        self.subscriber = MqttSubscriber()
+        # Time (monotonic) and velocity of the last stick command.
+        self.last_cmd_vel_time = None
+        self.last_cmd_vel = Velocity(0.0, 0.0, 0.0)
         self._connect()
 
     def _connect(self) -> None:
         def on_connect(client, userdata, flags, rc, properties) -> None:
-            """
-            Add after rc == 0, for subsribe topic
-            client.subscribe(SubTopic.firmware)
-            client.subscribe(SubTopic.bms)
-            """
             if rc == 0:
                 print("Connected to Go1 MQTT Broker!")
+                self.subscriber.subscribe(client)
+                self.connected.set()
+                self.publisher.set_connected(True)
             else:
                 print(f"Failed to connect, return code {rc}.")
 
+        def on_disconnect(client, userdata, flags, rc, properties) -> None:
+            if self.connected.is_set():
+                print(f"[MQTT] Disconnected ({rc}), reconnecting.")
+            self.connected.clear()
+            self.publisher.set_connected(False)
+
         def on_message(client, userdata, msg) -> None:
+            if self.subscriber.handles(msg.topic):
+                self.subscriber.handle(msg.topic, msg.payload)
+                return
+
             str_payload = str(binascii.hexlify(msg.payload))
             print(f"[Message]: {msg.topic} --> {str_payload}")
 
         self._mqttc.on_connect = on_connect
+        self._mqttc.on_disconnect = on_disconnect
         self._mqttc.on_message = on_message
-        try:
-            self._mqttc.connect(self._host, self._port, self._keepalive)
-        except socket.timeout as err:
+        self._mqttc.reconnect_delay_set(
+            self._reconnect_min_delay, self._reconnect_max_delay
+        )
+        # Non blocking, the network loop connects and reconnects with backoff.
+        self._mqttc.connect_async(self._host, self._port, self._keepalive)
+        self._mqttc.loop_start()
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        if not self.connected.wait(timeout):
             print(
-                f"[MQTT] TimeoutError: Connection to {self._host}:{self._port} {err}."
+                f"[MQTT] TimeoutError: Connection to {self._host}:{self._port}."
             )
             print(
                 "[MQTT] Make sure you connected to robot network wireless/wired"
             )
-            sys.exit(1)
-        self._mqttc.loop_start()
+            return False
+        return True
 
     def disconnect(self) -> None:
+        self.publisher.close()
         self._mqttc.disconnect()
         self._mqttc.loop_stop()
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued command has been acknowledged."""
+        return self.publisher.flush(timeout)
+
+    def publish_batch(self, messages) -> PublishBatch:
+        """Queue several ``(topic, payload)`` commands at once."""
+        return self.publisher.publish_batch(messages)
+
     def _clip_cmd_vel(self, cmd_vel: Velocity) -> Velocity:
-        cmd_x = np.clip(cmd_vel.vx, -1.0, 1.0)
-        cmd_y = np.clip(cmd_vel.vy, -1.0, 1.0)
-        cmd_theta = np.clip(cmd_vel.vz, -1.0, 1.0)
+        cmd_x = clip(cmd_vel.vx, -1.0, 1.0)
+        cmd_y = clip(cmd_vel.vy, -1.0, 1.0)
+        cmd_theta = clip(cmd_vel.vz, -1.0, 1.0)
 
         return Velocity(cmd_x, cmd_y, cmd_theta)
 
     def _clip_cmd_pose(self, cmd_pose: Pose) -> Pose:
-        lean_left_right = np.clip(cmd_pose.lean_left_right, -1.0, 1.0)
-        twist_left_right = np.clip(cmd_pose.twist_left_right, -1.0, 1.0)
-        look_up_down = np.clip(cmd_pose.look_up_down, -1.0, 1.0)
-        extend_squat = np.clip(cmd_pose.extend_squat, -1.0, 1.0)
+        lean_left_right = clip(cmd_pose.lean_left_right, -1.0, 1.0)
+        twist_left_right = clip(cmd_pose.twist_left_right, -1.0, 1.0)
+        look_up_down = clip(cmd_pose.look_up_down, -1.0, 1.0)
+        extend_squat = clip(cmd_pose.extend_squat, -1.0, 1.0)
 
         return Pose(
             lean_left_right,
@@ -97,9 +162,9 @@ class Go1Mqtt(object):
         )
 
     def _clip_led_val(self, led: LED) -> LED:
-        r = np.clip(led.r, 0, 255)
-        g = np.clip(led.g, 0, 255)
-        b = np.clip(led.b, 0, 255)
+        r = clip(led.r, 0, 255)
+        g = clip(led.g, 0, 255)
+        b = clip(led.b, 0, 255)
 
         return LED(r, g, b)
 
@@ -112,7 +177,7 @@ class Go1Mqtt(object):
         mode: Mode
             The operation mode name.
         """
-        self._mqttc.publish(topic=PubTopic.action, payload=mode, qos=1)
+        self.publisher.publish(PubTopic.action, mode.encode())
 
     def send_cmd_vel(self, cmd_vel: Velocity) -> None:
         """Controlling command velocity of the robot.
@@ -127,15 +192,13 @@ class Go1Mqtt(object):
             Vz -> Angular Z
 
         """
-        # Zero out velocity buffer before executing.
-        cmd_data = [0.0, 0.0, 0.0, 0.0]
-        bytes_data = struct.pack("ffff", *cmd_data)
-        self._mqttc.publish(topic=PubTopic.stick, payload=bytes_data, qos=0)
-
         cmd_vel = self._clip_cmd_vel(cmd_vel)
-        cmd_data = [cmd_vel.vy, cmd_vel.vz, 0.0, cmd_vel.vx]
-        bytes_data = struct.pack("ffff", *cmd_data)
-        self._mqttc.publish(topic=PubTopic.stick, payload=bytes_data, qos=0)
+        bytes_data = _STICK_STRUCT.pack(
+            cmd_vel.vy, cmd_vel.vz, 0.0, cmd_vel.vx
+        )
+        self.publisher.publish(PubTopic.stick, bytes_data)
+        self.last_cmd_vel = cmd_vel
+        self.last_cmd_vel_time = time.monotonic()
 
     def send_cmd_pose(self, cmd_pose: Pose) -> None:
         """Controlling command velocity of the robot.
@@ -149,14 +212,11 @@ class Go1Mqtt(object):
         TODO: Zero out the command pose buffer.
         """
         cmd_pose = self._clip_cmd_pose(cmd_pose)
-        cmd_data = [
-            cmd_pose.lean_left_right,
-            cmd_pose.twist_left_right,
-            cmd_pose.look_up_down,
-            cmd_pose.extend_squat,
-        ]
-        bytes_data = struct.pack("ffff", *cmd_data)
-        self._mqttc.publish(topic=PubTopic.stick, payload=bytes_data, qos=0)
+        bytes_data = _STICK_STRUCT.pack(*cmd_pose)
+        self.publisher.publish(PubTopic.stick, bytes_data)
+        # The pose replaces the velocity command on the stick topic.
+        self.last_cmd_vel = Velocity(0.0, 0.0, 0.0)
+        self.last_cmd_vel_time = time.monotonic()
 
     def set_led_color(self, led: LED) -> None:
         """Set LED color.
@@ -175,19 +235,27 @@ class Go1Mqtt(object):
             The RGB values with range (0-255).
         """
         led = self._clip_led_val(led)
-        self._mqttc.publish(
-            topic=PubTopic.led,
-            payload=bytes([led.r, led.g, led.b]),
-            qos=1,
-        )
+        self.publisher.publish(PubTopic.led, bytes([led.r, led.g, led.b]))
 
 
 class Go1UDP(object):
     """UDP client communication with Go1 Robot."""
 
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        reconnect_min_delay: float = 1.0,
+        reconnect_max_delay: float = 16.0,
+        validator: Optional[FrameValidator] = None,
+        transport=None,
+    ) -> None:
         """Create an instance of Go1 UDP client connection.
 
+        The socket is (re)opened by the receive thread with an exponential
+        backoff, ``receiving`` is set once state datagrams arrive. Datagrams
+        rejected by the validator are dropped before anything sees them.
+
         Parameters
         ----------
 
@@ -195,49 +263,152 @@ class Go1UDP(object):
             The host name or IP address of Go1 robot.
         port: int
             The network port of the server host to connect to.
+        reconnect_min_delay: float
+            First delay in seconds before reopening a failed socket.
+        reconnect_max_delay: float
+            The reconnect delay doubles up to this value.
+        validator: Optional[FrameValidator]
+            Checks the datagrams are valid new HighState frames.
+        transport
+            Opens the state channel, the network by default, see
+            ``src.transport``.
 
         """
         self._host = host
         self._port = port
+        self._reconnect_min_delay = reconnect_min_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._validator = validator
+        self._transport = transport or NetworkTransport()
+        # Copied on write, the receive thread iterates without a lock.
+        self._receive_callbacks: Tuple[ReceiveCallback, ...] = ()
+        self._callbacks_lock = threading.Lock()
+        self._socket = None
+        # Frame and receive time swapped together, never read torn.
+        self._latest = (None, None)
+        self.receiving = threading.Event()
 
-        self._connect()
         self._run_receive_thread = threading.Event()
         self._receive_thread = threading.Thread(
             target=self._receive_thread_func, args=(self._run_receive_thread,)
         )
         self._receive_thread.daemon = True
         self._receive_thread.start()
-        self.received_bytes = None
 
-    def _connect(self) -> None:
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._socket.settimeout(2.0)
+    @property
+    def received_bytes(self) -> Optional[bytes]:
+        return self._latest[0]
+
+    @property
+    def received_time(self) -> Optional[float]:
+        return self._latest[1]
+
+    def latest(self) -> Tuple[Optional[bytes], Optional[float]]:
+        """The last valid frame and its receive time, from the same frame."""
+        return self._latest
+
+    def _connect(self) -> bool:
         try:
-            self._socket.connect((self._host, self._port))
-        except socket.timeout as err:
-            print(
-                f"[UDP] TimeoutError: Connection to {self._host}:{self._port} {err}."
-            )
-            self._socket.close()
+            sock = self._transport.open_state_channel(self._host, self._port)
+        except OSError as err:
+            print(f"[UDP] Connection to {self._host}:{self._port} {err}.")
             print(
                 "[UDP] Make sure you connected to robot network wireless/wired"
             )
-            sys.exit(1)
+            return False
+
+        self._socket = sock
+        return True
+
+    def _close_socket(self) -> None:
+        sock, self._socket = self._socket, None
+        if sock is not None:
+            sock.close()
 
-    def send(self, cmd) -> None:
-        self._socket.sendto(cmd, (self._host, self._port))
+    def send(self, cmd) -> bool:
+        """Send a command, returns False while the socket is down."""
+        sock = self._socket
+        if sock is None:
+            return False
+        try:
+            sock.send(cmd)
+        except OSError:
+            return False
+        return True
+
+    def add_receive_callback(
+        self, callback: Callable[[bytes, float], None]
+    ) -> None:
+        """Register a callback invoked on the receive thread.
+
+        Parameters
+        ----------
+
+        callback: Callable[[bytes, float], None]
+            Called with the received datagram and its receive time
+            (``time.monotonic()``) for every datagram.
+        """
+        with self._callbacks_lock:
+            self._receive_callbacks += (callback,)
+
+    def remove_receive_callback(
+        self, callback: Callable[[bytes, float], None]
+    ) -> None:
+        with self._callbacks_lock:
+            callbacks = list(self._receive_callbacks)
+            callbacks.remove(callback)
+            self._receive_callbacks = tuple(callbacks)
 
     def _receive_thread_func(self, event):
         print("Receive UDP thread: Started.")
+        delay = self._reconnect_min_delay
         while not event.is_set():
+            if self._socket is None and not self._connect():
+                event.wait(delay)
+                delay = min(delay * 2.0, self._reconnect_max_delay)
+                continue
+
             try:
-                self.received_bytes = self._socket.recv(2048)
-                # print(f"recv bytes: {self.received_bytes}\n")
-            except Exception as e:
+                data = self._socket.recv(2048)
+            except socket.timeout:
+                if self.receiving.is_set():
+                    print("[UDP] No state received, waiting for robot.")
+                self.receiving.clear()
+                continue
+            except OSError as e:
+                if event.is_set():
+                    break
+                # Link loss (e.g. Wi-Fi drop), reopen the socket.
                 print(f"Receive thread error: {e}")
+                self.receiving.clear()
+                self._close_socket()
+                event.wait(delay)
+                delay = min(delay * 2.0, self._reconnect_max_delay)
+                continue
+
+            delay = self._reconnect_min_delay
+            received_time = time.monotonic()
+            validator = self._validator
+            if validator is not None:
+                reason = validator.validate(data)
+                if reason is not None:
+                    if validator.rejected[reason] == 1:
+                        print(f"[UDP] Dropped a state frame: {reason}.")
+                    continue
+
+            self._latest = (data, received_time)
+            self.receiving.set()
+            # print(f"recv bytes: {self.received_bytes}\n")
+            # A failing callback must not starve the others (e.g. watchdog).
+            for callback in self._receive_callbacks:
+                try:
+                    callback(data, received_time)
+                except Exception as e:
+                    name = getattr(callback, "__qualname__", repr(callback))
+                    print(f"Receive thread error in {name}: {e}")
         print("Receive UDP thread: Stopped.")
 
     def disconnect(self) -> None:
-        self._socket.close()
         self._run_receive_thread.set()
+        self._close_socket()
         self._receive_thread.join()
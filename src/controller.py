@@ -0,0 +1,241 @@
+import math
+import threading
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from src.connections import Go1Mqtt
+from src.states import POSITION_OFFSET, YAW_OFFSET
+from src.trajectory import TrajectoryStatus
+from src.utils.codec import Buffer, get_struct
+from src.utils.common import clip
+from src.utils.custom_types import Velocity
+from src.utils.modes import Mode
+from src.validator import HIGH_STATE_SIZE
+
+# HighState.position x, y and HighState.imu.rpy yaw in the raw frame.
+_POSITION_STRUCT = get_struct("2f")
+_YAW_STRUCT = get_struct("f")
+
+
+class Goal(NamedTuple):
+    """A target in the odometry frame, ``yaw`` None keeps the heading."""
+
+    x: float
+    y: float
+    yaw: Optional[float] = None
+
+
+def wrap_angle(angle: float) -> float:
+    """Wrap an angle to [-pi, pi)."""
+    return (angle + math.pi) % (2.0 * math.pi) - math.pi
+
+
+class PositionController(object):
+    """Drive the robot to goals from the HighState odometry.
+
+    ``on_state`` runs on every received frame, it only decodes the position
+    and yaw and computes a proportional velocity command in the body frame.
+    Commands are in stick units (-1~1) and published at most every
+    ``command_period`` through the coalescing stick topic. Intermediate
+    waypoints are passed within ``pass_tolerance``, the last one must be
+    reached within the position and yaw tolerances.
+    """
+
+    def __init__(
+        self,
+        go1_mqttc: Go1Mqtt,
+        kp_linear: float = 1.0,
+        kp_yaw: float = 1.0,
+        max_linear: float = 0.5,
+        max_angular: float = 0.5,
+        position_tolerance: float = 0.05,
+        yaw_tolerance: float = 0.05,
+        command_period: float = 0.1,
+    ) -> None:
+        """Create a position controller.
+
+        Parameters
+        ----------
+
+        go1_mqttc: Go1Mqtt
+            The MQTT connection the commands are published through.
+        kp_linear: float
+            Linear command per meter of position error.
+        kp_yaw: float
+            Angular command per radian of yaw error.
+        max_linear: float
+            Maximum linear command (0~1).
+        max_angular: float
+            Maximum angular command (0~1).
+        position_tolerance: float
+            (unit: m) distance to consider the last goal reached.
+        yaw_tolerance: float
+            (unit: rad) yaw error to consider the last goal reached.
+        command_period: float
+            (unit: s) minimum period between two published commands.
+        """
+        self._go1_mqttc = go1_mqttc
+        self.kp_linear = kp_linear
+        self.kp_yaw = kp_yaw
+        self.max_linear = max_linear
+        self.max_angular = max_angular
+        self.position_tolerance = position_tolerance
+        self.yaw_tolerance = yaw_tolerance
+        self.command_period = command_period
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+        self._goals: Sequence[Goal] = ()
+        self._index = 0
+        self._pass_tolerance = 0.0
+        self._deadline = None
+        self._timeout = None
+        self._last_command_time = None
+
+        self.status = TrajectoryStatus.IDLE
+        self.pose: Optional[Tuple[float, float, float]] = None  # x, y, yaw
+
+    def go_to(
+        self,
+        x: float,
+        y: float,
+        yaw: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Go to a position of the odometry frame, see ``follow``."""
+        self.follow([Goal(x, y, yaw)], timeout=timeout)
+
+    def follow(
+        self,
+        goals: Sequence[Goal],
+        pass_tolerance: float = 0.2,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Follow waypoints, preempting the current goals.
+
+        Parameters
+        ----------
+
+        goals: Sequence[Goal]
+            Waypoints in the odometry frame, in order.
+        pass_tolerance: float
+            (unit: m) distance to pass an intermediate waypoint.
+        timeout: Optional[float]
+            Seconds before giving up, None never gives up.
+        """
+        if not goals:
+            return
+
+        self._go1_mqttc.switch_mode(Mode.walk)
+        with self._lock:
+            if self.status == TrajectoryStatus.RUNNING:
+                self.status = TrajectoryStatus.PREEMPTED
+                self._done.set()
+
+            self._goals = [Goal(*goal) for goal in goals]
+            self._index = 0
+            self._pass_tolerance = pass_tolerance
+            # The deadline starts with the next received frame.
+            self._timeout = timeout
+            self._deadline = None
+            self._last_command_time = None
+            self._done = threading.Event()
+            self.status = TrajectoryStatus.RUNNING
+
+    def cancel(self) -> None:
+        """Stop following the goals with a zero command."""
+        with self._lock:
+            if self.status != TrajectoryStatus.RUNNING:
+                return
+            self._finish(TrajectoryStatus.ABORTED)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the goals are reached or given up, False on timeout."""
+        return self._done.wait(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self.status == TrajectoryStatus.RUNNING
+
+    @property
+    def goal(self) -> Optional[Goal]:
+        with self._lock:
+            if self.status != TrajectoryStatus.RUNNING:
+                return None
+            return self._goals[self._index]
+
+    def _finish(self, status: TrajectoryStatus) -> None:
+        self._go1_mqttc.send_cmd_vel(Velocity(0.0, 0.0, 0.0))
+        self.status = status
+        self._done.set()
+
+    ###########################################
+    # Control loop
+    def on_state(self, frame: Buffer, timestamp: float) -> None:
+        """Compute the next command, a ``Go1UDP`` receive callback."""
+        if len(frame) != HIGH_STATE_SIZE:
+            return
+        x, y = _POSITION_STRUCT.unpack_from(frame, POSITION_OFFSET)
+        yaw = _YAW_STRUCT.unpack_from(frame, YAW_OFFSET)[0]
+        self.pose = (x, y, yaw)
+
+        with self._lock:
+            if self.status != TrajectoryStatus.RUNNING:
+                return
+
+            if self._deadline is None and self._timeout is not None:
+                self._deadline = timestamp + self._timeout
+            if self._deadline is not None and timestamp > self._deadline:
+                print("[Controller] Goal not reached before the timeout.")
+                self._finish(TrajectoryStatus.ABORTED)
+                return
+
+            cmd_vel = self._compute(x, y, yaw)
+            if cmd_vel is None:
+                self._finish(TrajectoryStatus.SUCCEEDED)
+                return
+
+            last_time = self._last_command_time
+            if (
+                last_time is not None
+                and timestamp - last_time < self.command_period
+            ):
+                return
+            self._last_command_time = timestamp
+
+        self._go1_mqttc.send_cmd_vel(cmd_vel)
+
+    def _compute(self, x: float, y: float, yaw: float) -> Optional[Velocity]:
+        """The command toward the current goal, None once reached."""
+        goal = self._goals[self._index]
+        dx = goal.x - x
+        dy = goal.y - y
+        distance = math.hypot(dx, dy)
+        last = self._index == len(self._goals) - 1
+
+        if not last and distance <= self._pass_tolerance:
+            self._index += 1
+            return self._compute(x, y, yaw)
+
+        yaw_error = 0.0
+        if last and goal.yaw is not None:
+            yaw_error = wrap_angle(goal.yaw - yaw)
+
+        if last and distance <= self.position_tolerance:
+            if abs(yaw_error) <= self.yaw_tolerance:
+                return None
+            vx = vy = 0.0
+        else:
+            # World frame error to the body frame.
+            cos_yaw = math.cos(yaw)
+            sin_yaw = math.sin(yaw)
+            vx = self.kp_linear * (cos_yaw * dx + sin_yaw * dy)
+            vy = self.kp_linear * (-sin_yaw * dx + cos_yaw * dy)
+            # Scale down keeping the direction.
+            speed = math.hypot(vx, vy)
+            if speed > self.max_linear:
+                vx *= self.max_linear / speed
+                vy *= self.max_linear / speed
+
+        wz = clip(self.kp_yaw * yaw_error, -self.max_angular, self.max_angular)
+        return Velocity(vx, vy, wz)
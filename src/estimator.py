@@ -0,0 +1,195 @@
+from typing import Callable, List
+
+import numpy as np
+
+from src.utils.codec import Buffer
+from src.utils.compact_types import HIGH_STATE_SIZE, field_offset
+from src.utils.custom_types import Cartesian, Odometry, Quaternion, Velocity
+
+GRAVITY = np.array([0.0, 0.0, 9.81])
+
+# Fields viewed in the frame as (dtype, count, offset), then copied into the
+# preallocated arrays without decoding them into Python objects.
+# quaternion, gyroscope, accelerometer and rpy.
+_IMU = ("<f4", 13, field_offset("imu"))
+_FOOT_FORCE = ("<u2", 4, field_offset("foot_force"))
+_VELOCITY = ("<f4", 3, field_offset("velocity"))
+# foot_position_to_body followed by foot_speed_to_body.
+_FEET = ("<f4", 24, field_offset("foot_position_to_body"))
+
+
+def quaternion_to_rotation(q: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Rotation matrix (body to world) of a (w, x, y, z) quaternion."""
+    w, x, y, z = q
+    out[0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    out[0, 1] = 2.0 * (x * y - w * z)
+    out[0, 2] = 2.0 * (x * z + w * y)
+    out[1, 0] = 2.0 * (x * y + w * z)
+    out[1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    out[1, 2] = 2.0 * (y * z - w * x)
+    out[2, 0] = 2.0 * (x * z - w * y)
+    out[2, 1] = 2.0 * (y * z + w * x)
+    out[2, 2] = 1.0 - 2.0 * (x * x + y * y)
+
+    return out
+
+
+class StateEstimator(object):
+    """Incremental odometry from IMU, leg kinematics and foot contact.
+
+    The body velocity is predicted by integrating the accelerometer and
+    corrected, with a complementary filter, by the leg odometry of the feet
+    in contact (``foot_force`` above a threshold). Without any contact the
+    robot reported ``velocity`` is used as the correction. The position is
+    the integral of the fused velocity in the world frame. The frame fields,
+    the state and the intermediate results are written with ``out=`` into
+    preallocated arrays, so ``update`` is O(1) and only creates the small
+    views of the fields in the frame, never new array data.
+    """
+
+    def __init__(
+        self,
+        contact_threshold: float = 20.0,
+        leg_odometry_gain: float = 0.2,
+        max_dt: float = 0.1,
+    ) -> None:
+        """Create a state estimator.
+
+        Parameters
+        ----------
+
+        contact_threshold: float
+            Foot force above which a foot is considered in stance.
+        leg_odometry_gain: float
+            Weight (0~1) of the leg odometry velocity at every update,
+            the remaining weight goes to the IMU prediction.
+        max_dt: float
+            Larger gaps between frames only integrate over ``max_dt``.
+        """
+        self.contact_threshold = contact_threshold
+        self.leg_odometry_gain = leg_odometry_gain
+        self.max_dt = max_dt
+
+        self.timestamp = None
+        self.position = np.zeros(3)
+        self.velocity = np.zeros(3)  # world frame
+        self.body_velocity = np.zeros(3)
+        self.quaternion = np.array([1.0, 0.0, 0.0, 0.0])
+        self.contacts = np.zeros(4, dtype=bool)
+
+        self._rotation = np.eye(3)
+        self._imu = np.zeros(13)
+        self._feet = np.zeros((2, 4, 3))
+        self._foot_force = np.zeros(4)
+        self._acceleration = np.zeros(3)
+        self._leg_velocity = np.zeros(3)
+
+        # Views and scratch arrays of update, created once.
+        self._feet_flat = self._feet.reshape(-1)
+        self._imu_quaternion = self._imu[0:4]
+        self._gyroscope = self._imu[4:7]
+        self._accelerometer = self._imu[7:10]
+        self._foot_positions = self._feet[0]
+        self._foot_speeds = self._feet[1]
+        self._rotation_t = self._rotation.T
+        self._gyroscope_skew = np.zeros((3, 3))
+        self._gyroscope_skew_t = self._gyroscope_skew.T
+        self._foot_velocities = np.zeros((4, 3))
+        self._contact_weights = np.zeros(4)
+        self._delta = np.zeros(3)
+        self._callbacks: List[Callable[["StateEstimator"], None]] = []
+
+    def add_callback(self, callback: Callable[["StateEstimator"], None]):
+        """Register a callback invoked after every update."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[["StateEstimator"], None]):
+        self._callbacks.remove(callback)
+
+    def reset(self) -> None:
+        self.timestamp = None
+        self.position[:] = 0.0
+        self.velocity[:] = 0.0
+        self.body_velocity[:] = 0.0
+
+    def update(self, frame: Buffer, timestamp: float) -> None:
+        """Fuse a raw HighState frame received at ``timestamp``.
+
+        Can be registered directly as a ``Go1UDP`` receive callback.
+        """
+        if len(frame) != HIGH_STATE_SIZE:
+            return
+
+        np.copyto(self._imu, np.frombuffer(frame, *_IMU))
+        np.copyto(self._foot_force, np.frombuffer(frame, *_FOOT_FORCE))
+        np.copyto(self._feet_flat, np.frombuffer(frame, *_FEET))
+
+        self.quaternion[:] = self._imu_quaternion
+        quaternion_to_rotation(self.quaternion, self._rotation)
+        np.greater(self._foot_force, self.contact_threshold, self.contacts)
+
+        if self.timestamp is None:
+            self.timestamp = timestamp
+            return
+        dt = min(max(timestamp - self.timestamp, 0.0), self.max_dt)
+        self.timestamp = timestamp
+
+        # Prediction: integrate gravity compensated acceleration.
+        np.dot(self._rotation, self._accelerometer, self._acceleration)
+        self._acceleration -= GRAVITY
+        np.multiply(self._acceleration, dt, self._delta)
+        self.velocity += self._delta
+
+        # Correction: leg odometry, v_body = -(v_foot + w x p_foot).
+        contacts = np.count_nonzero(self.contacts)
+        if contacts:
+            self._leg_odometry(contacts)
+        else:
+            np.copyto(self._leg_velocity, np.frombuffer(frame, *_VELOCITY))
+        np.dot(self._rotation, self._leg_velocity, self._delta)
+        self._delta -= self.velocity
+        self._delta *= self.leg_odometry_gain
+        self.velocity += self._delta
+
+        np.dot(self._rotation_t, self.velocity, self.body_velocity)
+        np.multiply(self.velocity, dt, self._delta)
+        self.position += self._delta
+
+        for callback in self._callbacks:
+            callback(self)
+
+    def _leg_odometry(self, contacts: int) -> None:
+        """Mean body velocity of the ``contacts`` feet in stance.
+
+        Computed for every foot and averaged with the contact weights,
+        instead of selecting the stance feet with a boolean mask, which
+        would allocate new arrays.
+        """
+        # w x p as p @ skew(w).T for the 4 feet at once.
+        wx, wy, wz = self._gyroscope
+        skew = self._gyroscope_skew
+        skew[0, 1], skew[0, 2] = -wz, wy
+        skew[1, 0], skew[1, 2] = wz, -wx
+        skew[2, 0], skew[2, 1] = -wy, wx
+        np.dot(
+            self._foot_positions, self._gyroscope_skew_t, self._foot_velocities
+        )
+        self._foot_velocities += self._foot_speeds
+
+        np.divide(self.contacts, -contacts, self._contact_weights)
+        np.dot(
+            self._contact_weights, self._foot_velocities, self._leg_velocity
+        )
+
+    @property
+    def yaw(self) -> float:
+        return float(np.arctan2(self._rotation[1, 0], self._rotation[0, 0]))
+
+    def odometry(self) -> Odometry:
+        """Copy of the current estimate."""
+        return Odometry(
+            self.timestamp,
+            Cartesian(*self.position.tolist()),
+            Velocity(*self.body_velocity.tolist()),
+            Quaternion(*self.quaternion.tolist()),
+        )
@@ -0,0 +1,305 @@
+import sys
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
+
+from src.utils.common import (byte_print, decode_sn, decode_version,
+                              sum_total_voltage)
+
+if TYPE_CHECKING:
+    from src.states import HighState
+
+# The HighState fields in frame order.
+STATE_FIELDS = (
+    "head",
+    "level_flag",
+    "frame_reserve",
+    "SN",
+    "version",
+    "bandwidth",
+    "imu",
+    "motor_states",
+    "bms",
+    "foot_force",
+    "foot_force_est",
+    "mode",
+    "progress",
+    "gait_type",
+    "foot_raise_height",
+    "position",
+    "body_height",
+    "velocity",
+    "yaw_speed",
+    "range_obstacle",
+    "foot_position_to_body",
+    "foot_speed_to_body",
+    "wireless_remote",
+    "reserve",
+    "crc",
+)
+
+_RULE = "+=" * 33 + "\n"
+_LABELS = {
+    "head": "Head:\t\t\t",
+    "level_flag": "Level Flag:\t\t",
+    "frame_reserve": "Frame Reserve:\t\t",
+    "bandwidth": "Bandwidth:\t\t",
+    "foot_force": "Foot Force:\t\t",
+    "foot_force_est": "Foot Force Est:\t\t",
+    "mode": "Mode:\t\t\t",
+    "progress": "Progress:\t\t",
+    "gait_type": "Gait Type:\t\t",
+    "foot_raise_height": "Foot Raise Height:\t",
+    "position": "Position:\t\t",
+    "body_height": "Body Height:\t\t",
+    "velocity": "Velocity:\t\t",
+    "yaw_speed": "Yaw Speed:\t\t",
+    "range_obstacle": "Range Obstacle:\t\t",
+    "wireless_remote": "Wireless Remote:\t",
+    "reserve": "Reserve:\t\t",
+    "crc": "CRC:\t\t\t",
+}
+_LEGS = ("front_right", "front_left", "rear_right", "rear_left")
+# Format strings of float tuples by length, built on first use.
+_FLOAT_FORMATS: Dict[int, str] = {}
+
+
+def format_floats(values: Sequence[float]) -> str:
+    fmt = _FLOAT_FORMATS.get(len(values))
+    if fmt is None:
+        fmt = "(" + ", ".join(["{:.4f}"] * len(values)) + ")"
+        _FLOAT_FORMATS[len(values)] = fmt
+    return fmt.format(*values)
+
+
+def format_value(value) -> str:
+    """Short text of a state value, floats with 4 decimals."""
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return byte_print(value)
+    if isinstance(value, tuple):
+        if value and all(isinstance(v, float) for v in value):
+            return format_floats(value)
+        return "(" + ", ".join(format_value(v) for v in value) + ")"
+    if isinstance(value, list):
+        return format_value(tuple(value))
+    return str(value)
+
+
+def field_getter(path: str) -> Callable[["HighState"], object]:
+    """Build a getter for a dotted HighState field, e.g. ``imu.rpy``.
+
+    Integer parts index sequences, e.g. ``motor_states.3.temperature``.
+    """
+    parts = [int(part) if part.isdigit() else part for part in path.split(".")]
+
+    def getter(state: "HighState") -> object:
+        value = state
+        for part in parts:
+            value = (
+                value[part] if isinstance(part, int) else getattr(value, part)
+            )
+        return value
+
+    return getter
+
+
+class StateFormatter(object):
+    """Render ``HighState`` as text, built once and written at once.
+
+    The full mode follows the former ``print_states`` layout, the compact
+    mode puts ``name=value`` pairs on a single line. ``fields`` selects the
+    state fields or dotted paths (e.g. ``imu.rpy``) to render. The serial
+    number and version are decoded once and reused while they do not
+    change.
+    """
+
+    def __init__(
+        self, fields: Optional[Sequence[str]] = None, compact: bool = False
+    ) -> None:
+        """Create a state formatter.
+
+        Parameters
+        ----------
+
+        fields: Optional[Sequence[str]]
+            Fields to render, all the ``STATE_FIELDS`` by default.
+        compact: bool
+            Render a single line instead of the multi-line layout.
+        """
+        self.fields = list(STATE_FIELDS if fields is None else fields)
+        self.compact = compact
+
+        self._parts: List[str] = []
+        self._static: Dict[str, tuple] = {}
+        self._renderers = [self._renderer(field) for field in self.fields]
+
+    def _renderer(self, field: str) -> Callable[["HighState"], str]:
+        if self.compact:
+            special = {
+                "SN": lambda s: "SN=" + self._decoded("SN", s.SN)[1],
+                "version": lambda s: (
+                    "version=" + self._decoded("version", s.version)[1]
+                ),
+                "motor_states": self._compact_motors,
+                "bms": self._compact_bms,
+            }
+        else:
+            special = {
+                "SN": self._full_sn,
+                "version": self._full_version,
+                "imu": self._full_imu,
+                "motor_states": self._full_motors,
+                "bms": self._full_bms,
+                "foot_position_to_body": lambda s: self._full_legs(
+                    "Foot Position to Body\n", s.foot_position_to_body
+                ),
+                "foot_speed_to_body": lambda s: self._full_legs(
+                    "Foot Speed to Body\n", s.foot_speed_to_body
+                ),
+            }
+        if field in special:
+            return special[field]
+
+        getter = field_getter(field)
+        if self.compact:
+            prefix = field + "="
+            return lambda s: prefix + format_value(getter(s))
+
+        label = _LABELS.get(field, field + ":\t\t")
+        return lambda s: label + format_value(getter(s)) + "\n"
+
+    ###########################################
+    # Static fields
+    def _decoded(self, name: str, raw) -> tuple:
+        """The ``(hex, decoded)`` text of a static field, cached."""
+        cached = self._static.get(name)
+        if cached is not None and cached[0] == raw:
+            return cached[1:]
+
+        decode = decode_sn if name == "SN" else decode_version
+        raw = bytes(raw)
+        try:
+            decoded = ", ".join(decode(raw))
+        except ValueError:
+            decoded = "unknown"
+        self._static[name] = (raw, byte_print(raw), decoded)
+        return self._static[name][1:]
+
+    def _full_sn(self, state: "HighState") -> str:
+        hex_text, decoded = self._decoded("SN", state.SN)
+        return f"SN [{hex_text}]:\t{decoded}\n"
+
+    def _full_version(self, state: "HighState") -> str:
+        hex_text, decoded = self._decoded("version", state.version)
+        return f"Ver [{hex_text}]:\t{decoded}\n"
+
+    ###########################################
+    # Nested fields
+    def _full_imu(self, state: "HighState") -> str:
+        imu = state.imu
+        return (
+            "IMU\n"
+            f"\tQuaternion:\t{format_floats(imu.quaternion)}\n"
+            f"\tGyroscope:\t{format_floats(imu.gyroscope)}\n"
+            f"\tAccelerometer:\t{format_floats(imu.accelerometer)}\n"
+            f"\tRPY:\t\t{format_floats(imu.rpy)}\n"
+            f"\tTemp.:\t\t{imu.temperature}\n"
+        )
+
+    def _full_motors(self, state: "HighState") -> str:
+        return "Motor State\n" + "".join(
+            f"\t{idx} | mode:{motor.mode} q:{motor.q:.5f} "
+            f"dq:{motor.dq:.5f} temp:{motor.temperature}\n"
+            for idx, motor in enumerate(state.motor_states)
+        )
+
+    def _compact_motors(self, state: "HighState") -> str:
+        # Only the first 12 motors are valid.
+        temps = ",".join(
+            str(motor.temperature) for motor in state.motor_states[:12]
+        )
+        return f"motor_temp=({temps})"
+
+    def _full_bms(self, state: "HighState") -> str:
+        bms = state.bms
+        return (
+            "Battery Management System\n"
+            f"\tSOC:\t\t{bms.SOC} %\n"
+            f"\tVoltage:\t{sum_total_voltage(bms.cell_vol)} volt\n"
+            f"\tCurrent:\t{bms.current} mA\n"
+            f"\tCycles:\t\t{bms.cycle}\n"
+            f"\tTemps BQ:\t{bms.BQ_NTC[0]} °C, {bms.BQ_NTC[1]}°C\n"
+            f"\tTemps MCU:\t{bms.MCU_NTC[0]} °C, {bms.MCU_NTC[1]}°C\n"
+        )
+
+    def _compact_bms(self, state: "HighState") -> str:
+        bms = state.bms
+        return (
+            f"SOC={bms.SOC} "
+            f"voltage={sum_total_voltage(bms.cell_vol):.2f} "
+            f"current={bms.current}"
+        )
+
+    def _full_legs(self, title: str, legs) -> str:
+        return title + "".join(
+            f"\t{name}:\t{format_floats(leg)}\n"
+            for name, leg in zip(_LEGS, legs)
+        )
+
+    ###########################################
+    # Output
+    def format(self, state: "HighState") -> str:
+        """Render ``state`` to text, ends with a newline."""
+        if getattr(state, "crc", None) is None:
+            return "No HighState received yet.\n"
+
+        parts = self._parts
+        parts.clear()
+        for render in self._renderers:
+            parts.append(render(state))
+
+        if self.compact:
+            return " ".join(parts) + "\n"
+        return _RULE + "".join(parts) + _RULE
+
+    def write(self, state: "HighState", stream=None) -> None:
+        """Write the rendered ``state`` with a single write and flush."""
+        stream = sys.stdout if stream is None else stream
+        stream.write(self.format(state))
+        stream.flush()
+
+
+class TerminalDashboard(object):
+    """Redraw a block of text in place on an ANSI terminal.
+
+    The cursor goes home and every line clears its own tail instead of
+    clearing the whole screen, which avoids flicker. A frame is one write.
+    """
+
+    def __init__(self, stream=None) -> None:
+        self._stream = sys.stdout if stream is None else stream
+        self._started = False
+
+    def draw(self, text: str) -> None:
+        prefix = "\x1b[?25l\x1b[2J\x1b[H" if not self._started else "\x1b[H"
+        self._started = True
+        body = text.rstrip("\n").replace("\n", "\x1b[K\n")
+        # Clear the rest of the screen, the text may have shrunk.
+        self._stream.write(prefix + body + "\x1b[K\n\x1b[J")
+        self._stream.flush()
+
+    def close(self) -> None:
+        if self._started:
+            # Show the cursor again.
+            self._stream.write("\x1b[?25h")
+            self._stream.flush()
+            self._started = False
+
+    def __enter__(self) -> "TerminalDashboard":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
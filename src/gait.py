@@ -0,0 +1,263 @@
+import threading
+from enum import Enum
+from typing import Callable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from src.utils.codec import Buffer, get_struct
+from src.utils.compact_types import HIGH_STATE_SIZE, field_offset
+from src.utils.custom_types import FootForce
+
+FEET = FootForce._fields  # front_right, front_left, rear_right, rear_left
+
+_FOOT_FORCE_STRUCT = get_struct("4H")
+_FOOT_FORCE_OFFSET = field_offset("foot_force")
+
+
+class ContactEventType(Enum):
+    TOUCHDOWN = 0
+    LIFTOFF = 1
+
+
+class ContactEvent(NamedTuple):
+    timestamp: float
+    foot: str
+    type: ContactEventType
+    force: float
+
+
+class GaitState(NamedTuple):
+    """Represent the contact state and gait of the four feet."""
+
+    timestamp: float
+    contacts: Tuple[bool, bool, bool, bool]
+    phase: Tuple[float, float, float, float]  # 0 at touchdown, 0~1
+    frequency: float  # (unit: Hz) strides per second, 0 when not walking
+    duty_factor: float  # stance duration / stride period
+
+
+class GaitDetector(object):
+    """Incremental foot contact and gait phase detection.
+
+    Every frame the foot forces go into a per-foot ring and are classified
+    stance or swing with hysteresis: a foot touches down above
+    ``touchdown_threshold`` and lifts off below ``liftoff_threshold``. On
+    the edges, the stride period (between touchdowns) and the stance
+    duration are smoothed per foot to get the gait frequency and duty
+    factor. The per-frame work is a fixed number of NumPy operations, the
+    Python code only runs on contact changes.
+    """
+
+    def __init__(
+        self,
+        touchdown_threshold: float = 30.0,
+        liftoff_threshold: float = 15.0,
+        history_size: int = 256,
+        smoothing: float = 0.3,
+        max_period: float = 2.0,
+    ) -> None:
+        """Create a gait detector.
+
+        Parameters
+        ----------
+
+        touchdown_threshold: float
+            Foot force above which a swinging foot touches down.
+        liftoff_threshold: float
+            Foot force below which a foot in stance lifts off.
+        history_size: int
+            Number of frames kept in the per-foot ring.
+        smoothing: float
+            Weight (0~1) of a new stride in the period and duty estimates.
+        max_period: float
+            (unit: s) without touchdown for that long a foot is not walking.
+        """
+        if liftoff_threshold > touchdown_threshold:
+            raise ValueError(
+                "liftoff_threshold must not exceed touchdown_threshold."
+            )
+        self.touchdown_threshold = touchdown_threshold
+        self.liftoff_threshold = liftoff_threshold
+        self.smoothing = smoothing
+        self.max_period = max_period
+
+        self._lock = threading.Lock()
+        self._times = np.zeros(history_size)
+        self._forces = np.zeros((history_size, 4))
+        self._contacts = np.zeros((history_size, 4), dtype=bool)
+        self._index = 0
+        self._count = 0
+
+        self.timestamp = None
+        self.contacts = np.zeros(4, dtype=bool)
+        self._touchdown = np.zeros(4, dtype=bool)
+        self._liftoff = np.zeros(4, dtype=bool)
+        self._scratch = np.zeros(4, dtype=bool)
+        self._touchdown_time = np.full(4, np.nan)
+        self._period = np.full(4, np.nan)
+        self._duty = np.full(4, np.nan)
+        self._callbacks: List[Callable[[ContactEvent], None]] = []
+
+    def add_callback(self, callback: Callable[[ContactEvent], None]) -> None:
+        """Call ``callback(event)`` on every touchdown and liftoff."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[ContactEvent], None]):
+        self._callbacks.remove(callback)
+
+    def update(self, frame: Buffer, timestamp: float) -> None:
+        """Classify the feet of a raw HighState frame.
+
+        Can be registered directly as a ``Go1UDP`` receive callback.
+        """
+        if len(frame) != HIGH_STATE_SIZE:
+            return
+
+        with self._lock:
+            idx = self._index
+            force = self._forces[idx]
+            force[:] = _FOOT_FORCE_STRUCT.unpack_from(
+                frame, _FOOT_FORCE_OFFSET
+            )
+            self._times[idx] = timestamp
+            first = self.timestamp is None
+            self.timestamp = timestamp
+
+            if first:
+                # Feet already in stance did not touch down now.
+                np.greater(force, self.touchdown_threshold, out=self.contacts)
+                self._touchdown[:] = False
+                self._liftoff[:] = False
+
+            # Hysteresis: touchdown from swing, liftoff from stance.
+            contacts = self.contacts
+            scratch = self._scratch
+            np.logical_not(contacts, out=scratch)
+            np.greater(force, self.touchdown_threshold, out=self._touchdown)
+            self._touchdown &= scratch
+            np.less(force, self.liftoff_threshold, out=self._liftoff)
+            self._liftoff &= contacts
+            contacts ^= self._touchdown
+            contacts ^= self._liftoff
+
+            self._contacts[idx] = contacts
+            self._index = (idx + 1) % len(self._times)
+            self._count = min(self._count + 1, len(self._times))
+
+            if not (self._touchdown.any() or self._liftoff.any()):
+                return
+            events = self._on_edges(force, timestamp)
+
+        # A raising callback must not drop the events of the other feet.
+        for event in events:
+            for callback in self._callbacks:
+                try:
+                    callback(event)
+                except Exception as e:
+                    name = getattr(callback, "__qualname__", repr(callback))
+                    print(f"[Gait] Error in {name}: {e}")
+
+    def _smooth(self, values: np.ndarray, foot: int, value: float) -> None:
+        if np.isnan(values[foot]):
+            values[foot] = value
+        else:
+            values[foot] += self.smoothing * (value - values[foot])
+
+    def _on_edges(self, force: np.ndarray, timestamp: float):
+        events = []
+        for foot in np.flatnonzero(self._touchdown):
+            period = timestamp - self._touchdown_time[foot]
+            if period <= self.max_period:
+                self._smooth(self._period, foot, period)
+            self._touchdown_time[foot] = timestamp
+            events.append(
+                ContactEvent(
+                    timestamp,
+                    FEET[foot],
+                    ContactEventType.TOUCHDOWN,
+                    float(force[foot]),
+                )
+            )
+
+        for foot in np.flatnonzero(self._liftoff):
+            stance = timestamp - self._touchdown_time[foot]
+            period = self._period[foot]
+            if stance <= self.max_period and not np.isnan(period):
+                self._smooth(self._duty, foot, min(stance / period, 1.0))
+            events.append(
+                ContactEvent(
+                    timestamp,
+                    FEET[foot],
+                    ContactEventType.LIFTOFF,
+                    float(force[foot]),
+                )
+            )
+
+        return events
+
+    ###########################################
+    # Estimates
+    def _walking(self) -> np.ndarray:
+        """Feet with a stride period that touched down recently."""
+        if self.timestamp is None:
+            return np.zeros(4, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            return (self.timestamp - self._touchdown_time) <= self.max_period
+
+    @property
+    def frequency(self) -> float:
+        with self._lock:
+            walking = self._walking() & ~np.isnan(self._period)
+            if not walking.any():
+                return 0.0
+            return float(np.mean(1.0 / self._period[walking]))
+
+    @property
+    def duty_factor(self) -> float:
+        with self._lock:
+            walking = self._walking() & ~np.isnan(self._duty)
+            if not walking.any():
+                return 1.0 if self.contacts.all() else 0.0
+            return float(np.mean(self._duty[walking]))
+
+    @property
+    def phase(self) -> np.ndarray:
+        with self._lock:
+            if self.timestamp is None:
+                return np.zeros(4)
+            elapsed = self.timestamp - self._touchdown_time
+            phase = np.clip(elapsed / self._period, 0.0, 1.0)
+            phase[~self._walking() | np.isnan(phase)] = 0.0
+            return phase
+
+    def state(self) -> GaitState:
+        """Copy of the current contact and gait estimate."""
+        phase = self.phase
+        return GaitState(
+            self.timestamp,
+            tuple(self.contacts.tolist()),
+            tuple(phase.tolist()),
+            self.frequency,
+            self.duty_factor,
+        )
+
+    def history(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The ``(times, forces, contacts)`` in the ring, oldest first."""
+        with self._lock:
+            order = np.arange(self._index - self._count, self._index)
+            order %= len(self._times)
+            return (
+                self._times[order],
+                self._forces[order],
+                self._contacts[order],
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = 0
+            self._count = 0
+            self.timestamp = None
+            self.contacts[:] = False
+            self._touchdown_time[:] = np.nan
+            self._period[:] = np.nan
+            self._duty[:] = np.nan
@@ -1,13 +1,30 @@
 import threading
 import time
+from typing import (TYPE_CHECKING, Callable, Iterable, Optional, Sequence,
+                    Tuple, Union)
 
-from src.camera import Go1Camera
 from src.command import HighCmd
 from src.config import Config
 from src.connections import Go1Mqtt, Go1UDP
+from src.controller import Goal, PositionController
+from src.formatter import StateFormatter
+from src.link_monitor import LinkMonitor, LinkQuality
+from src.program import ProgramRunner, ProgramStatus, RobotProgram
+from src.publisher import MqttPublisher
+from src.remote import WirelessRemote
 from src.states import HighState
-from src.utils.custom_types import LED, Pose, Velocity
+from src.subscriber import MqttSubscriber
+from src.trajectory import Setpoint, TrajectoryExecutor, Waypoint
+from src.transport import create_transport
+from src.utils.custom_types import LED, BMSState, Pose, Velocity
 from src.utils.modes import Mode
+from src.utils.topics import PubTopic, SubTopic
+from src.validator import FrameValidator
+
+if TYPE_CHECKING:
+    from src.camera import Go1Camera
+
+POLLING_PERIOD = 0.1  # (unit: s) HighCmd keep-alive and polling period.
 
 
 class Go1(object):
@@ -16,24 +33,52 @@ class Go1(object):
 
         self._init_com()
         self.high_state = HighState()
+        self._init_history()
+        self._init_estimator()
+        self._init_gait()
         self._init_cam()
+        self._init_streaming()
+        self._init_trajectory()
+        self._init_program()
+        self._init_controller()
+        self._init_watchdog()
+        # Adapts the polling, the watchdog and the cameras, created last.
+        self._init_link_monitor()
+        self._init_remote()
+        self._init_telemetry()
+        self._init_clock()
 
     def _init_com(self) -> None:
         """Init communication network with Go1 robot."""
         # MQTT for send high level command.
+        # Both connect in the background and reconnect on link loss.
+        self.transport = create_transport(self._config.transport)
         self._go1_mqttc = Go1Mqtt(
             self._config.go1_host,
             self._config.go1_mqttc_port,
             self._config.go1_mqttc_keepalive,
+            reconnect_min_delay=self._config.reconnect_min_delay,
+            reconnect_max_delay=self._config.reconnect_max_delay,
+            transport=self.transport,
         )
 
         # UDP for receiving high level state.
+        self.validator = None
+        if self._config.state_validation_enable:
+            self.validator = FrameValidator(
+                check_crc=self._config.state_validation_crc
+            )
         self._go1_udp = Go1UDP(
             self._config.go1_host,
             self._config.go1_udp_port_high,
+            reconnect_min_delay=self._config.reconnect_min_delay,
+            reconnect_max_delay=self._config.reconnect_max_delay,
+            validator=self.validator,
+            transport=self.transport,
         )
 
         self._debug = False
+        self._polling_period = POLLING_PERIOD
         self._polling = threading.Event()
         self._polling_states_thread = threading.Thread(
             target=self._polling_states_thread_func,
@@ -44,60 +89,340 @@ class Go1(object):
         )
         self._polling_states_thread.start()
 
+    def _init_history(self) -> None:
+        """Keep a time-indexed history of the received HighState frames."""
+        self.history = None
+        if self._config.state_history_size <= 0:
+            return
+
+        # Imported lazily, NumPy is only needed when the feature is enabled.
+        from src.history import StateHistory
+
+        self.history = StateHistory(self._config.state_history_size)
+        self._go1_udp.add_receive_callback(self.history.append)
+
+    def _init_estimator(self) -> None:
+        """Run the odometry estimator on every received HighState frame."""
+        self.estimator = None
+        if not self._config.estimator_enable:
+            return
+
+        from src.estimator import StateEstimator
+
+        self.estimator = StateEstimator(
+            contact_threshold=self._config.estimator_contact_threshold,
+            leg_odometry_gain=self._config.estimator_leg_odometry_gain,
+        )
+        self._go1_udp.add_receive_callback(self.estimator.update)
+
+    def _init_gait(self) -> None:
+        """Detect foot contacts and the gait phase on every frame."""
+        self.gait = None
+        if not self._config.gait_enable:
+            return
+
+        from src.gait import GaitDetector
+
+        self.gait = GaitDetector(
+            touchdown_threshold=self._config.gait_touchdown_threshold,
+            liftoff_threshold=self._config.gait_liftoff_threshold,
+        )
+        self._go1_udp.add_receive_callback(self.gait.update)
+
     def _init_cam(self) -> None:
+        self._cameras = []
         if not self._config.camera_enable:
             return
 
-        self.cam_front = Go1Camera(
-            host=self._config.pc_host, port=self._config.port_front
+        # Every camera connects concurrently on its own capturing thread.
+        # Head Nano: front and jaw, body Nanos: sides and belly.
+        self.cam_front = self._create_camera(self._config.port_front, "nano1")
+        self.cam_jaw = self._create_camera(self._config.port_jaw, "nano1")
+        self.cam_left = self._create_camera(self._config.port_left, "nano2")
+        self.cam_right = self._create_camera(self._config.port_right, "nano2")
+        self.cam_belly = self._create_camera(self._config.port_belly, "nano3")
+
+    def _create_camera(self, port: int, source: str) -> "Go1Camera":
+        # Imported lazily, OpenCV is only needed when cameras are enabled.
+        from src.camera import Go1Camera
+
+        camera = Go1Camera(
+            host=self._config.pc_host,
+            port=port,
+            reconnect_min_delay=self._config.reconnect_min_delay,
+            reconnect_max_delay=self._config.reconnect_max_delay,
+            source=source,
+        )
+        self._cameras.append(camera)
+
+        return camera
+
+    def _init_streaming(self) -> None:
+        """Serve the cameras to remote viewers over HTTP."""
+        self.streaming = None
+        if not self._config.streaming_enable or not self._cameras:
+            return
+
+        from src.streaming import MjpegServer
+
+        cameras = {
+            "front": self.cam_front,
+            "jaw": self.cam_jaw,
+            "left": self.cam_left,
+            "right": self.cam_right,
+            "belly": self.cam_belly,
+        }
+        self.streaming = MjpegServer(
+            cameras,
+            host=self._config.streaming_host,
+            port=self._config.streaming_port,
+            qualities=self._config.streaming_qualities,
+            max_fps=self._config.streaming_max_fps,
+        )
+
+    def _init_link_monitor(self) -> None:
+        """Lower telemetry and command rates when the link saturates."""
+        self.link_monitor = None
+        if not self._config.link_monitor_enable:
+            return
+
+        self.link_monitor = LinkMonitor(
+            self._go1_mqttc.publisher,
+            max_loss=self._config.link_monitor_max_loss,
+            max_latency=self._config.link_monitor_max_latency,
         )
-        self.cam_jaw = Go1Camera(
-            host=self._config.pc_host, port=self._config.port_jaw
+        self._go1_udp.add_receive_callback(self.link_monitor.on_state)
+        self.link_monitor.add_adapter(self._adapt_to_link)
+
+    def _init_trajectory(self) -> None:
+        """Stream trajectories at the configured publish frequency."""
+        self.trajectory = TrajectoryExecutor(
+            self._go1_mqttc,
+            rate=1000.0 / self._config.go1_mqttc_pub_freq,
         )
-        self._go1_cam_left = Go1Camera(
-            host=self._config.pc_host, port=self._config.port_left
+
+    def _init_program(self) -> None:
+        """Upload and follow motion programs executed on the robot."""
+        self.program = ProgramRunner(self._go1_mqttc)
+
+    def _init_controller(self) -> None:
+        """Run the position controller on every received HighState frame."""
+        self.controller = PositionController(
+            self._go1_mqttc,
+            kp_linear=self._config.controller_kp_linear,
+            kp_yaw=self._config.controller_kp_yaw,
+            max_linear=self._config.controller_max_linear,
+            max_angular=self._config.controller_max_angular,
+            position_tolerance=self._config.controller_position_tolerance,
+            yaw_tolerance=self._config.controller_yaw_tolerance,
+            command_period=self._config.go1_mqttc_pub_freq / 1000.0,
+        )
+        self._go1_udp.add_receive_callback(self.controller.on_state)
+
+    def _init_watchdog(self) -> None:
+        """Stop the robot when a safety rule fails, checked every frame."""
+        self.watchdog = None
+        if not self._config.watchdog_enable:
+            return
+
+        from src.watchdog import SafetyAction, SafetyRule, SafetyWatchdog
+
+        rules = {
+            name: SafetyRule(limit, SafetyAction[action.upper()])
+            for name, (limit, action) in self._config.watchdog_rules.items()
+        }
+        self.watchdog = SafetyWatchdog(self._go1_mqttc, rules)
+        self.watchdog.add_callback(self._on_safety_event)
+        self._go1_udp.add_receive_callback(self.watchdog.on_state)
+
+    def _on_safety_event(self, event) -> None:
+        # Nothing may keep streaming commands after the safety action.
+        if event.action > 0:
+            self.controller.cancel()
+            self.trajectory.abort()
+
+    def _init_remote(self) -> None:
+        """Decode the wireless remote events on every received frame."""
+        self.remote = WirelessRemote()
+        self._go1_udp.add_receive_callback(self.remote.on_state)
+
+    def _init_telemetry(self) -> None:
+        """Forward the received frames to a base station."""
+        self.telemetry = None
+        if not self._config.telemetry_enable:
+            return
+
+        from src.telemetry import TelemetryForwarder
+
+        self.telemetry = TelemetryForwarder(
+            self._config.telemetry_host,
+            self._config.telemetry_port,
+            rate=self._config.telemetry_rate,
+            keyframe_interval=self._config.telemetry_keyframe_interval,
+            level=self._config.telemetry_level,
         )
-        self._go1_cam_right = Go1Camera(
-            host=self._config.pc_host, port=self._config.port_right
+        self._go1_udp.add_receive_callback(self.telemetry.on_state)
+
+    def _init_clock(self) -> None:
+        """Estimate the clock and latency of every robot computer."""
+        self.clock = None
+        if not self._config.clock_enable:
+            return
+
+        from src.clock import ClockSync
+
+        hosts = {"go1": self._config.go1_host}
+        hosts.update(self._config.nano_hosts)
+        self.clock = ClockSync(
+            hosts,
+            port=self._config.clock_port,
+            period=self._config.clock_period,
         )
-        self._go1_cam_belly = Go1Camera(
-            host=self._config.pc_host, port=self._config.port_belly
+
+    def _adapt_to_link(self, quality: LinkQuality) -> None:
+        # 1x, 2x and 4x slower from GOOD to CONGESTED.
+        scale = 2**quality
+        self._polling_period = POLLING_PERIOD * scale
+        # The robot replies once per keep-alive, the state interval follows.
+        self.link_monitor.set_expected_interval(self._polling_period)
+        if self.watchdog is not None:
+            self.watchdog.scale_state_timeout(scale)
+
+        stick_interval = 0.0
+        if quality != LinkQuality.GOOD:
+            stick_interval = self._config.go1_mqttc_pub_freq * scale / 2000.0
+        self._go1_mqttc.publisher.set_min_interval(
+            PubTopic.stick, stick_interval
         )
 
+        # Camera resolution is set on the Jetson Nanos, skip decoding instead.
+        for camera in self._cameras:
+            camera.frame_skip = scale - 1
+
+    def ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until MQTT is connected, states and camera frames arrive.
+
+        Parameters
+        ----------
+
+        timeout: Optional[float]
+            Maximum time to wait in seconds, None waits forever.
+
+        Returns False if any of them is not ready before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        events = [
+            ("MQTT", self._go1_mqttc.connected),
+            ("UDP", self._go1_udp.receiving),
+        ]
+        events += [
+            (f"Camera {idx}", cam.ready)
+            for idx, cam in enumerate(self._cameras)
+        ]
+
+        for name, event in events:
+            remaining = (
+                None
+                if deadline is None
+                else max(deadline - time.monotonic(), 0.0)
+            )
+            if not event.wait(remaining):
+                print(f"[Go1] {name} not ready after {timeout} seconds.")
+                return False
+
+        return True
+
+    def add_state_callback(
+        self, callback: Callable[[bytes, float], None]
+    ) -> None:
+        """Call ``callback(frame, timestamp)`` for every received frame."""
+        self._go1_udp.add_receive_callback(callback)
+
+    def remove_state_callback(
+        self, callback: Callable[[bytes, float], None]
+    ) -> None:
+        self._go1_udp.remove_receive_callback(callback)
+
+    def latest_frame(self) -> Tuple[Optional[bytes], Optional[float]]:
+        """The last received raw HighState frame and its receive time."""
+        return self._go1_udp.latest()
+
+    def state_time(
+        self, receive_time: Optional[float] = None
+    ) -> Optional[float]:
+        """Estimated send time of a HighState, the latest one by default.
+
+        The receive time minus the one-way latency to the robot, the same
+        as the receive time without clock synchronization.
+        """
+        if receive_time is None:
+            receive_time = self._go1_udp.received_time
+        if receive_time is None or self.clock is None:
+            return receive_time
+        return self.clock.correct("go1", receive_time)
+
+    def frame_time(self, camera: "Go1Camera") -> Optional[float]:
+        """Estimated send time of the latest frame of a camera.
+
+        Only the network latency is removed, the encoding and decoding
+        delays of the video stream are not observable.
+        """
+        receive_time = camera.latest_frame_time
+        if receive_time is None or self.clock is None:
+            return receive_time
+        return self.clock.correct(camera.source, receive_time)
+
     def _polling_states_thread_func(self, event, debug: bool) -> None:
         high_cmd = HighCmd()
         cmd_bytes = high_cmd.build_cmd()
-        self._go1_udp.send(cmd_bytes)
-        time.sleep(0.5)
+
+        formatter = StateFormatter() if debug else None
+        last_time = None
 
         print("Polling States Thread: Started.")
         while not event.is_set():
             self._go1_udp.send(cmd_bytes)
-            self.high_state.parse_data(self._go1_udp.received_bytes)
 
-            if debug:
-                self.high_state.print_states()
+            # Only decode a frame once, nothing may have arrived since.
+            frame, received_time = self._go1_udp.latest()
+            if received_time != last_time:
+                last_time = received_time
+                self.high_state.parse_data(frame)
+                if formatter is not None:
+                    formatter.write(self.high_state)
 
-            time.sleep(0.1)
+            event.wait(self._polling_period)
 
         print("Polling States Thread: Stopped.")
 
     def close_all_connection(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.close()
+
+        # Stop the robot before the MQTT connection goes away.
+        self.controller.cancel()
+        self.trajectory.abort()
+        self._go1_mqttc.flush(timeout=1.0)
+
+        if self.link_monitor is not None:
+            self.link_monitor.close()
+
         self._polling.set()
         self._polling_states_thread.join()
 
         self._go1_mqttc.disconnect()
         self._go1_udp.disconnect()
+        self.transport.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.clock is not None:
+            self.clock.close()
 
         # Close all camera
-        if not self._config.camera_enable:
-            return
-
-        self.cam_front.close()
-        self.cam_jaw.close()
-        self.cam_left.close()
-        self.cam_right.close()
-        self.cam_belly.close()
+        if self.streaming is not None:
+            self.streaming.close()
+        for camera in self._cameras:
+            camera.close()
 
     ###########################################
     # Stand command.
@@ -155,7 +480,81 @@ class Go1(object):
     def pose(self, cmd_pose: Pose) -> None:
         self._go1_mqttc.send_cmd_pose(cmd_pose)
 
+    ###########################################
+    # Timed sequences of velocity or pose commands.
+    def run_trajectory(
+        self,
+        trajectory: Union[Sequence[Waypoint], Iterable[Setpoint]],
+        mode: Optional[Mode] = None,
+        hold_last: bool = False,
+    ) -> None:
+        """Stream a trajectory in the background, see TrajectoryExecutor."""
+        self.controller.cancel()
+        self.trajectory.run(trajectory, mode=mode, hold_last=hold_last)
+
+    def abort_trajectory(self) -> None:
+        self.trajectory.abort()
+
+    ###########################################
+    # Motion programs executed on the robot, see ProgramRunner.
+    def run_program(self, program: RobotProgram) -> None:
+        """Upload and start a program, nothing is streamed while it runs."""
+        self.controller.cancel()
+        self.trajectory.abort()
+        self.program.run(program)
+
+    def wait_program(self, timeout: Optional[float] = None) -> ProgramStatus:
+        return self.program.wait(timeout)
+
+    def stop_program(self) -> None:
+        self.program.stop()
+
+    ###########################################
+    # Closed-loop motion from the HighState odometry.
+    def go_to(
+        self,
+        x: float,
+        y: float,
+        yaw: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Walk to ``x``, ``y`` (m) and ``yaw`` (rad) in the background."""
+        self.trajectory.abort()
+        self.controller.go_to(x, y, yaw, timeout=timeout)
+
+    def follow_waypoints(
+        self,
+        goals: Sequence[Goal],
+        pass_tolerance: float = 0.2,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.trajectory.abort()
+        self.controller.follow(
+            goals, pass_tolerance=pass_tolerance, timeout=timeout
+        )
+
+    def cancel_goal(self) -> None:
+        self.controller.cancel()
+
     ###########################################
     # Change LED color
     def set_led(self, led: LED) -> None:
         self._go1_mqttc.set_led_color(led)
+
+    ###########################################
+    # MQTT publish queue and subscribed states
+    @property
+    def publisher(self) -> MqttPublisher:
+        return self._go1_mqttc.publisher
+
+    @property
+    def subscriber(self) -> MqttSubscriber:
+        return self._go1_mqttc.subscriber
+
+    def get_bms_state(self) -> Optional[BMSState]:
+        """Latest BMS state received over MQTT (low rate)."""
+        return self.subscriber.latest(SubTopic.bms)
+
+    def wait_commands(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued command has been acknowledged."""
+        return self._go1_mqttc.flush(timeout)
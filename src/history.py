@@ -0,0 +1,275 @@
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.utils.codec import Buffer
+from src.utils.compact_types import (HIGH_STATE_DTYPE, HIGH_STATE_SIZE,
+                                     CompactHighState)
+
+# Columns available for queries, mapped to their field in the frame.
+HISTORY_FIELDS = {
+    "position": "position",
+    "velocity": "velocity",
+    "yaw_speed": "yaw_speed",
+    "body_height": "body_height",
+    "quaternion": "imu.quaternion",
+    "gyroscope": "imu.gyroscope",
+    "accelerometer": "imu.accelerometer",
+    "rpy": "imu.rpy",
+    "foot_force": "foot_force",
+    "range_obstacle": "range_obstacle",
+}
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, ratio: float) -> np.ndarray:
+    """Spherical linear interpolation between two (w, x, y, z) quaternions."""
+    q0 = q0.astype(np.float64)
+    q1 = q1.astype(np.float64)
+    dot = float(np.dot(q0, q1))
+    if dot < 0.0:
+        q1 = -q1
+        dot = -dot
+
+    if dot > 0.9995:
+        # Nearly parallel, fall back to normalized linear interpolation.
+        q = q0 + ratio * (q1 - q0)
+    else:
+        theta = np.arccos(dot)
+        sin_theta = np.sin(theta)
+        q = (
+            np.sin((1.0 - ratio) * theta) * q0 + np.sin(ratio * theta) * q1
+        ) / sin_theta
+
+    norm = np.linalg.norm(q)
+    return q / norm if norm > 0.0 else q
+
+
+class StateHistory(object):
+    """Bounded, time-indexed history of raw HighState frames.
+
+    Frames are copied into a single preallocated ring of
+    ``HIGH_STATE_DTYPE`` records, and every field in ``HISTORY_FIELDS`` is
+    exposed as a column view over that ring, so appending a frame is one
+    memory copy and never allocates per-field Python objects.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Create a state history.
+
+        Parameters
+        ----------
+
+        capacity: int
+            Maximum number of frames kept, older frames are overwritten.
+        """
+        if capacity < 2:
+            raise ValueError("StateHistory capacity must be at least 2.")
+
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._frames = np.zeros(capacity, dtype=HIGH_STATE_DTYPE)
+        self._frames_buffer = memoryview(self._frames).cast("B")
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._head = 0  # Next slot to write.
+        self._count = 0
+
+        self._columns = {
+            name: self._column_view(path)
+            for name, path in HISTORY_FIELDS.items()
+        }
+
+    def _column_view(self, path: str) -> np.ndarray:
+        column = self._frames
+        for name in path.split("."):
+            column = column[name]
+
+        if column.dtype.names is not None:
+            column = column.view(
+                (column.dtype[0].base, len(column.dtype.names))
+            )
+        return column
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+    def append(self, frame: Buffer, timestamp: float) -> None:
+        """Append a raw HighState frame received at ``timestamp``.
+
+        Frames with an unexpected size or out of order timestamps are
+        ignored. Can be registered directly as a ``Go1UDP`` receive
+        callback.
+        """
+        if len(frame) != HIGH_STATE_SIZE:
+            return
+
+        with self._lock:
+            if self._count and timestamp < self._times[self._head - 1]:
+                return
+
+            start = self._head * HIGH_STATE_SIZE
+            self._frames_buffer[start : start + HIGH_STATE_SIZE] = frame
+            self._times[self._head] = timestamp
+            self._head = (self._head + 1) % self._capacity
+            self._count = min(self._count + 1, self._capacity)
+
+    ###########################################
+    # Indexing helpers, `logical` indexes are 0 for the oldest frame.
+    def _start(self) -> int:
+        return (self._head - self._count) % self._capacity
+
+    def _physical(self, logical: int) -> int:
+        return (self._start() + logical) % self._capacity
+
+    def _bisect(self, timestamp: float) -> int:
+        """Number of frames with a time <= ``timestamp``, in O(log n)."""
+        start = self._start()
+        end = start + self._count
+        if end <= self._capacity:
+            return int(
+                np.searchsorted(
+                    self._times[start:end], timestamp, side="right"
+                )
+            )
+
+        # Wrapped ring: [start, capacity) is older than [0, head).
+        older = self._times[start:]
+        if self._head and timestamp >= self._times[0]:
+            return len(older) + int(
+                np.searchsorted(
+                    self._times[: self._head], timestamp, side="right"
+                )
+            )
+        return int(np.searchsorted(older, timestamp, side="right"))
+
+    def _logical_slice(self, first: int, last: int) -> np.ndarray:
+        """Physical indexes of the logical range [first, last)."""
+        return (self._start() + np.arange(first, last)) % self._capacity
+
+    ###########################################
+    # Queries
+    @property
+    def oldest_time(self) -> Optional[float]:
+        with self._lock:
+            if not self._count:
+                return None
+            return float(self._times[self._start()])
+
+    @property
+    def latest_time(self) -> Optional[float]:
+        with self._lock:
+            if not self._count:
+                return None
+            return float(self._times[self._head - 1])
+
+    def latest(self) -> Optional[CompactHighState]:
+        """Immutable snapshot of the newest frame."""
+        with self._lock:
+            if not self._count:
+                return None
+            idx = self._head - 1
+            return CompactHighState.frozen(
+                self._frames[idx].tobytes(), float(self._times[idx])
+            )
+
+    def nearest(self, timestamp: float) -> Optional[CompactHighState]:
+        """Immutable snapshot of the frame received closest to a time."""
+        with self._lock:
+            if not self._count:
+                return None
+
+            right = min(self._bisect(timestamp), self._count - 1)
+            left = max(right - 1, 0)
+            if abs(self._times[self._physical(left)] - timestamp) <= abs(
+                self._times[self._physical(right)] - timestamp
+            ):
+                right = left
+            idx = self._physical(right)
+            return CompactHighState.frozen(
+                self._frames[idx].tobytes(), float(self._times[idx])
+            )
+
+    def interpolate(self, name: str, timestamp: float) -> np.ndarray:
+        """Value of a field at ``timestamp``.
+
+        Vectors are interpolated linearly, ``quaternion`` uses slerp.
+        Queries outside of the recorded range return the first or last
+        value.
+
+        Parameters
+        ----------
+
+        name: str
+            A column name from ``HISTORY_FIELDS``.
+        timestamp: float
+            Time in the same clock as the appended frames.
+        """
+        column = self._columns[name]
+        with self._lock:
+            if not self._count:
+                raise LookupError("StateHistory is empty.")
+
+            right = self._bisect(timestamp)
+            if right == 0:
+                return column[self._physical(0)].astype(np.float64)
+            if right == self._count:
+                return column[self._physical(right - 1)].astype(np.float64)
+
+            idx0 = self._physical(right - 1)
+            idx1 = self._physical(right)
+            t0 = self._times[idx0]
+            t1 = self._times[idx1]
+            ratio = (timestamp - t0) / (t1 - t0) if t1 > t0 else 0.0
+
+            if name == "quaternion":
+                return slerp(column[idx0], column[idx1], ratio)
+
+            v0 = column[idx0].astype(np.float64)
+            v1 = column[idx1].astype(np.float64)
+            return v0 + ratio * (v1 - v0)
+
+    def window(
+        self, name: str, start: float, end: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy of ``(times, values)`` received within [start, end]."""
+        column = self._columns[name]
+        with self._lock:
+            first = self._bisect(np.nextafter(start, -np.inf))
+            last = self._bisect(end)
+            idx = self._logical_slice(first, last)
+            return self._times[idx], column[idx]
+
+    def mean(self, name: str, start: float, end: float) -> np.ndarray:
+        _, values = self.window(name, start, end)
+        if not len(values):
+            raise LookupError(f"No {name} samples in [{start}, {end}].")
+        return values.mean(axis=0, dtype=np.float64)
+
+    def max(self, name: str, start: float, end: float) -> np.ndarray:
+        _, values = self.window(name, start, end)
+        if not len(values):
+            raise LookupError(f"No {name} samples in [{start}, {end}].")
+        return values.max(axis=0)
+
+    def rate(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> float:
+        """Average frame rate (Hz) within [start, end], default all."""
+        start = self.oldest_time if start is None else start
+        end = self.latest_time if end is None else end
+        if start is None or end is None:
+            return 0.0
+
+        times, _ = self.window("yaw_speed", start, end)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
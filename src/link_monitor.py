@@ -0,0 +1,183 @@
+import threading
+import time
+from enum import IntEnum
+from typing import Callable, List, NamedTuple, Optional
+
+from src.publisher import MqttPublisher
+
+
+class LinkQuality(IntEnum):
+    GOOD = 0
+    DEGRADED = 1
+    CONGESTED = 2
+
+
+class LinkStats(NamedTuple):
+    """Link statistics over the last evaluation window."""
+
+    state_rate: float  # (unit: Hz) received HighState frames
+    state_loss: float  # estimated ratio of missing HighState frames
+    max_gap: float  # (unit: s) largest HighState inter-arrival gap
+    publish_latency: float  # (unit: s) mean MQTT queue-to-ack latency
+    queue_depth: int  # MQTT messages waiting to be sent
+    quality: LinkQuality
+
+
+class LinkMonitor(object):
+    """Watch the state stream and MQTT publishing to grade the link.
+
+    HighState inter-arrival gaps give the frame rate and, against the
+    nominal interval, an estimate of lost frames. MQTT publish latency and
+    queue depth come from the ``MqttPublisher``. Every window the link is
+    graded ``GOOD``, ``DEGRADED`` or ``CONGESTED`` and the registered
+    adapters are called on changes. The quality drops immediately and only
+    recovers after ``recover_windows`` consecutive better windows.
+    """
+
+    def __init__(
+        self,
+        publisher: Optional[MqttPublisher] = None,
+        max_loss: float = 0.1,
+        max_latency: float = 0.3,
+        window: float = 1.0,
+        recover_windows: int = 3,
+    ) -> None:
+        """Create a link monitor.
+
+        Parameters
+        ----------
+
+        publisher: Optional[MqttPublisher]
+            The publisher to read latency and queue depth from.
+        max_loss: float
+            HighState loss ratio graded as congested, half is degraded.
+        max_latency: float
+            MQTT publish latency (s) graded as congested, half is degraded.
+        window: float
+            Evaluation period in seconds.
+        recover_windows: int
+            Consecutive better windows required before raising the quality.
+        """
+        self._publisher = publisher
+        self.max_loss = max_loss
+        self.max_latency = max_latency
+        self.window = window
+        self.recover_windows = recover_windows
+
+        self._lock = threading.Lock()
+        self._last_time = None
+        self._nominal_interval = None
+        self._frames = 0
+        self._missing = 0.0
+        self._max_gap = 0.0
+
+        self.quality = LinkQuality.GOOD
+        self.stats = None
+        self._better_windows = 0
+        self._adapters: List[Callable[[LinkQuality], None]] = []
+
+        self._stop = threading.Event()
+        self._monitor_thread = threading.Thread(
+            target=self._monitor_thread_func, args=(self._stop,)
+        )
+        self._monitor_thread.daemon = True
+        self._monitor_thread.start()
+
+    def add_adapter(self, adapter: Callable[[LinkQuality], None]) -> None:
+        """Call ``adapter(quality)`` whenever the link quality changes."""
+        self._adapters.append(adapter)
+
+    def set_expected_interval(self, interval: float) -> None:
+        """Expect a new HighState interval, e.g. after slowing the polling.
+
+        Without it the longer gaps of a slower polling would be counted as
+        lost frames and the link would never recover.
+        """
+        with self._lock:
+            self._nominal_interval = interval
+
+    def on_state(self, data: bytes, timestamp: float) -> None:
+        """Account a received HighState frame, a ``Go1UDP`` callback."""
+        with self._lock:
+            self._frames += 1
+            if self._last_time is None:
+                self._last_time = timestamp
+                return
+
+            gap = timestamp - self._last_time
+            self._last_time = timestamp
+            self._max_gap = max(self._max_gap, gap)
+
+            nominal = self._nominal_interval
+            if nominal is None:
+                self._nominal_interval = gap
+            elif gap < 1.5 * nominal:
+                # Track the regular interval, ignoring the gaps from losses.
+                self._nominal_interval = 0.95 * nominal + 0.05 * gap
+            else:
+                self._missing += round(gap / nominal) - 1
+
+    def _evaluate(self, window: float) -> LinkStats:
+        now = time.monotonic()
+        with self._lock:
+            frames, missing, max_gap = (
+                self._frames,
+                self._missing,
+                self._max_gap,
+            )
+            if self._last_time is not None:
+                # Frames that stopped arriving altogether are losses too.
+                max_gap = max(max_gap, now - self._last_time)
+                if frames == 0 and self._nominal_interval:
+                    missing = window / self._nominal_interval
+            self._frames = 0
+            self._missing = 0.0
+            self._max_gap = 0.0
+
+        loss = missing / (frames + missing) if frames + missing else 0.0
+        latency = 0.0
+        queue_depth = 0
+        if self._publisher is not None:
+            latencies = self._publisher.recent_latencies(now - window)
+            if latencies:
+                latency = sum(latencies) / len(latencies)
+            queue_depth = self._publisher.queue_depth()
+
+        if loss >= self.max_loss or latency >= self.max_latency:
+            quality = LinkQuality.CONGESTED
+        elif loss >= 0.5 * self.max_loss or latency >= 0.5 * self.max_latency:
+            quality = LinkQuality.DEGRADED
+        else:
+            quality = LinkQuality.GOOD
+
+        return LinkStats(
+            frames / window, loss, max_gap, latency, queue_depth, quality
+        )
+
+    def _update_quality(self, measured: LinkQuality) -> None:
+        if measured > self.quality:
+            self._better_windows = 0
+            self._set_quality(measured)
+        elif measured < self.quality:
+            self._better_windows += 1
+            if self._better_windows >= self.recover_windows:
+                self._better_windows = 0
+                # Recover one level at a time.
+                self._set_quality(LinkQuality(self.quality - 1))
+        else:
+            self._better_windows = 0
+
+    def _set_quality(self, quality: LinkQuality) -> None:
+        print(f"[Link] Quality {self.quality.name} -> {quality.name}.")
+        self.quality = quality
+        for adapter in self._adapters:
+            adapter(quality)
+
+    def _monitor_thread_func(self, event) -> None:
+        while not event.wait(self.window):
+            self.stats = self._evaluate(self.window)
+            self._update_quality(self.stats.quality)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._monitor_thread.join()
@@ -0,0 +1,329 @@
+import threading
+import time
+from enum import IntEnum
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from src.connections import Go1Mqtt
+from src.publisher import PublishTicket, QueuePolicy
+from src.utils.common import clip
+from src.utils.custom_types import LED, Pose, Velocity
+from src.utils.modes import Mode
+from src.utils.topics import PubTopic, SubTopic
+
+# Progress messages of a running program on ``SubTopic.action``.
+STEP_MARKER = "step"
+DONE_MARKER = "done"
+RUN = b"run"
+STOP = b"stop"
+
+# Helpers defined at the top of every program: ``mark`` sends the progress
+# marker of the next step, counting across loop iterations, ``hold`` re-sends
+# a stick command for the duration of a motion like the client stream does.
+_PRELUDE = """import time
+
+completed = [0]
+
+
+def mark():
+    child_conn.send('step(%d)' % completed[0])
+    completed[0] += 1
+
+
+def hold(command, duration, period):
+    end = time.time() + duration
+    while time.time() < end:
+        child_conn.send(command)
+        time.sleep(period)
+    child_conn.send('set_stick(0.0,0.0,0.0,0.0)')
+
+
+"""
+_INDENT = "    "
+
+
+class ProgramStep(NamedTuple):
+    kind: str  # action, stick, led, wait or repeat
+    args: tuple
+
+
+class ProgramStatus(IntEnum):
+    IDLE = 0
+    UPLOADED = 1
+    RUNNING = 2
+    SUCCEEDED = 3
+    STOPPED = 4
+
+
+class RobotProgram(object):
+    """A motion routine executed on the robot in one go.
+
+    Steps are added in order with the builder methods, which return the
+    program so they can be chained. ``compile`` turns it into the Python
+    code of the Go1 programming interface: every command goes through
+    ``child_conn.send`` like the app blocks do, waits and loops run on the
+    robot, and a progress marker is sent before every step.
+    """
+
+    def __init__(self, stick_period: float = 0.02) -> None:
+        """Create an empty program.
+
+        Parameters
+        ----------
+
+        stick_period: float
+            (unit: s) period the stick commands are re-sent at on the robot.
+        """
+        self.stick_period = stick_period
+        self.steps: List[ProgramStep] = []
+
+    def action(self, mode: Mode) -> "RobotProgram":
+        """Switch the operation mode."""
+        self.steps.append(ProgramStep("action", (str(mode),)))
+        return self
+
+    def walk(self, cmd_vel: Velocity, duration: float) -> "RobotProgram":
+        """Hold a velocity command for ``duration`` seconds, then stop."""
+        stick = (
+            clip(cmd_vel.vy, -1.0, 1.0),
+            clip(cmd_vel.vz, -1.0, 1.0),
+            0.0,
+            clip(cmd_vel.vx, -1.0, 1.0),
+        )
+        self.steps.append(ProgramStep("stick", (stick, duration)))
+        return self
+
+    def pose(self, cmd_pose: Pose, duration: float) -> "RobotProgram":
+        """Hold a pose command for ``duration`` seconds, then release."""
+        stick = tuple(clip(value, -1.0, 1.0) for value in cmd_pose)
+        self.steps.append(ProgramStep("stick", (stick, duration)))
+        return self
+
+    def led(self, led: LED) -> "RobotProgram":
+        """Set the LED color."""
+        rgb = tuple(int(clip(value, 0, 255)) for value in led)
+        self.steps.append(ProgramStep("led", rgb))
+        return self
+
+    def wait(self, seconds: float) -> "RobotProgram":
+        self.steps.append(ProgramStep("wait", (seconds,)))
+        return self
+
+    def repeat(self, count: int, body: "RobotProgram") -> "RobotProgram":
+        """Run the steps of ``body`` ``count`` times."""
+        if count < 1:
+            raise ValueError(f"Repeat count must be positive, got {count}.")
+        self.steps.append(ProgramStep("repeat", (count, body)))
+        return self
+
+    @property
+    def total_steps(self) -> int:
+        """Number of progress markers sent by a complete run."""
+        return _count_steps(self.steps)
+
+    def duration(self) -> float:
+        """(unit: s) lower bound of the run time, the waits and motions."""
+        return _duration(self.steps)
+
+    def compile(self) -> str:
+        """The program code, uploaded on ``PubTopic.code``."""
+        lines = []
+        self._compile(self.steps, lines, "")
+        lines.append(f"child_conn.send('{DONE_MARKER}')")
+        return _PRELUDE + "\n".join(lines) + "\n"
+
+    def _compile(self, steps, lines, indent) -> None:
+        for step in steps:
+            if step.kind == "repeat":
+                count, body = step.args
+                # Loops run on the robot, not unrolled.
+                lines.append(f"{indent}for _ in range({count}):")
+                self._compile(body.steps, lines, indent + _INDENT)
+                continue
+
+            lines.append(f"{indent}mark()")
+            lines.append(indent + self._compile_step(step))
+
+    def _compile_step(self, step: ProgramStep) -> str:
+        if step.kind == "action":
+            return f"child_conn.send('set_action({step.args[0]})')"
+        if step.kind == "stick":
+            stick, duration = step.args
+            values = ",".join(f"{value:.3f}" for value in stick)
+            return (
+                f"hold('set_stick({values})', {duration:.3f}, "
+                f"{self.stick_period:.3f})"
+            )
+        if step.kind == "led":
+            r, g, b = step.args
+            return f"child_conn.send('change_light({r},{g},{b})')"
+        if step.kind == "wait":
+            return f"time.sleep({step.args[0]:.3f})"
+        raise ValueError(f"Unknown program step {step.kind}.")
+
+
+def _count_steps(steps: List[ProgramStep]) -> int:
+    count = 0
+    for step in steps:
+        if step.kind == "repeat":
+            times, body = step.args
+            count += times * _count_steps(body.steps)
+        else:
+            count += 1
+    return count
+
+
+def _duration(steps: List[ProgramStep]) -> float:
+    duration = 0.0
+    for step in steps:
+        if step.kind == "repeat":
+            times, body = step.args
+            duration += times * _duration(body.steps)
+        elif step.kind == "stick":
+            duration += step.args[1]
+        elif step.kind == "wait":
+            duration += step.args[0]
+    return duration
+
+
+def parse_progress(message: str) -> Optional[int]:
+    """Step index of a ``step(N)`` marker, -1 for ``done``, None otherwise."""
+    message = message.strip()
+    if message == DONE_MARKER:
+        return -1
+    if message.startswith(f"{STEP_MARKER}(") and message.endswith(")"):
+        try:
+            return int(message[len(STEP_MARKER) + 1 : -1])
+        except ValueError:
+            return None
+    return None
+
+
+class ProgramRunner(object):
+    """Upload a ``RobotProgram`` once and follow its execution.
+
+    The code is published on ``PubTopic.code`` and started with ``run`` on
+    ``PubTopic.run``. Progress comes back from the robot as the markers of
+    the program on ``SubTopic.action``. The broker echoes the upload on the
+    same ``programming/code`` topic, so that echo does not show the robot
+    stored it. Nothing is streamed while the program runs, so its timing
+    does not depend on the Wi-Fi link.
+    """
+
+    def __init__(self, go1_mqttc: Go1Mqtt) -> None:
+        """Create a program runner.
+
+        Parameters
+        ----------
+
+        go1_mqttc: Go1Mqtt
+            The MQTT connection the program is uploaded through.
+        """
+        self._go1_mqttc = go1_mqttc
+        # Code and run messages must all arrive, in order.
+        publisher = go1_mqttc.publisher
+        for topic in (PubTopic.code, PubTopic.run):
+            publisher.set_policy(topic, QueuePolicy.DROP_OLDEST, qos=1)
+
+        self._condition = threading.Condition()
+        self.status = ProgramStatus.IDLE
+        self.program: Optional[RobotProgram] = None
+        self.code: Optional[str] = None
+        self.step = -1
+        self.start_time = None
+        self.end_time = None
+        # Copied on write, the paho thread iterates without a lock.
+        self._callbacks: Tuple[Callable[[int, int], None], ...] = ()
+        self._callbacks_lock = threading.Lock()
+
+        go1_mqttc.subscriber.add_callback(SubTopic.action, self._on_action)
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        """``(completed steps, total steps)`` of the current program."""
+        total = 0 if self.program is None else self.program.total_steps
+        if self.status == ProgramStatus.SUCCEEDED:
+            return total, total
+        return max(self.step, 0), total
+
+    def add_callback(self, callback: Callable[[int, int], None]) -> None:
+        """Call ``callback(completed, total)`` on every progress update."""
+        with self._callbacks_lock:
+            self._callbacks += (callback,)
+
+    def remove_callback(self, callback: Callable[[int, int], None]) -> None:
+        with self._callbacks_lock:
+            callbacks = list(self._callbacks)
+            callbacks.remove(callback)
+            self._callbacks = tuple(callbacks)
+
+    def upload(self, program: RobotProgram) -> PublishTicket:
+        """Upload a program without running it.
+
+        Returns the publish ticket, ``wait`` on it for the acknowledgement.
+        """
+        if self.status == ProgramStatus.RUNNING:
+            raise RuntimeError("A program is running, stop it first.")
+        code = program.compile()
+        with self._condition:
+            self.program = program
+            self.code = code
+            self.step = -1
+            self.start_time = self.end_time = None
+            self.status = ProgramStatus.UPLOADED
+        return self._go1_mqttc.publisher.publish(PubTopic.code, code.encode())
+
+    def run(self, program: Optional[RobotProgram] = None) -> PublishTicket:
+        """Start the uploaded program, uploading ``program`` first if given."""
+        if program is not None:
+            self.upload(program)
+        if self.code is None:
+            raise RuntimeError("No program uploaded.")
+
+        with self._condition:
+            self.step = -1
+            self.start_time = time.monotonic()
+            self.end_time = None
+            self.status = ProgramStatus.RUNNING
+        return self._go1_mqttc.publisher.publish(PubTopic.run, RUN)
+
+    def stop(self) -> None:
+        """Stop the running program and the robot."""
+        self._go1_mqttc.publisher.publish(PubTopic.run, STOP)
+        self._go1_mqttc.send_cmd_vel(Velocity(0.0, 0.0, 0.0))
+        self._finish(ProgramStatus.STOPPED)
+
+    def wait(self, timeout: Optional[float] = None) -> ProgramStatus:
+        """Wait until the program ends, returns its status."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.status != ProgramStatus.RUNNING, timeout
+            )
+            return self.status
+
+    def _finish(self, status: ProgramStatus) -> None:
+        with self._condition:
+            if self.status != ProgramStatus.RUNNING:
+                return
+            self.status = status
+            self.end_time = time.monotonic()
+            self._condition.notify_all()
+
+    def _on_action(self, message: str, timestamp: float) -> None:
+        if self.status != ProgramStatus.RUNNING:
+            return
+        step = parse_progress(message)
+        if step is None:
+            return
+
+        if step < 0:
+            self._finish(ProgramStatus.SUCCEEDED)
+        else:
+            self.step = step
+
+        completed, total = self.progress
+        for callback in self._callbacks:
+            try:
+                callback(completed, total)
+            except Exception as e:
+                name = getattr(callback, "__qualname__", repr(callback))
+                print(f"[Program] Error in {name}: {e}")
@@ -0,0 +1,397 @@
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import paho.mqtt.client as mqtt_client
+
+
+class QueuePolicy(Enum):
+    """How a topic queue behaves when a new message arrives."""
+
+    COALESCE = 0  # Only the latest message is kept (e.g. stick).
+    DROP_OLDEST = 1  # Messages are kept in order, oldest dropped when full.
+
+
+class PublishTicket(object):
+    """Completion handle of a single queued message."""
+
+    __slots__ = (
+        "topic",
+        "payload",
+        "qos",
+        "queued_time",
+        "sent_time",
+        "done_time",
+        "dropped",
+        "rc",
+        "_event",
+    )
+
+    def __init__(self, topic: str, payload: bytes, qos: int) -> None:
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.queued_time = time.monotonic()
+        self.sent_time = None
+        self.done_time = None
+        self.dropped = False
+        self.rc = None
+        self._event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Time from queueing to completion in seconds."""
+        if self.done_time is None:
+            return None
+        return self.done_time - self.queued_time
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    def _complete(self, dropped: bool = False, rc: int = 0) -> None:
+        self.dropped = dropped
+        self.rc = rc
+        self.done_time = time.monotonic()
+        self._event.set()
+
+
+class PublishBatch(object):
+    """A group of tickets that can be awaited together."""
+
+    def __init__(self, tickets: Iterable[PublishTicket]) -> None:
+        self.tickets = list(tickets)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every message is acknowledged or dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for ticket in self.tickets:
+            remaining = (
+                None if deadline is None else deadline - time.monotonic()
+            )
+            if remaining is not None and remaining <= 0.0:
+                return all(t.done for t in self.tickets)
+            if not ticket.wait(remaining):
+                return False
+        return True
+
+    @property
+    def delivered(self) -> bool:
+        return all(t.done and not t.dropped for t in self.tickets)
+
+
+class _TopicQueue(object):
+    def __init__(self, policy: QueuePolicy, maxsize: int, qos: int) -> None:
+        self.policy = policy
+        self.maxsize = 1 if policy == QueuePolicy.COALESCE else maxsize
+        self.qos = qos
+        self.buffer_offline = True
+        self.min_interval = 0.0
+        self.next_send_time = 0.0
+        self.messages: Deque[PublishTicket] = deque()
+        self.dropped = 0
+        self.latencies: Deque[float] = deque(maxlen=100)
+
+
+class MqttPublisher(object):
+    """Pipelined MQTT publishing with per-topic queues and backpressure.
+
+    Messages are queued per topic and published by a single worker thread,
+    without waiting for each acknowledgement, up to ``max_inflight``
+    unacknowledged messages. ``COALESCE`` topics only keep the latest
+    message, so stale stick commands never pile up behind a slow link.
+    While disconnected, messages are held in their queue, or discarded for
+    topics that must not be replayed late (``buffer_offline=False``).
+    """
+
+    def __init__(
+        self,
+        client: mqtt_client.Client,
+        max_inflight: int = 20,
+        default_maxsize: int = 16,
+        connected: bool = True,
+    ) -> None:
+        """Create a publisher over a paho client.
+
+        Parameters
+        ----------
+
+        client: mqtt_client.Client
+            A paho client, its ``on_publish`` callback is taken over.
+        max_inflight: int
+            Maximum number of sent but not yet acknowledged messages.
+        default_maxsize: int
+            Queue size of topics without an explicit policy.
+        connected: bool
+            Whether the client is already connected, see ``set_connected``.
+        """
+        self._client = client
+        self._max_inflight = max_inflight
+        self._default_maxsize = default_maxsize
+        self._connected = connected
+
+        self._condition = threading.Condition()
+        self._queues: Dict[str, _TopicQueue] = {}
+        self._order: List[str] = []
+        self._next = 0
+        self._inflight: Dict[int, PublishTicket] = {}
+        # (completion time, latency) of the recently acknowledged messages.
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=256)
+        self._early_acks: Set[int] = set()
+
+        self._client.on_publish = self._on_publish
+
+        self._stop = threading.Event()
+        self._worker_thread = threading.Thread(
+            target=self._worker_thread_func, args=(self._stop,)
+        )
+        self._worker_thread.daemon = True
+        self._worker_thread.start()
+
+    def set_policy(
+        self,
+        topic: str,
+        policy: QueuePolicy,
+        maxsize: int = 16,
+        qos: int = 0,
+        buffer_offline: bool = True,
+    ) -> None:
+        """Configure the queue policy and default QoS of a topic.
+
+        Parameters
+        ----------
+
+        topic: str
+            The MQTT topic.
+        policy: QueuePolicy
+            Coalesce to the latest message or keep them in order.
+        maxsize: int
+            Queue size of ``DROP_OLDEST`` topics.
+        qos: int
+            Default QoS of the messages published on this topic.
+        buffer_offline: bool
+            Keep messages queued while disconnected, otherwise drop them.
+        """
+        with self._condition:
+            queue = self._queue(topic)
+            queue.policy = policy
+            queue.maxsize = 1 if policy == QueuePolicy.COALESCE else maxsize
+            queue.qos = qos
+            queue.buffer_offline = buffer_offline
+
+    def set_min_interval(self, topic: str, interval: float) -> None:
+        """Rate limit a topic, e.g. to lower the stick publish rate.
+
+        Combined with ``COALESCE`` only the latest message is sent once the
+        interval elapsed.
+        """
+        with self._condition:
+            self._queue(topic).min_interval = interval
+            self._condition.notify_all()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def set_connected(self, connected: bool) -> None:
+        """Pause or resume sending on connection changes."""
+        with self._condition:
+            self._connected = connected
+            if not connected:
+                for queue in self._queues.values():
+                    if not queue.buffer_offline:
+                        self._drop_all(queue)
+            self._condition.notify_all()
+
+    def _drop_all(self, queue: _TopicQueue) -> int:
+        count = len(queue.messages)
+        while queue.messages:
+            queue.messages.popleft()._complete(dropped=True)
+        queue.dropped += count
+        return count
+
+    def _queue(self, topic: str) -> _TopicQueue:
+        queue = self._queues.get(topic)
+        if queue is None:
+            queue = _TopicQueue(
+                QueuePolicy.DROP_OLDEST, self._default_maxsize, 0
+            )
+            self._queues[topic] = queue
+            self._order.append(topic)
+        return queue
+
+    def publish(
+        self, topic: str, payload, qos: Optional[int] = None
+    ) -> PublishTicket:
+        """Queue a message, returns immediately with a ticket."""
+        with self._condition:
+            queue = self._queue(topic)
+            ticket = PublishTicket(
+                topic, payload, queue.qos if qos is None else qos
+            )
+            if not self._connected and not queue.buffer_offline:
+                ticket._complete(dropped=True)
+                queue.dropped += 1
+                return ticket
+
+            while len(queue.messages) >= queue.maxsize:
+                queue.messages.popleft()._complete(dropped=True)
+                queue.dropped += 1
+            queue.messages.append(ticket)
+            self._condition.notify_all()
+
+        return ticket
+
+    def publish_batch(
+        self, messages: Iterable[Tuple[str, bytes]]
+    ) -> PublishBatch:
+        """Queue several ``(topic, payload)`` messages at once."""
+        return PublishBatch(
+            self.publish(topic, payload) for topic, payload in messages
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queues are empty and every message acknowledged."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.queue_depth() or self._inflight:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0.0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def clear(self, topic: Optional[str] = None) -> int:
+        """Drop queued (not yet sent) messages, returns the count."""
+        count = 0
+        with self._condition:
+            topics = self._order if topic is None else [topic]
+            for name in topics:
+                queue = self._queues.get(name)
+                if queue is not None:
+                    count += self._drop_all(queue)
+        return count
+
+    ###########################################
+    # Statistics
+    def queue_depth(self, topic: Optional[str] = None) -> int:
+        """Number of queued but not yet sent messages."""
+        if topic is not None:
+            queue = self._queues.get(topic)
+            return len(queue.messages) if queue is not None else 0
+        return sum(len(queue.messages) for queue in self._queues.values())
+
+    @property
+    def inflight(self) -> int:
+        """Number of sent but not yet acknowledged messages."""
+        return len(self._inflight)
+
+    def dropped(self, topic: str) -> int:
+        queue = self._queues.get(topic)
+        return queue.dropped if queue is not None else 0
+
+    def latency(self, topic: str) -> Tuple[float, float]:
+        """Mean and max queue-to-ack latency of the last 100 messages."""
+        queue = self._queues.get(topic)
+        if queue is None or not queue.latencies:
+            return 0.0, 0.0
+        latencies = list(queue.latencies)
+        return sum(latencies) / len(latencies), max(latencies)
+
+    def recent_latencies(self, since: float) -> List[float]:
+        """Latencies of all messages acknowledged after ``since``."""
+        with self._condition:
+            return [
+                latency
+                for done_time, latency in self._latencies
+                if done_time >= since
+            ]
+
+    ###########################################
+    # Worker
+    def _pop_next(self) -> Tuple[Optional[PublishTicket], float]:
+        """Round-robin over topics so a busy topic cannot starve others.
+
+        Returns the next ticket, or None and the time to wait for a rate
+        limited topic to become ready.
+        """
+        now = time.monotonic()
+        wait = 0.1
+        for _ in range(len(self._order)):
+            topic = self._order[self._next % len(self._order)]
+            self._next += 1
+            queue = self._queues[topic]
+            if not queue.messages:
+                continue
+            if now < queue.next_send_time:
+                wait = min(wait, queue.next_send_time - now)
+                continue
+
+            queue.next_send_time = now + queue.min_interval
+            return queue.messages.popleft(), 0.0
+        return None, wait
+
+    def _worker_thread_func(self, event) -> None:
+        while not event.is_set():
+            with self._condition:
+                ticket = None
+                while not event.is_set():
+                    wait = 0.1
+                    if (
+                        self._connected
+                        and len(self._inflight) < self._max_inflight
+                    ):
+                        ticket, wait = self._pop_next()
+                        if ticket is not None:
+                            break
+                    self._condition.wait(wait)
+                if ticket is None:
+                    continue
+
+            ticket.sent_time = time.monotonic()
+            info = self._client.publish(
+                topic=ticket.topic, payload=ticket.payload, qos=ticket.qos
+            )
+
+            with self._condition:
+                if info.rc != mqtt_client.MQTT_ERR_SUCCESS and ticket.qos == 0:
+                    # QoS 0 messages are lost when not connected.
+                    ticket._complete(dropped=True, rc=info.rc)
+                    self._queues[ticket.topic].dropped += 1
+                elif info.mid in self._early_acks:
+                    self._early_acks.discard(info.mid)
+                    self._complete(ticket)
+                else:
+                    self._inflight[info.mid] = ticket
+                self._condition.notify_all()
+
+    def _complete(self, ticket: PublishTicket) -> None:
+        ticket._complete()
+        self._queues[ticket.topic].latencies.append(ticket.latency)
+        self._latencies.append((ticket.done_time, ticket.latency))
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        with self._condition:
+            ticket = self._inflight.pop(mid, None)
+            if ticket is None:
+                # Acknowledged before the worker registered the message.
+                if len(self._early_acks) > 1024:
+                    self._early_acks.clear()
+                self._early_acks.add(mid)
+            else:
+                self._complete(ticket)
+            self._condition.notify_all()
+
+    def close(self, timeout: Optional[float] = 1.0) -> None:
+        self.flush(timeout)
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._worker_thread.join()
@@ -0,0 +1,58 @@
+import threading
+from typing import Iterator, Tuple
+
+from src.utils.codec import Buffer, get_struct
+
+RECORDING_MAGIC = b"GO1REC\x01\n"
+# Receive timestamp and frame length preceding every frame.
+_RECORD_HEADER = get_struct("dI")
+
+
+class FrameRecorder(object):
+    """Record raw HighState frames with their receive timestamps.
+
+    ``write`` can be registered directly as a ``Go1UDP`` receive callback,
+    the frames are appended as they arrive without being decoded.
+    """
+
+    def __init__(self, fn: str) -> None:
+        self._fn = fn
+        self._lock = threading.Lock()
+        self._file = open(fn, "wb")
+        self._file.write(RECORDING_MAGIC)
+        self.frames = 0
+
+    def write(self, frame: Buffer, timestamp: float) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_RECORD_HEADER.pack(timestamp, len(frame)))
+            self._file.write(frame)
+            self.frames += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "FrameRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_recording(fn: str) -> Iterator[Tuple[float, bytes]]:
+    """Iterate over the ``(timestamp, frame)`` pairs of a recording."""
+    with open(fn, "rb") as f_obj:
+        if f_obj.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+            raise ValueError(f"{fn} is not a Go1 recording.")
+
+        while True:
+            header = f_obj.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            timestamp, length = _RECORD_HEADER.unpack(header)
+            frame = f_obj.read(length)
+            if len(frame) < length:
+                return
+            yield timestamp, frame
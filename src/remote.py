@@ -0,0 +1,163 @@
+import queue
+import threading
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from src.utils.codec import Buffer, get_struct
+from src.utils.custom_types import RemoteState
+from src.utils.modes import RemoteButton
+
+# HighState.wireless_remote: head[2], buttons, lx, rx, ry, L2, ly, idle[16].
+WIRELESS_REMOTE_OFFSET = 1039
+_REMOTE_STRUCT = get_struct("H5f")
+_REMOTE_START = WIRELESS_REMOTE_OFFSET + 2
+_REMOTE_END = _REMOTE_START + _REMOTE_STRUCT.size
+_AXES = ("lx", "rx", "ry", "l2", "ly")
+
+
+class RemoteEventType(Enum):
+    PRESS = 0
+    RELEASE = 1
+    AXIS = 2
+
+
+class RemoteEvent(NamedTuple):
+    timestamp: float
+    type: RemoteEventType
+    button: Optional[RemoteButton]  # PRESS and RELEASE
+    axis: Optional[str]  # AXIS, one of lx, rx, ry, l2 and ly
+    value: float  # axis value, 1.0 on press and 0.0 on release
+
+
+def decode_remote(data: Buffer, offset: int = 0) -> RemoteState:
+    """Decode the 40 bytes wireless remote starting at ``offset``."""
+    return RemoteState._make(_REMOTE_STRUCT.unpack_from(data, offset + 2))
+
+
+class WirelessRemote(object):
+    """Button and stick events of the Unitree wireless remote.
+
+    ``on_state`` runs on every received frame. Unchanged remote bytes are
+    skipped with a single comparison, otherwise the pressed and released
+    buttons are the bits of ``previous ^ current``. A stick moving by more
+    than ``axis_threshold`` since its last event gives an ``AXIS`` event.
+    Events go to a bounded queue dropping the oldest, then to the
+    callbacks, a raising callback does not stop the other events.
+    """
+
+    def __init__(
+        self, axis_threshold: float = 0.05, queue_size: int = 256
+    ) -> None:
+        """Create a wireless remote decoder.
+
+        Parameters
+        ----------
+
+        axis_threshold: float
+            Stick change (-1~1 range) reported as an axis event.
+        queue_size: int
+            Number of events kept for ``get_event``.
+        """
+        self.axis_threshold = axis_threshold
+        self.state = RemoteState(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+        self._raw = None
+        self._axes = [0.0] * len(_AXES)  # values of the last axis events
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[RemoteEvent], None]] = []
+        self._button_callbacks: Dict[
+            RemoteButton, List[Callable[[RemoteEvent], None]]
+        ] = {}
+        self._events = queue.Queue(maxsize=queue_size)
+
+    def add_callback(self, callback: Callable[[RemoteEvent], None]) -> None:
+        """Call ``callback(event)`` for every event on the receive thread."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[RemoteEvent], None]):
+        self._callbacks.remove(callback)
+
+    def on_press(
+        self, button: RemoteButton, callback: Callable[[RemoteEvent], None]
+    ) -> None:
+        """Call ``callback(event)`` when ``button`` gets pressed."""
+        self._button_callbacks.setdefault(button, []).append(callback)
+
+    def get_event(self, timeout: Optional[float] = None) -> RemoteEvent:
+        """Next queued event, raises ``queue.Empty`` on timeout."""
+        return self._events.get(timeout=timeout)
+
+    def pressed(self, button: RemoteButton) -> bool:
+        return bool(self.state.buttons & button)
+
+    ###########################################
+    # Decoding
+    def on_state(self, frame: Buffer, timestamp: float) -> None:
+        """Decode the remote, a ``Go1UDP`` receive callback."""
+        raw = frame[_REMOTE_START:_REMOTE_END]
+        if raw == self._raw:
+            return
+
+        with self._lock:
+            self._raw = raw
+            previous = self.state.buttons
+            self.state = RemoteState._make(_REMOTE_STRUCT.unpack(raw))
+
+        buttons = self.state.buttons
+        changed = previous ^ buttons
+        if changed:
+            self._emit_buttons(changed & buttons, timestamp, pressed=True)
+            self._emit_buttons(changed & previous, timestamp, pressed=False)
+
+        for idx, value in enumerate(self.state[1:]):
+            if abs(value - self._axes[idx]) >= self.axis_threshold:
+                self._axes[idx] = value
+                self._emit(
+                    RemoteEvent(
+                        timestamp,
+                        RemoteEventType.AXIS,
+                        None,
+                        _AXES[idx],
+                        value,
+                    )
+                )
+
+    def _emit_buttons(self, bits: int, timestamp: float, pressed: bool):
+        event_type = (
+            RemoteEventType.PRESS if pressed else RemoteEventType.RELEASE
+        )
+        while bits:
+            # Lowest set bit first.
+            bit = bits & -bits
+            bits ^= bit
+            button = RemoteButton(bit)
+            event = RemoteEvent(
+                timestamp, event_type, button, None, 1.0 if pressed else 0.0
+            )
+            button_callbacks = (
+                self._button_callbacks.get(button, ()) if pressed else ()
+            )
+            self._emit(event, button_callbacks)
+
+    def _emit(
+        self,
+        event: RemoteEvent,
+        button_callbacks: Iterable[Callable[[RemoteEvent], None]] = (),
+    ) -> None:
+        # Queued first, so a raising callback cannot lose the event.
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            # Drop the oldest event to keep the most recent ones.
+            try:
+                self._events.get_nowait()
+            except queue.Empty:
+                pass
+            self._events.put_nowait(event)
+
+        for callback in (*self._callbacks, *button_callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                name = getattr(callback, "__qualname__", repr(callback))
+                print(f"[Remote] Error in {name}: {e}")
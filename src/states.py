@@ -1,17 +1,52 @@
+import threading
 from typing import Tuple
 
-from src.command import HighCmd
-from src.utils.common import (byte_print, decode_sn, decode_version,
-                              hex_to_float, sum_total_voltage)
-from src.utils.custom_types import (IMU, BMSState, Cartesian, FootForce,
-                                    FootPose, FootSpeed, MotorState, Velocity)
+from src.formatter import StateFormatter
+from src.remote import decode_remote
+from src.utils.codec import get_struct
+from src.utils.custom_types import (IMU, BMSState, Cartesian, Euler, FootForce,
+                                    FootPose, FootSpeed, MotorState,
+                                    Quaternion, RemoteState, Velocity)
 from src.utils.modes import GaitType, MotorModeHigh
 
+# Precompiled layouts of the HighState frame sections.
+_HEAD_STRUCT = get_struct("HBB")
+_BANDWIDTH_STRUCT = get_struct("H")
+_IMU_STRUCT = get_struct("13fB")
+_MOTOR_STRUCT = get_struct("B7fB2I")
+_BMS_STRUCT = get_struct("4BiH4B10H")
+_TAIL_STRUCT = get_struct("8HBfBf3ff3ff4f12f12f")
+_IMU_OFFSET = 22
+_TAIL_OFFSET = 869
+# Raw frame offsets of the odometry, read by the per-frame callbacks.
+# position follows foot forces, mode, progress, gait and raise height.
+POSITION_OFFSET = _TAIL_OFFSET + get_struct("8HBfBf").size
+# yaw follows the quaternion, gyroscope, accelerometer, roll and pitch.
+YAW_OFFSET = _IMU_OFFSET + get_struct("12f").size
+# Shared by every print_states, it keeps the decoded serial number.
+_STATE_FORMATTER = StateFormatter()
+
+
+def decode_bms_state(data, offset: int = 0) -> BMSState:
+    """Decode a 34 bytes BMS state starting at ``offset``."""
+    values = _BMS_STRUCT.unpack_from(data, offset)
+
+    return BMSState(
+        *values[0:6],
+        values[6:8],
+        values[8:10],
+        values[10:20],
+    )
+
 
 class HighState(object):
     def __init__(self) -> None:
-        """Represent Go1 state in HighLevel mode."""
+        """Represent Go1 state in HighLevel mode.
 
+        ``parse_data`` replaces every field of a frame at once, ``snapshot``
+        is a copy of the fields of a single frame for other threads.
+        """
+        self._lock = threading.Lock()
         self.head: Tuple[str, str]  # reserve
         self.level_flag: int  # 0x00 is high-level, 0xff is low-level
         self.frame_reserve: int  # reserve
@@ -103,220 +138,89 @@ class HighState(object):
             int,
             int,
         ]
+        self.remote: RemoteState  # decoded wireless_remote
         self.reserve: int
 
-    def data_to_bms_state(self, data) -> BMSState:
-        version_h = data[0]
-        version_l = data[1]
-        bms_status = data[2]
-        SOC = data[3]
-        current = int.from_bytes(data[4:8], byteorder="little", signed=True)
-        cycle = int.from_bytes(data[8:10], byteorder="little")
-        BQ_NTC = [data[10], data[11]]
-        MCU_NTC = [data[12], data[13]]
+    def data_to_bms_state(self, data, offset: int = 0) -> BMSState:
+        return decode_bms_state(data, offset)
 
-        cell_vol = [
-            int.from_bytes(
-                data[14 + idx * 2 : 16 + idx * 2], byteorder="little"
-            )
-            for idx in range(10)
-        ]
-        return BMSState(
-            version_h,
-            version_l,
-            bms_status,
-            SOC,
-            current,
-            cycle,
-            BQ_NTC,
-            MCU_NTC,
-            cell_vol,
-        )
+    def data_to_IMU(self, data, offset: int = 0) -> IMU:
+        values = _IMU_STRUCT.unpack_from(data, offset)
 
-    def data_to_IMU(self, data) -> IMU:
-        quaternion = [
-            hex_to_float(data[0 + idx * 4 : 4 + idx * 4]) for idx in range(4)
-        ]
-        gyroscope = [
-            hex_to_float(data[16 + idx * 4 : 20 + idx * 4]) for idx in range(3)
-        ]
-        accelerometer = [
-            hex_to_float(data[28 + idx * 4 : 32 + idx * 4]) for idx in range(3)
-        ]
-        rpy = [
-            hex_to_float(data[40 + idx * 4 : 44 + idx * 4]) for idx in range(3)
-        ]
-        temperature = data[52]
-
-        return IMU(quaternion, gyroscope, accelerometer, rpy, temperature)
+        return IMU(
+            Quaternion._make(values[0:4]),
+            Cartesian._make(values[4:7]),
+            Cartesian._make(values[7:10]),
+            Euler._make(values[10:13]),
+            values[13],
+        )
 
-    def data_to_motor_state(self, data) -> MotorState:
-        mode = data[0]
-        q = hex_to_float(data[1:5])
-        dq = hex_to_float(data[5:9])
-        ddq = hex_to_float(data[9:13])
-        tauEst = hex_to_float(data[13:17])
-        q_raw = hex_to_float(data[17:21])
-        dq_raw = hex_to_float(data[21:25])
-        ddq_raw = hex_to_float(data[25:29])
-        temperature = data[29]
-        reserve = [data[30], data[31]]
+    def data_to_motor_state(self, data, offset: int = 0) -> MotorState:
+        values = _MOTOR_STRUCT.unpack_from(data, offset)
 
-        return MotorState(
-            mode,
-            q,
-            dq,
-            ddq,
-            tauEst,
-            q_raw,
-            dq_raw,
-            ddq_raw,
-            temperature,
-            reserve,
-        )
+        return MotorState(*values[0:9], values[9:11])
 
     def parse_data(self, data) -> None:
         if data is None:
             return
 
-        self.head = hex(int.from_bytes(data[0:2], byteorder="little"))
-        self.level_flag = data[2]
-        self.frame_reserve = data[3]
-        self.SN = data[4:12]
-        self.version = data[12:20]
-        self.bandwidth = int.from_bytes(data[20:22], byteorder="little")
-        self.imu = self.data_to_IMU(data[22:75])
-        self.motor_states = []
-        for idx in range(20):
-            self.motor_states.append(
-                self.data_to_motor_state(
-                    data[(idx * 32) + 75 : (idx * 32) + 32 + 75]
-                )
-            )
-        # FIX FROM HERE!!!
-        self.bms = self.data_to_bms_state(data[835:869])
-        self.foot_force = FootForce(
-            int.from_bytes(data[869:871], byteorder="little"),
-            int.from_bytes(data[871:873], byteorder="little"),
-            int.from_bytes(data[873:875], byteorder="little"),
-            int.from_bytes(data[875:877], byteorder="little"),
-        )
-        self.foot_force_est = FootForce(
-            int.from_bytes(data[877:879], byteorder="little"),
-            int.from_bytes(data[879:881], byteorder="little"),
-            int.from_bytes(data[881:883], byteorder="little"),
-            int.from_bytes(data[883:885], byteorder="little"),
+        # Decoded without the lock, readers only wait for the stores.
+        state = {}
+        head, state["level_flag"], state["frame_reserve"] = (
+            _HEAD_STRUCT.unpack_from(data, 0)
         )
-        self.mode = MotorModeHigh(data[885])
-        self.progress = hex_to_float(data[886:890])
-        self.gait_type = GaitType(data[890])
-        self.foot_raise_height = hex_to_float(data[891:895])
-        self.position = Cartesian(
-            hex_to_float(data[895:899]),
-            hex_to_float(data[899:903]),
-            hex_to_float(data[903:907]),
-        )
-        self.body_height = hex_to_float(data[907:911])
-        self.velocity = Velocity(
-            hex_to_float(data[911:915]),
-            hex_to_float(data[915:919]),
-            hex_to_float(data[919:923]),
-        )
-        self.yaw_speed = hex_to_float(data[923:927])
-        self.range_obstacle = [
-            hex_to_float(data[927:931]),
-            hex_to_float(data[931:935]),
-            hex_to_float(data[935:939]),
-            hex_to_float(data[939:943]),
+        state["head"] = hex(head)
+        state["SN"] = data[4:12]
+        state["version"] = data[12:20]
+        state["bandwidth"] = _BANDWIDTH_STRUCT.unpack_from(data, 20)[0]
+        state["imu"] = self.data_to_IMU(data, _IMU_OFFSET)
+        state["motor_states"] = [
+            self.data_to_motor_state(data, (idx * 38) + 75)
+            for idx in range(20)
         ]
-        foot_position_to_body = []
-        for idx in range(4):
-            foot_position_to_body.append(
-                Cartesian(
-                    hex_to_float(data[(idx * 12) + 943 : (idx * 12) + 947]),
-                    hex_to_float(data[(idx * 12) + 947 : (idx * 12) + 951]),
-                    hex_to_float(data[(idx * 12) + 951 : (idx * 12) + 955]),
-                )
-            )
-        self.foot_position_to_body = FootPose(*foot_position_to_body)
-
-        foot_speed_to_body = []
-        for idx in range(4):
-            foot_speed_to_body.append(
-                Velocity(
-                    hex_to_float(data[(idx * 12) + 991 : (idx * 12) + 995]),
-                    hex_to_float(data[(idx * 12) + 995 : (idx * 12) + 999]),
-                    hex_to_float(data[(idx * 12) + 999 : (idx * 12) + 1003]),
-                )
+        state["bms"] = self.data_to_bms_state(data, 835)
+
+        values = _TAIL_STRUCT.unpack_from(data, _TAIL_OFFSET)
+        state["foot_force"] = FootForce._make(values[0:4])
+        state["foot_force_est"] = FootForce._make(values[4:8])
+        state["mode"] = MotorModeHigh(values[8])
+        state["progress"] = values[9]
+        state["gait_type"] = GaitType(values[10])
+        state["foot_raise_height"] = values[11]
+        state["position"] = Cartesian._make(values[12:15])
+        state["body_height"] = values[15]
+        state["velocity"] = Velocity._make(values[16:19])
+        state["yaw_speed"] = values[19]
+        state["range_obstacle"] = values[20:24]
+        state["foot_position_to_body"] = FootPose(
+            *(
+                Cartesian._make(values[idx : idx + 3])
+                for idx in range(24, 36, 3)
             )
-        self.foot_speed_to_body = FootSpeed(*foot_speed_to_body)
-
-        self.wireless_remote = data[1039:1079]
-        self.reserve = data[1079:1083]
-        self.crc = data[1083:1087]
-
-    def print_states(self) -> None:
-        print(
-            "+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+="
-        )
-        print(f"Head:\t\t\t{self.head}")
-        print(f"Level Flag:\t\t{self.level_flag}")
-        print(f"Frame Reserve:\t\t{self.frame_reserve}")
-        print(f"SN [{byte_print(self.SN)}]:\t{decode_sn(self.SN)}")
-        print(
-            f"Ver [{byte_print(self.version)}]:\t{decode_version(self.version)}"
         )
-        print(f"Bandwidth:\t\t{self.bandwidth}")
-        print("IMU")
-        print(f"\tQuaternion:\t{self.imu.quaternion}")
-        print(f"\tGyroscope:\t{self.imu.gyroscope}")
-        print(f"\tAccelerometer:\t{self.imu.accelerometer}")
-        print(f"\tRPY:\t\t{self.imu.rpy}")
-        print(f"\tTemp.:\t\t{self.imu.temperature}")
-
-        print("Motor State")
-        for idx, motor in enumerate(self.motor_states):
-            print(
-                f"\t{idx} | mode:{motor.mode} q:{motor.q:.5f} dq:{motor.dq:.5f} temp:{motor.temperature}"
+        state["foot_speed_to_body"] = FootSpeed(
+            *(
+                Velocity._make(values[idx : idx + 3])
+                for idx in range(36, 48, 3)
             )
-
-        print("Battery Management System")
-        print(f"\tSOC:\t\t{self.bms.SOC} %")
-        print(f"\tVoltage:\t{sum_total_voltage(self.bms.cell_vol)} volt")
-        print(f"\tCurrent:\t{self.bms.current} mA")
-        print(f"\tCycles:\t\t{self.bms.cycle}")
-        print(f"\tTemps BQ:\t{self.bms.BQ_NTC[0]} °C, {self.bms.BQ_NTC[1]}°C")
-        print(
-            f"\tTemps MCU:\t{self.bms.MCU_NTC[0]} °C, {self.bms.MCU_NTC[1]}°C"
         )
 
-        print(f"Foot Force:\t\t{self.foot_force}")
-        print(f"Foot Force Est:\t\t{self.foot_force_est}")
-        print(f"Mode:\t\t\t{self.mode}")
-        print(f"Progress:\t\t{self.progress}")
-        print(f"Gait Type:\t\t{self.gait_type}")
-        print(f"Foot Raise Height:\t{self.foot_raise_height}")
-        print(f"Position:\t\t{self.position}")
-        print(f"Body Height:\t\t{self.body_height}")
-        print(f"Velocity:\t\t{self.velocity}")
-        print(f"Yaw Speed:\t\t{self.yaw_speed}")
-        print(f"Range Obstacle:\t\t{self.range_obstacle}")
+        state["wireless_remote"] = data[1039:1079]
+        state["remote"] = decode_remote(data, 1039)
+        state["reserve"] = data[1079:1083]
+        state["crc"] = data[1083:1087]
 
-        print("Foot Position to Body")
-        print(f"\tfront_right:\t{self.foot_position_to_body.front_right}")
-        print(f"\tfront_left:\t{self.foot_position_to_body.front_left}")
-        print(f"\trear_right:\t{self.foot_position_to_body.rear_right}")
-        print(f"\trear_left:\t{self.foot_position_to_body.rear_left}")
+        with self._lock:
+            self.__dict__.update(state)
 
-        print("Foot Speed to Body")
-        print(f"\tfront_right:\t{self.foot_speed_to_body.front_right}")
-        print(f"\tfront_left:\t{self.foot_speed_to_body.front_left}")
-        print(f"\trear_right:\t{self.foot_speed_to_body.rear_right}")
-        print(f"\trear_left:\t{self.foot_speed_to_body.rear_left}")
+    def snapshot(self) -> "HighState":
+        """A copy of the latest frame, not updated by ``parse_data``."""
+        state = HighState()
+        with self._lock:
+            fields = dict(self.__dict__)
+        del fields["_lock"]
+        state.__dict__.update(fields)
+        return state
 
-        print(f"Wireless Remote:\t{self.wireless_remote}")
-        print(f"Reserve:\t\t{self.reserve}")
-        print(f"CRC:\t\t\t{self.crc}")
-        print(
-            "+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+=+="
-        )
+    def print_states(self) -> None:
+        _STATE_FORMATTER.write(self)
@@ -0,0 +1,427 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+JpegEncoder = Callable[[Any, int], bytes]
+BOUNDARY = "go1frame"
+_POLL_PERIOD = 0.005  # (unit: s) camera polling period of the encoders.
+_WAIT_TIMEOUT = 1.0  # (unit: s) to check the server is still running.
+
+
+def encode_jpeg(frame, quality: int) -> bytes:
+    """Encode a BGR frame with OpenCV, imported lazily like the cameras."""
+    import cv2
+
+    ok, buffer = cv2.imencode(
+        ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality]
+    )
+    if not ok:
+        raise ValueError("JPEG encoding failed.")
+    return buffer.tobytes()
+
+
+def multipart_chunk(jpeg: bytes) -> bytes:
+    """One part of a ``multipart/x-mixed-replace`` MJPEG stream."""
+    header = (
+        f"--{BOUNDARY}\r\n"
+        "Content-Type: image/jpeg\r\n"
+        f"Content-Length: {len(jpeg)}\r\n\r\n"
+    ).encode()
+    return header + jpeg + b"\r\n"
+
+
+class EncodedFrame(NamedTuple):
+    seq: int  # counts the encoded frames of a source
+    time: float  # receive time of the camera frame (time.monotonic)
+    chunk: bytes  # the multipart chunk sent as is to every client
+    jpeg: memoryview  # the image inside ``chunk``
+
+
+class FrameSource(object):
+    """Encode the new frames of a camera once for all its viewers.
+
+    An encoding thread runs while at least one viewer is subscribed. Every
+    new camera frame is encoded into a multipart chunk, the same bytes are
+    then written to every client. Clients always take the latest chunk, a
+    client slower than the camera skips frames instead of queueing them.
+    """
+
+    def __init__(
+        self,
+        camera,
+        quality: int,
+        encode: JpegEncoder = encode_jpeg,
+        poll_period: float = _POLL_PERIOD,
+    ) -> None:
+        """Create a frame source.
+
+        Parameters
+        ----------
+
+        camera: Go1Camera
+            Any object with a ``latest()`` frame and receive time pair.
+        quality: int
+            JPEG quality (0-100).
+        encode: JpegEncoder
+            Encodes a frame at a quality, OpenCV by default.
+        poll_period: float
+            (unit: s) period the camera is checked for a new frame at.
+        """
+        self.camera = camera
+        self.quality = quality
+        self._encode = encode
+        self.poll_period = poll_period
+
+        self._condition = threading.Condition()
+        self._latest: Optional[EncodedFrame] = None
+        self._viewers = 0
+        self._encode_thread = None
+        self.encoded = 0
+        self.errors = 0
+
+    @property
+    def viewers(self) -> int:
+        return self._viewers
+
+    @property
+    def latest(self) -> Optional[EncodedFrame]:
+        return self._latest
+
+    def subscribe(self) -> None:
+        """Add a viewer, starts encoding for the first one."""
+        with self._condition:
+            self._viewers += 1
+            if self._encode_thread is None:
+                self._encode_thread = threading.Thread(
+                    target=self._encode_thread_func
+                )
+                self._encode_thread.daemon = True
+                self._encode_thread.start()
+
+    def unsubscribe(self) -> None:
+        """Remove a viewer, encoding stops with the last one."""
+        with self._condition:
+            self._viewers -= 1
+            self._condition.notify_all()
+
+    def wait_next(
+        self, after_seq: int, timeout: Optional[float] = None
+    ) -> Optional[EncodedFrame]:
+        """The latest frame newer than ``after_seq``, None on timeout."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._latest is not None
+                and self._latest.seq > after_seq,
+                timeout,
+            )
+            latest = self._latest
+        if latest is None or latest.seq <= after_seq:
+            return None
+        return latest
+
+    def _encode_thread_func(self) -> None:
+        last_time = None
+        seq = 0 if self._latest is None else self._latest.seq
+        while True:
+            with self._condition:
+                if self._viewers <= 0:
+                    self._encode_thread = None
+                    return
+                # Woken up early when the last viewer leaves.
+                self._condition.wait(self.poll_period)
+
+            frame, received_time = self.camera.latest()
+            if received_time is None or received_time == last_time:
+                continue
+            last_time = received_time
+
+            try:
+                jpeg = self._encode(frame, self.quality)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"[Stream] Encoding failed: {e}")
+                continue
+
+            chunk = multipart_chunk(jpeg)
+            start = len(chunk) - len(jpeg) - 2
+            seq += 1
+            with self._condition:
+                self._latest = EncodedFrame(
+                    seq,
+                    received_time,
+                    chunk,
+                    memoryview(chunk)[start : start + len(jpeg)],
+                )
+                self.encoded += 1
+                self._condition.notify_all()
+
+
+class ClientStats(object):
+    """Frames sent to and skipped for one connected client."""
+
+    def __init__(self, address, camera: str, quality: int, fps: float):
+        self.address = address
+        self.camera = camera
+        self.quality = quality
+        self.fps = fps
+        self.sent = 0
+        self.skipped = 0
+        self.sent_bytes = 0
+        self.connected_time = time.monotonic()
+
+
+class _StreamingHandler(BaseHTTPRequestHandler):
+    """Serve ``/``, ``/<camera>.mjpg`` and ``/<camera>.jpg``."""
+
+    server: "_StreamingHTTPServer"
+
+    def setup(self) -> None:
+        # A client that stops reading is dropped after this timeout.
+        self.timeout = self.server.streamer.send_timeout
+        super().setup()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        streamer = self.server.streamer
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        name, _, extension = url.path.strip("/").partition(".")
+
+        if url.path == "/":
+            self._send_index(streamer)
+            return
+        if name not in streamer.cameras or extension not in ("mjpg", "jpg"):
+            self.send_error(404, "Unknown camera.")
+            return
+
+        try:
+            quality = streamer.snap_quality(
+                int(query.get("quality", [streamer.qualities[-1]])[0])
+            )
+            fps = float(query.get("fps", [streamer.max_fps])[0])
+        except ValueError:
+            self.send_error(400, "quality and fps must be numbers.")
+            return
+        fps = min(fps, streamer.max_fps) if fps > 0 else streamer.max_fps
+
+        source = streamer.source(name, quality)
+        if extension == "jpg":
+            self._send_snapshot(source)
+        else:
+            self._send_stream(streamer, source, name, quality, fps)
+
+    def _send_index(self, streamer: "MjpegServer") -> None:
+        links = "".join(
+            f'<p>{name}: <a href="/{name}.mjpg">stream</a> '
+            f'<a href="/{name}.jpg">snapshot</a></p>'
+            for name in streamer.cameras
+        )
+        body = f"<html><body>{links}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_snapshot(self, source: FrameSource) -> None:
+        source.subscribe()
+        try:
+            encoded = source.wait_next(-1, _WAIT_TIMEOUT)
+        finally:
+            source.unsubscribe()
+        if encoded is None:
+            self.send_error(503, "No camera frame yet.")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(encoded.jpeg)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(encoded.jpeg)
+
+    def _send_stream(
+        self,
+        streamer: "MjpegServer",
+        source: FrameSource,
+        name: str,
+        quality: int,
+        fps: float,
+    ) -> None:
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+        )
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        stats = ClientStats(self.client_address, name, quality, fps)
+        streamer._add_client(stats)
+        source.subscribe()
+        period = 1.0 / fps
+        next_time = time.monotonic()
+        seq = None
+        try:
+            while not streamer.stopped:
+                delay = next_time - time.monotonic()
+                if delay > 0 and streamer.wait_stop(delay):
+                    break
+
+                encoded = source.wait_next(
+                    -1 if seq is None else seq, _WAIT_TIMEOUT
+                )
+                if encoded is None:
+                    continue
+                if seq is not None:
+                    stats.skipped += encoded.seq - seq - 1
+                seq = encoded.seq
+
+                # Blocks while the client is slow, the frames encoded in
+                # the meantime are skipped.
+                self.wfile.write(encoded.chunk)
+                stats.sent += 1
+                stats.sent_bytes += len(encoded.chunk)
+                next_time = max(next_time + period, time.monotonic())
+        except (ConnectionError, socket.timeout):
+            pass
+        finally:
+            source.unsubscribe()
+            streamer._remove_client(stats)
+            self.close_connection = True
+
+
+class _StreamingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    streamer: "MjpegServer"
+
+
+class MjpegServer(object):
+    """Serve the Go1 cameras as MJPEG over HTTP to many viewers.
+
+    ``/<camera>.mjpg`` streams a camera, ``/<camera>.jpg`` is the latest
+    frame and ``/`` lists the cameras. ``?quality=`` picks the closest of
+    the served qualities and ``?fps=`` caps the rate of a client. Every
+    camera and quality is encoded once (see ``FrameSource``) whatever the
+    number of viewers, nothing is encoded without viewers.
+    """
+
+    def __init__(
+        self,
+        cameras: Dict[str, Any],
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        qualities: Sequence[int] = (50, 80),
+        max_fps: float = 30.0,
+        send_timeout: float = 2.0,
+        encode: JpegEncoder = encode_jpeg,
+    ) -> None:
+        """Create and start a streaming server.
+
+        Parameters
+        ----------
+
+        cameras: Dict[str, Go1Camera]
+            The cameras by name, the name is the path of their stream.
+        host: str
+            The local address to listen on.
+        port: int
+            The HTTP port, 0 picks a free one (see ``address``).
+        qualities: Sequence[int]
+            JPEG qualities served, the highest is the default.
+        max_fps: float
+            Highest frame rate sent to a client, the default rate.
+        send_timeout: float
+            (unit: s) a client that does not read for that long is dropped.
+        encode: JpegEncoder
+            Encodes a frame at a quality, OpenCV by default.
+        """
+        if not qualities:
+            raise ValueError("At least one JPEG quality is required.")
+        self.cameras = dict(cameras)
+        self.qualities = sorted(qualities)
+        self.max_fps = max_fps
+        self.send_timeout = send_timeout
+        self._encode = encode
+
+        self._lock = threading.Lock()
+        self._sources: Dict[tuple, FrameSource] = {}
+        self._clients: List[ClientStats] = []
+        self._stop = threading.Event()
+
+        self._httpd = _StreamingHTTPServer((host, port), _StreamingHandler)
+        self._httpd.streamer = self
+        self._serve_thread = threading.Thread(target=self._httpd.serve_forever)
+        self._serve_thread.daemon = True
+        self._serve_thread.start()
+        print(f"[Stream] Serving the cameras on http://{host}:{self.port}/")
+
+    @property
+    def address(self):
+        return self._httpd.server_address
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def wait_stop(self, timeout: float) -> bool:
+        return self._stop.wait(timeout)
+
+    @property
+    def clients(self) -> List[ClientStats]:
+        """The connected stream clients."""
+        with self._lock:
+            return list(self._clients)
+
+    @property
+    def sources(self) -> List[FrameSource]:
+        with self._lock:
+            return list(self._sources.values())
+
+    def snap_quality(self, quality: int) -> int:
+        """The served quality closest to ``quality``."""
+        return min(self.qualities, key=lambda q: abs(q - quality))
+
+    def source(self, camera: str, quality: int) -> FrameSource:
+        """The encoder of a camera at a quality, created on first use."""
+        key = (camera, quality)
+        with self._lock:
+            source = self._sources.get(key)
+            if source is None:
+                source = FrameSource(
+                    self.cameras[camera], quality, encode=self._encode
+                )
+                self._sources[key] = source
+            return source
+
+    def _add_client(self, stats: ClientStats) -> None:
+        with self._lock:
+            self._clients.append(stats)
+        print(
+            f"[Stream] {stats.address[0]} watching {stats.camera} "
+            f"(quality {stats.quality}, {stats.fps:g} fps)."
+        )
+
+    def _remove_client(self, stats: ClientStats) -> None:
+        with self._lock:
+            self._clients.remove(stats)
+        print(
+            f"[Stream] {stats.address[0]} left {stats.camera}: "
+            f"{stats.sent} frames sent, {stats.skipped} skipped."
+        )
+
+    def close(self) -> None:
+        self._stop.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._serve_thread.join()
@@ -0,0 +1,137 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.states import decode_bms_state
+from src.utils.common import decode_version
+from src.utils.topics import SubTopic
+
+Decoder = Callable[[bytes], Any]
+Callback = Callable[[Any, float], None]
+
+
+def _decode_bms(payload: bytes):
+    if len(payload) < 34:
+        raise ValueError(f"BMS payload too short ({len(payload)} bytes).")
+    return decode_bms_state(payload)
+
+
+def _decode_version(payload: bytes):
+    if len(payload) < 6:
+        raise ValueError(f"Version payload too short ({len(payload)} bytes).")
+    return decode_version(payload)
+
+
+def _decode_text(payload: bytes) -> str:
+    return payload.decode("utf-8", errors="replace")
+
+
+DEFAULT_DECODERS: Dict[str, Decoder] = {
+    SubTopic.bms: _decode_bms,
+    SubTopic.firmware: _decode_version,
+    SubTopic.code: _decode_text,
+    SubTopic.action: _decode_text,
+}
+
+
+class MqttSubscriber(object):
+    """Decode subscribed topics and cache their latest value.
+
+    Every topic is dispatched to its binary decoder, the decoded value is
+    cached with its receive time (``time.monotonic()``), then callbacks are
+    invoked and waiters woken up. Everything runs on the paho network
+    thread, so callbacks should return quickly.
+    """
+
+    def __init__(self, decoders: Optional[Dict[str, Decoder]] = None) -> None:
+        if decoders is None:
+            decoders = DEFAULT_DECODERS
+        self._decoders = dict(decoders)
+        self._condition = threading.Condition()
+        self._latest: Dict[str, Tuple[Any, float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # Copied on write, the paho thread iterates without a lock.
+        self._callbacks: Dict[str, Tuple[Callback, ...]] = {}
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def topics(self) -> List[str]:
+        return list(self._decoders)
+
+    def add_decoder(self, topic: str, decoder: Decoder) -> None:
+        """Handle another topic, subscribe again to apply it."""
+        self._decoders[topic] = decoder
+
+    def subscribe(self, client) -> None:
+        """Subscribe a connected paho client to every decoded topic."""
+        for topic in self._decoders:
+            client.subscribe(str(topic))
+
+    def handles(self, topic: str) -> bool:
+        return topic in self._decoders
+
+    def handle(self, topic: str, payload: bytes) -> None:
+        """Decode and dispatch a received message."""
+        received_time = time.monotonic()
+        try:
+            value = self._decoders[topic](payload)
+        except Exception as e:
+            self._errors[topic] = self._errors.get(topic, 0) + 1
+            print(f"[MQTT] Failed to decode {topic}: {e}")
+            return
+
+        with self._condition:
+            self._latest[topic] = (value, received_time)
+            self._counts[topic] = self._counts.get(topic, 0) + 1
+            self._condition.notify_all()
+
+        # A raising callback would stop the paho thread, and with it every
+        # publish and reconnect.
+        for callback in self._callbacks.get(topic, ()):
+            try:
+                callback(value, received_time)
+            except Exception as e:
+                name = getattr(callback, "__qualname__", repr(callback))
+                print(f"[MQTT] Error in {name} on {topic}: {e}")
+
+    def add_callback(self, topic: str, callback: Callback) -> None:
+        """Call ``callback(value, timestamp)`` on every update of a topic."""
+        with self._callbacks_lock:
+            callbacks = self._callbacks.get(topic, ())
+            self._callbacks[topic] = callbacks + (callback,)
+
+    def remove_callback(self, topic: str, callback: Callback) -> None:
+        with self._callbacks_lock:
+            callbacks = list(self._callbacks[topic])
+            callbacks.remove(callback)
+            self._callbacks[topic] = tuple(callbacks)
+
+    def latest(self, topic: str) -> Optional[Any]:
+        """Latest decoded value of a topic, None if never received."""
+        value = self._latest.get(topic)
+        return None if value is None else value[0]
+
+    def latest_time(self, topic: str) -> Optional[float]:
+        value = self._latest.get(topic)
+        return None if value is None else value[1]
+
+    def count(self, topic: str) -> int:
+        return self._counts.get(topic, 0)
+
+    def errors(self, topic: str) -> int:
+        return self._errors.get(topic, 0)
+
+    def wait_for(
+        self, topic: str, timeout: Optional[float] = None
+    ) -> Optional[Any]:
+        """Wait for the next update of a topic.
+
+        Returns the new value, or None if it did not arrive in time.
+        """
+        with self._condition:
+            count = self._counts.get(topic, 0)
+            updated = self._condition.wait_for(
+                lambda: self._counts.get(topic, 0) != count, timeout
+            )
+            return self._latest[topic][0] if updated else None
@@ -0,0 +1,352 @@
+import socket
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+from src.clock import ClockEstimator
+from src.states import HighState
+from src.utils.codec import Buffer, get_struct
+from src.utils.custom_types import ReceiveCallback
+from src.validator import HIGH_STATE_SIZE
+
+TELEMETRY_MAGIC = b"G1TD"
+FLAG_KEYFRAME = 0x01
+# Magic, sequence number, flags and number of frames of a datagram.
+_HEADER = get_struct("4sIBH")
+# Largest UDP payload.
+_MAX_DATAGRAM = 65507
+
+
+def _xor(value: int, previous: int) -> bytes:
+    return (value ^ previous).to_bytes(HIGH_STATE_SIZE, "little")
+
+
+def encode_batch(
+    seq: int,
+    frames: List[Buffer],
+    timestamps: List[float],
+    previous: Optional[bytes],
+    level: int = 1,
+) -> bytes:
+    """Encode HighState frames into one telemetry datagram.
+
+    Every frame is XORed with the one before it, the unchanged bytes become
+    zeros. The deltas are then stored byte position by byte position (the
+    first byte of every frame, then the second...) so the zeros and the
+    slowly changing high bytes of the floats form long runs for zlib. With
+    ``previous`` None the batch is a keyframe and its first frame is XORed
+    with zeros, it decodes on its own.
+    """
+    flags = FLAG_KEYFRAME if previous is None else 0
+    last = 0 if previous is None else int.from_bytes(previous, "little")
+    deltas = []
+    for frame in frames:
+        value = int.from_bytes(frame, "little")
+        deltas.append(_xor(value, last))
+        last = value
+    deltas = b"".join(deltas)
+
+    timestamps = get_struct(f"{len(frames)}d").pack(*timestamps)
+    columns = [deltas[idx::HIGH_STATE_SIZE] for idx in range(HIGH_STATE_SIZE)]
+    payload = zlib.compress(timestamps + b"".join(columns), level)
+    return _HEADER.pack(TELEMETRY_MAGIC, seq, flags, len(frames)) + payload
+
+
+def decode_batch(
+    datagram: Buffer, previous: Optional[bytes]
+) -> Tuple[int, bool, List[Tuple[float, bytes]]]:
+    """Decode a telemetry datagram into ``(seq, keyframe, frames)``.
+
+    ``frames`` are ``(timestamp, frame)`` pairs, ``previous`` is the last
+    frame of the previous datagram and is ignored for a keyframe.
+    """
+    magic, seq, flags, count = _HEADER.unpack_from(datagram, 0)
+    if magic != TELEMETRY_MAGIC:
+        raise ValueError("Not a telemetry datagram.")
+    keyframe = bool(flags & FLAG_KEYFRAME)
+    if not keyframe and previous is None:
+        raise ValueError("Delta datagram without a previous frame.")
+
+    data = zlib.decompress(memoryview(datagram)[_HEADER.size :])
+    timestamps = get_struct(f"{count}d").unpack_from(data, 0)
+    offset = 8 * count
+    if len(data) != offset + count * HIGH_STATE_SIZE:
+        raise ValueError("Truncated telemetry datagram.")
+
+    # Back from byte positions to frames.
+    columns = data[offset:]
+    deltas = [columns[idx::count] for idx in range(count)]
+
+    last = 0 if keyframe else int.from_bytes(previous, "little")
+    frames = []
+    for timestamp, delta in zip(timestamps, deltas):
+        last ^= int.from_bytes(delta, "little")
+        frames.append((timestamp, last.to_bytes(HIGH_STATE_SIZE, "little")))
+    return seq, keyframe, frames
+
+
+class TelemetryForwarder(object):
+    """Forward HighState frames to a base station over a thin link.
+
+    ``on_state`` only queues the raw frame. Every ``1 / rate`` seconds the
+    queued frames are delta encoded (see ``encode_batch``), compressed and
+    sent in one UDP datagram. Every ``keyframe_interval`` datagrams a
+    keyframe lets the receiver resynchronize after a lost datagram.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        rate: float = 20.0,
+        keyframe_interval: int = 20,
+        level: int = 1,
+        max_frames: int = 50,
+    ) -> None:
+        """Create a telemetry forwarder.
+
+        Parameters
+        ----------
+
+        host: str
+            The host name or IP address of the base station.
+        port: int
+            The UDP port of the ``TelemetryReceiver``.
+        rate: float
+            (unit: Hz) datagrams per second.
+        keyframe_interval: int
+            Number of datagrams between two keyframes.
+        level: int
+            zlib compression level, 1 is the fastest.
+        max_frames: int
+            A datagram is sent early once that many frames are queued.
+        """
+        self._address = (host, port)
+        self.period = 1.0 / rate
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.max_frames = max_frames
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._lock = threading.Lock()
+        # Serializes the encoding state, ``flush`` may race the thread.
+        self._send_lock = threading.Lock()
+        self._frames: List[Buffer] = []
+        self._timestamps: List[float] = []
+        self._previous = None
+        self._seq = 0
+
+        self.frames = 0
+        self.datagrams = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._send_thread = threading.Thread(target=self._send_thread_func)
+        self._send_thread.daemon = True
+        self._send_thread.start()
+
+    @property
+    def compression_ratio(self) -> float:
+        """Size of the raw frames over the size of the sent datagrams."""
+        if not self.sent_bytes:
+            return 0.0
+        return self.raw_bytes / self.sent_bytes
+
+    def on_state(self, frame: Buffer, timestamp: float) -> None:
+        """Queue a frame, a ``Go1UDP`` receive callback."""
+        if len(frame) != HIGH_STATE_SIZE:
+            return
+        with self._lock:
+            self._frames.append(frame)
+            self._timestamps.append(timestamp)
+            full = len(self._frames) >= self.max_frames
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Send the queued frames now."""
+        with self._send_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            frames, self._frames = self._frames, []
+            timestamps, self._timestamps = self._timestamps, []
+        if not frames:
+            return
+
+        previous = self._previous
+        if self._seq % self.keyframe_interval == 0:
+            previous = None
+        datagram = encode_batch(
+            self._seq, frames, timestamps, previous, self.level
+        )
+        if len(datagram) > _MAX_DATAGRAM:
+            print(
+                f"[Telemetry] {len(frames)} frames do not fit a datagram, "
+                "lower max_frames."
+            )
+            return
+
+        try:
+            self._sock.sendto(datagram, self._address)
+        except OSError as err:
+            # The next keyframe resynchronizes the receiver.
+            print(f"[Telemetry] Send to {self._address} failed: {err}")
+        self._previous = frames[-1]
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+
+        self.frames += len(frames)
+        self.datagrams += 1
+        self.raw_bytes += len(frames) * HIGH_STATE_SIZE
+        self.sent_bytes += len(datagram)
+
+    def _send_thread_func(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.period)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Telemetry] Error: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        self._send_thread.join()
+        self.flush()
+        self._sock.close()
+
+
+class TelemetryReceiver(object):
+    """Receive the datagrams of a ``TelemetryForwarder``.
+
+    The exact HighState frames are reconstructed and passed to the receive
+    callbacks, like the ones of ``Go1UDP``, and the last one of every
+    datagram is parsed into ``high_state``. After a lost datagram the delta
+    datagrams are dropped until the next keyframe. The frame timestamps are
+    robot receive times, ``clock`` maps them to the host clock (up to the
+    minimum latency of the link).
+    """
+
+    def __init__(self, port: int, host: str = "0.0.0.0") -> None:
+        """Create a telemetry receiver.
+
+        Parameters
+        ----------
+
+        port: int
+            The UDP port to listen on.
+        host: str
+            The local address to bind to.
+        """
+        self.high_state = HighState()
+        self.clock = ClockEstimator()
+        # Frame and timestamp swapped together, never read torn.
+        self._latest = (None, None)
+        self._previous = None
+        self._expected_seq = None
+        self._receive_callbacks: Tuple[ReceiveCallback, ...] = ()
+        self._callbacks_lock = threading.Lock()
+        self.receiving = threading.Event()
+
+        self.frames = 0
+        self.datagrams = 0
+        self.received_bytes = 0
+        self.lost_datagrams = 0
+        self.dropped_datagrams = 0
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, port))
+        self._sock.settimeout(1.0)
+        self._stop = threading.Event()
+        self._receive_thread = threading.Thread(
+            target=self._receive_thread_func
+        )
+        self._receive_thread.daemon = True
+        self._receive_thread.start()
+
+    def add_receive_callback(
+        self, callback: Callable[[bytes, float], None]
+    ) -> None:
+        """Call ``callback(frame, timestamp)`` for every frame."""
+        with self._callbacks_lock:
+            self._receive_callbacks += (callback,)
+
+    def remove_receive_callback(
+        self, callback: Callable[[bytes, float], None]
+    ) -> None:
+        with self._callbacks_lock:
+            callbacks = list(self._receive_callbacks)
+            callbacks.remove(callback)
+            self._receive_callbacks = tuple(callbacks)
+
+    @property
+    def latest_frame(self) -> Optional[bytes]:
+        return self._latest[0]
+
+    @property
+    def latest_time(self) -> Optional[float]:
+        return self._latest[1]
+
+    def handle(
+        self, datagram: Buffer, received_time: Optional[float] = None
+    ) -> None:
+        """Decode a datagram, called by the receive thread."""
+        if received_time is None:
+            received_time = time.monotonic()
+        self.datagrams += 1
+        self.received_bytes += len(datagram)
+
+        seq = _HEADER.unpack_from(datagram, 0)[1]
+        if self._expected_seq is not None and seq != self._expected_seq:
+            self.lost_datagrams += (seq - self._expected_seq) & 0xFFFFFFFF
+            self._previous = None
+
+        try:
+            seq, keyframe, frames = decode_batch(datagram, self._previous)
+        except ValueError:
+            # Waiting for a keyframe.
+            self.dropped_datagrams += 1
+            self._expected_seq = (seq + 1) & 0xFFFFFFFF
+            return
+        self._expected_seq = (seq + 1) & 0xFFFFFFFF
+        if not frames:
+            return
+
+        for timestamp, frame in frames:
+            for callback in self._receive_callbacks:
+                try:
+                    callback(frame, timestamp)
+                except Exception as e:
+                    name = getattr(callback, "__qualname__", repr(callback))
+                    print(f"[Telemetry] Error in {name}: {e}")
+        self.frames += len(frames)
+        latest_time, self._previous = frames[-1]
+        self._latest = (self._previous, latest_time)
+        # The last frame is the closest to the send time of the datagram.
+        self.clock.add_one_way(latest_time, received_time)
+        self.high_state.parse_data(self._previous)
+        self.receiving.set()
+
+    def _receive_thread_func(self) -> None:
+        while not self._stop.is_set():
+            try:
+                datagram = self._sock.recv(_MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            try:
+                self.handle(datagram)
+            except Exception as e:
+                print(f"[Telemetry] Error: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        self._receive_thread.join()
+        self._sock.close()
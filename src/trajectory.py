@@ -0,0 +1,236 @@
+import itertools
+import threading
+import time
+from enum import IntEnum
+from typing import (Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple,
+                    Union)
+
+from src.connections import Go1Mqtt
+from src.utils.custom_types import Pose, Velocity
+from src.utils.modes import Mode
+
+Setpoint = Union[Velocity, Pose]
+
+
+class Waypoint(NamedTuple):
+    """A setpoint reached at ``time`` seconds from the trajectory start."""
+
+    time: float
+    setpoint: Setpoint
+
+
+class TrajectoryStatus(IntEnum):
+    IDLE = 0
+    RUNNING = 1
+    SUCCEEDED = 2
+    PREEMPTED = 3
+    ABORTED = 4
+    FAILED = 5
+
+
+def interpolate(a: Setpoint, b: Setpoint, ratio: float) -> Setpoint:
+    """Linear interpolation between two setpoints of the same type."""
+    return a._make(x + (y - x) * ratio for x, y in zip(a, b))
+
+
+def sample(waypoints: Sequence[Waypoint], t: float) -> Setpoint:
+    """The setpoint at ``t``, held constant outside the waypoints."""
+    if t <= waypoints[0].time:
+        return waypoints[0].setpoint
+
+    for prev, curr in zip(waypoints, waypoints[1:]):
+        if t < curr.time:
+            ratio = (t - prev.time) / (curr.time - prev.time)
+            return interpolate(prev.setpoint, curr.setpoint, ratio)
+
+    return waypoints[-1].setpoint
+
+
+class TrajectoryExecutor(object):
+    """Stream velocity or pose setpoints at a fixed rate.
+
+    A trajectory is either a sequence of ``Waypoint``, linearly interpolated
+    at every tick, or any iterable (e.g. a generator) yielding one setpoint
+    per tick. Ticks follow absolute deadlines, late ticks are skipped rather
+    than sent in a burst. The operation mode is switched before streaming
+    when it differs from the one of the previous trajectory. Running a new
+    trajectory preempts the current one without stopping the robot,
+    ``abort`` stops it with a zero command.
+    """
+
+    def __init__(
+        self,
+        go1_mqttc: Go1Mqtt,
+        rate: float = 10.0,
+        settle_time: float = 0.5,
+    ) -> None:
+        """Create a trajectory executor.
+
+        Parameters
+        ----------
+
+        go1_mqttc: Go1Mqtt
+            The MQTT connection the commands are published through.
+        rate: float
+            Setpoint streaming rate in Hz.
+        settle_time: float
+            Seconds to wait after a mode switch before streaming.
+        """
+        self._go1_mqttc = go1_mqttc
+        self.period = 1.0 / rate
+        self.settle_time = settle_time
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+        self._mode = None
+        self._last = None
+        self._stop_status = TrajectoryStatus.ABORTED
+
+        self.status = TrajectoryStatus.IDLE
+        self.skipped_ticks = 0
+        self.max_lateness = 0.0  # (unit: s) of the sent ticks
+
+    def run(
+        self,
+        trajectory: Union[Sequence[Waypoint], Iterable[Setpoint]],
+        mode: Optional[Mode] = None,
+        hold_last: bool = False,
+    ) -> None:
+        """Start executing a trajectory, preempting the running one.
+
+        Parameters
+        ----------
+
+        trajectory: Union[Sequence[Waypoint], Iterable[Setpoint]]
+            Timed waypoints or setpoints streamed one per tick.
+        mode: Optional[Mode]
+            Operation mode, ``walk`` for velocities and ``stand`` for poses
+            by default.
+        hold_last: bool
+            Keep the last setpoint at the end instead of a zero command.
+        """
+        with self._lock:
+            self._stop_thread(TrajectoryStatus.PREEMPTED)
+
+            self._stop = threading.Event()
+            self._done = threading.Event()
+            self.status = TrajectoryStatus.RUNNING
+            self.skipped_ticks = 0
+            self.max_lateness = 0.0
+            self._thread = threading.Thread(
+                target=self._execute_thread_func,
+                args=(self._stop, self._done, trajectory, mode, hold_last),
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+    def abort(self) -> None:
+        """Stop the running trajectory and send a zero command."""
+        with self._lock:
+            if self._stop_thread(TrajectoryStatus.ABORTED):
+                self._send_zero()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the trajectory to end, False on timeout."""
+        return self._done.wait(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self.status == TrajectoryStatus.RUNNING
+
+    def _stop_thread(self, status: TrajectoryStatus) -> bool:
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return False
+
+        # The thread reports the status itself before ``wait`` returns.
+        self._stop_status = status
+        self._stop.set()
+        thread.join()
+        return True
+
+    ###########################################
+    # Execution
+    def _ticks(self, trajectory) -> Iterator[Tuple[Setpoint, float]]:
+        """The setpoint of every tick and its time from the start."""
+        if _is_timed(trajectory):
+            end = trajectory[-1].time
+            tick = 0
+            while True:
+                t = tick * self.period
+                yield sample(trajectory, min(t, end)), t
+                if t >= end:
+                    return
+                tick += 1
+        else:
+            for tick, setpoint in enumerate(trajectory):
+                yield setpoint, tick * self.period
+
+    def _switch_mode(self, setpoint: Setpoint, mode: Optional[Mode], event):
+        if mode is None:
+            mode = Mode.walk if isinstance(setpoint, Velocity) else Mode.stand
+        if mode == self._mode:
+            return
+
+        self._go1_mqttc.switch_mode(mode)
+        self._mode = mode
+        event.wait(self.settle_time)
+
+    def _send(self, setpoint: Setpoint) -> None:
+        if isinstance(setpoint, Velocity):
+            self._go1_mqttc.send_cmd_vel(setpoint)
+        else:
+            self._go1_mqttc.send_cmd_pose(setpoint)
+        self._last = setpoint
+
+    def _send_zero(self) -> None:
+        if self._last is not None:
+            self._send(self._last._make(0.0 for _ in self._last))
+
+    def _execute_thread_func(
+        self, event, done, trajectory, mode, hold_last
+    ) -> None:
+        try:
+            ticks = self._ticks(trajectory)
+            first = next(ticks, None)
+            if first is not None:
+                self._switch_mode(first[0], mode, event)
+                # The clock starts after the mode switch settled.
+                start = time.monotonic()
+                for setpoint, t in itertools.chain([first], ticks):
+                    remaining = start + t - time.monotonic()
+                    if remaining > 0.0 and event.wait(remaining):
+                        break
+                    if event.is_set():
+                        break
+
+                    lateness = time.monotonic() - start - t
+                    if lateness < self.period:
+                        self._send(setpoint)
+                        self.max_lateness = max(self.max_lateness, lateness)
+                    else:
+                        self.skipped_ticks += 1
+
+            if event.is_set():
+                self.status = self._stop_status
+            else:
+                if not hold_last:
+                    self._send_zero()
+                self.status = TrajectoryStatus.SUCCEEDED
+        except Exception as e:
+            print(f"[Trajectory] Execution error: {e}")
+            self._send_zero()
+            self.status = TrajectoryStatus.FAILED
+        finally:
+            done.set()
+
+
+def _is_timed(trajectory) -> bool:
+    return (
+        isinstance(trajectory, Sequence)
+        and len(trajectory) > 0
+        and isinstance(trajectory[0], Waypoint)
+    )
@@ -0,0 +1,263 @@
+import itertools
+import queue
+import socket
+from typing import NamedTuple, Optional, Tuple
+
+import paho.mqtt.client as mqtt_client
+
+TRANSPORTS = ("network", "socketpair", "loopback")
+_RECV_TIMEOUT = 2.0
+# Datagrams buffered per direction, like a socket buffer.
+_LOOPBACK_QUEUE_SIZE = 1024
+
+
+class LoopbackChannel(object):
+    """One end of an in-process datagram channel."""
+
+    def __init__(
+        self, inbox: queue.Queue, outbox: queue.Queue, timeout: float
+    ) -> None:
+        self._inbox = inbox
+        self._outbox = outbox
+        self._timeout = timeout
+        self._closed = False
+
+    def settimeout(self, timeout: float) -> None:
+        self._timeout = timeout
+
+    def send(self, data) -> int:
+        if self._closed:
+            raise OSError("Channel closed.")
+        try:
+            self._outbox.put_nowait(bytes(data))
+        except queue.Full:
+            # Datagrams are dropped when the receiver does not keep up.
+            pass
+        return len(data)
+
+    def recv(self, bufsize: int) -> bytes:
+        if self._closed:
+            raise OSError("Channel closed.")
+        try:
+            data = self._inbox.get(timeout=self._timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+        if data is None:
+            raise OSError("Channel closed.")
+        return data[:bufsize]
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            # Wake up a blocked recv.
+            self._inbox.put(None)
+
+
+def loopback_pair(
+    timeout: float = _RECV_TIMEOUT,
+) -> Tuple[LoopbackChannel, LoopbackChannel]:
+    """Two connected in-process datagram channel ends."""
+    forward = queue.Queue(maxsize=_LOOPBACK_QUEUE_SIZE)
+    backward = queue.Queue(maxsize=_LOOPBACK_QUEUE_SIZE)
+    return (
+        LoopbackChannel(backward, forward, timeout),
+        LoopbackChannel(forward, backward, timeout),
+    )
+
+
+def udp_socket_pair(
+    timeout: float = _RECV_TIMEOUT,
+) -> Tuple[socket.socket, socket.socket]:
+    """Two UDP sockets on localhost connected to each other."""
+    ends = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(2)]
+    for end in ends:
+        end.bind(("127.0.0.1", 0))
+        end.settimeout(timeout)
+    ends[0].connect(ends[1].getsockname())
+    ends[1].connect(ends[0].getsockname())
+    return ends[0], ends[1]
+
+
+class LoopbackMessage(NamedTuple):
+    topic: str
+    payload: bytes
+
+
+class _MessageInfo(NamedTuple):
+    mid: int
+    rc: int
+
+
+class LoopbackMqttClient(object):
+    """In-process stand-in for the paho client used by ``Go1Mqtt``.
+
+    Published messages go to the robot side and are acknowledged right
+    away, messages published by the robot side reach ``on_message``.
+    """
+
+    def __init__(self, robot: "RobotEndpoint") -> None:
+        self._robot = robot
+        self._mids = itertools.count(1)
+        self._connected = False
+        self.subscriptions = []
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self.on_publish = None
+
+    def reconnect_delay_set(self, min_delay: float, max_delay: float):
+        pass
+
+    def connect_async(self, host: str, port: int, keepalive: int) -> None:
+        pass
+
+    def loop_start(self) -> None:
+        self._connected = True
+        self._robot._clients.append(self)
+        if self.on_connect is not None:
+            self.on_connect(self, None, {}, 0, None)
+
+    def loop_stop(self) -> None:
+        pass
+
+    def disconnect(self) -> None:
+        if not self._connected:
+            return
+        self._connected = False
+        self._robot._clients.remove(self)
+        if self.on_disconnect is not None:
+            self.on_disconnect(self, None, {}, 0, None)
+
+    def subscribe(self, topic: str, qos: int = 0) -> None:
+        self.subscriptions.append(topic)
+
+    def publish(self, topic: str, payload=None, qos: int = 0) -> _MessageInfo:
+        mid = next(self._mids)
+        if not self._connected:
+            return _MessageInfo(mid, mqtt_client.MQTT_ERR_NO_CONN)
+
+        self._robot._put_message(LoopbackMessage(topic, bytes(payload)))
+        if self.on_publish is not None:
+            self.on_publish(self, None, mid, 0, None)
+        return _MessageInfo(mid, mqtt_client.MQTT_ERR_SUCCESS)
+
+
+class RobotEndpoint(object):
+    """The robot side of a local transport."""
+
+    def __init__(self, state_channel) -> None:
+        self.state_channel = state_channel
+        self._messages = queue.Queue(maxsize=_LOOPBACK_QUEUE_SIZE)
+        self._clients = []
+        self.received_messages = 0
+
+    def send_state(self, frame) -> None:
+        """Send a HighState frame to the client."""
+        self.state_channel.send(frame)
+
+    def recv_command(self, bufsize: int = 2048) -> bytes:
+        """Next HighCmd datagram, raises ``socket.timeout``."""
+        return self.state_channel.recv(bufsize)
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """Publish an MQTT message to the clients, e.g. a BMS state."""
+        for client in list(self._clients):
+            if client.on_message is not None:
+                client.on_message(
+                    client, None, LoopbackMessage(topic, payload)
+                )
+
+    def get_message(self, timeout: Optional[float] = None) -> LoopbackMessage:
+        """Next MQTT message from the client, raises ``queue.Empty``."""
+        return self._messages.get(timeout=timeout)
+
+    def _put_message(self, message: LoopbackMessage) -> None:
+        self.received_messages += 1
+        try:
+            self._messages.put_nowait(message)
+        except queue.Full:
+            # Nobody reads the messages, keep the most recent ones.
+            try:
+                self._messages.get_nowait()
+            except queue.Empty:
+                pass
+            self._messages.put_nowait(message)
+
+    def close(self) -> None:
+        self.state_channel.close()
+
+
+class NetworkTransport(object):
+    """The real robot: UDP states and paho MQTT commands."""
+
+    robot = None
+
+    def open_state_channel(self, host: str, port: int) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(_RECV_TIMEOUT)
+        try:
+            sock.connect((host, port))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def create_mqtt_client(self, client_id: str) -> mqtt_client.Client:
+        return mqtt_client.Client(
+            client_id=client_id,
+            callback_api_version=mqtt_client.CallbackAPIVersion.VERSION2,
+        )
+
+    def close(self) -> None:
+        pass
+
+
+class _LocalTransport(object):
+    def __init__(self, client_channel, robot_channel) -> None:
+        self._client_channel = client_channel
+        self.robot = RobotEndpoint(robot_channel)
+
+    def open_state_channel(self, host: str, port: int):
+        # There is a single pair, host and port are ignored.
+        return self._client_channel
+
+    def create_mqtt_client(self, client_id: str) -> LoopbackMqttClient:
+        return LoopbackMqttClient(self.robot)
+
+    def close(self) -> None:
+        self.robot.close()
+
+
+class SocketPairTransport(_LocalTransport):
+    """States over a local UDP socket pair, commands in-process."""
+
+    def __init__(self) -> None:
+        super().__init__(*udp_socket_pair())
+
+
+class LoopbackTransport(_LocalTransport):
+    """States and commands over in-process queues."""
+
+    def __init__(self) -> None:
+        super().__init__(*loopback_pair())
+
+
+def create_transport(name: str):
+    """Create a transport by name, one of ``TRANSPORTS``.
+
+    A transport opens the state channel of ``Go1UDP``, socket-like (``send``,
+    ``recv`` raising ``socket.timeout``, ``close``), and creates the
+    paho-like client of ``Go1Mqtt``. ``network`` is the real robot,
+    ``socketpair`` sends the states over a local UDP socket pair and
+    ``loopback`` over in-process queues, both keep the commands in-process
+    and expose the robot side as ``transport.robot``.
+    """
+    if name == "network":
+        return NetworkTransport()
+    if name == "socketpair":
+        return SocketPairTransport()
+    if name == "loopback":
+        return LoopbackTransport()
+    raise ValueError(
+        f"Unknown transport {name}, expected one of {TRANSPORTS}."
+    )
@@ -0,0 +1,25 @@
+"""Precompiled little-endian layouts of the fields in Go1 frames.
+
+The precompiled structs work directly on ``bytes``, ``bytearray`` or
+``memoryview`` objects with an offset, so the callers never need to slice
+the frame.
+"""
+
+import struct
+from functools import lru_cache
+from typing import Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+@lru_cache(maxsize=None)
+def get_struct(fmt: str) -> struct.Struct:
+    """Return a precompiled little-endian ``struct.Struct`` for ``fmt``.
+
+    Parameters
+    ----------
+
+    fmt: str
+        The struct format without byte order prefix, e.g. ``"3f"``.
+    """
+    return struct.Struct("<" + fmt)
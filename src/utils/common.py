@@ -1,32 +1,27 @@
 import struct
+import zlib
 
 from src.utils.modes import ModelName, RobotType
 
-
-def float_to_hex(f):
-    return (struct.unpack(">I", struct.pack(">f", f))[0]).to_bytes(4, "little")
-
-
-def hex_to_float(hex):
-    # Convert bytes to integer with little-endian order
-    int_data = int.from_bytes(hex, "little")
-
-    # Pack integer to bytes with big-endian order and unpack as float
-    return struct.unpack(">f", struct.pack(">I", int_data))[0]
+# Bit reversal of every byte value.
+_REVERSED_BITS = bytes(int(f"{x:08b}"[::-1], 2) for x in range(256))
 
 
 def gen_crc(i) -> bytes:
-    crc = 0xFFFFFFFF
-    for j in struct.unpack("<%dI" % (len(i) / 4), i):
-        for b in range(32):
-            x = (crc >> 31) & 1
-            crc <<= 1
-            crc &= 0xFFFFFFFF
-            if x ^ (1 & (j >> (31 - b))):
-                crc ^= 0x04C11DB7
-    crc = struct.pack("<I", crc)
+    """CRC32 (poly 0x04C11DB7, MSB first) of the little endian uint32 words.
 
-    return crc
+    The words are fed MSB first, which is the bit reflection of the zlib
+    CRC32 over the big endian, bit reversed bytes. zlib computes it in C
+    instead of 32 Python iterations per word.
+    """
+    if len(i) % 4:
+        raise ValueError(f"CRC input must be whole words, got {len(i)} bytes.")
+    count = len(i) // 4
+    words = struct.pack(">%dI" % count, *struct.unpack_from("<%dI" % count, i))
+    crc = zlib.crc32(words.translate(_REVERSED_BITS)) ^ 0xFFFFFFFF
+    crc = int(f"{crc:032b}"[::-1], 2)
+
+    return struct.pack("<I", crc)
 
 
 def encrypt_crc(crc_val) -> bytearray:
@@ -60,5 +55,10 @@ def decode_version(data):
     return hardware_version, software_version
 
 
+def clip(value, low, high):
+    """Clip a scalar, avoids importing NumPy just for ``np.clip``."""
+    return max(low, min(value, high))
+
+
 def sum_total_voltage(cell_voltages) -> int:
     return sum(cell_voltages) / 1000
@@ -0,0 +1,297 @@
+"""Compact, array-backed alternatives to the HighState NamedTuples.
+
+``HIGH_STATE_DTYPE`` mirrors the 1087 bytes HighState frame as a packed
+NumPy structured dtype, so a frame can be viewed in place without decoding
+every field into Python objects. ``CompactHighState`` exposes the same
+attribute names as ``HighState`` (``imu.quaternion``, ``motor_states[0].q``,
+``bms.SOC``, ``foot_position_to_body.front_right.x``, ...) on top of it.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from src.utils.codec import Buffer
+
+CARTESIAN_DTYPE = np.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4")])
+VELOCITY_DTYPE = np.dtype([("vx", "<f4"), ("vy", "<f4"), ("vz", "<f4")])
+QUATERNION_DTYPE = np.dtype(
+    [("w", "<f4"), ("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+)
+EULER_DTYPE = np.dtype([("roll", "<f4"), ("pitch", "<f4"), ("yaw", "<f4")])
+
+IMU_DTYPE = np.dtype(
+    [
+        ("quaternion", QUATERNION_DTYPE),
+        ("gyroscope", CARTESIAN_DTYPE),
+        ("accelerometer", CARTESIAN_DTYPE),
+        ("rpy", EULER_DTYPE),
+        ("temperature", "u1"),
+    ]
+)
+
+MOTOR_STATE_DTYPE = np.dtype(
+    [
+        ("mode", "u1"),
+        ("q", "<f4"),
+        ("dq", "<f4"),
+        ("ddq", "<f4"),
+        ("tau_est", "<f4"),
+        ("q_raw", "<f4"),
+        ("dq_raw", "<f4"),
+        ("ddq_raw", "<f4"),
+        ("temperature", "u1"),
+        ("reserve", "<u4", (2,)),
+    ]
+)
+
+BMS_STATE_DTYPE = np.dtype(
+    [
+        ("version_h", "u1"),
+        ("version_l", "u1"),
+        ("bms_status", "u1"),
+        ("SOC", "u1"),
+        ("current", "<i4"),
+        ("cycle", "<u2"),
+        ("BQ_NTC", "u1", (2,)),
+        ("MCU_NTC", "u1", (2,)),
+        ("cell_vol", "<u2", (10,)),
+    ]
+)
+
+FOOT_FORCE_DTYPE = np.dtype(
+    [
+        ("front_right", "<u2"),
+        ("front_left", "<u2"),
+        ("rear_right", "<u2"),
+        ("rear_left", "<u2"),
+    ]
+)
+
+FOOT_POSE_DTYPE = np.dtype(
+    [
+        ("front_right", CARTESIAN_DTYPE),
+        ("front_left", CARTESIAN_DTYPE),
+        ("rear_right", CARTESIAN_DTYPE),
+        ("rear_left", CARTESIAN_DTYPE),
+    ]
+)
+
+FOOT_SPEED_DTYPE = np.dtype(
+    [
+        ("front_right", VELOCITY_DTYPE),
+        ("front_left", VELOCITY_DTYPE),
+        ("rear_right", VELOCITY_DTYPE),
+        ("rear_left", VELOCITY_DTYPE),
+    ]
+)
+
+HIGH_STATE_DTYPE = np.dtype(
+    [
+        ("head", "<u2"),
+        ("level_flag", "u1"),
+        ("frame_reserve", "u1"),
+        ("SN", "u1", (8,)),
+        ("version", "u1", (8,)),
+        ("bandwidth", "<u2"),
+        ("imu", IMU_DTYPE),
+        ("motor_states", MOTOR_STATE_DTYPE, (20,)),
+        ("bms", BMS_STATE_DTYPE),
+        ("foot_force", FOOT_FORCE_DTYPE),
+        ("foot_force_est", FOOT_FORCE_DTYPE),
+        ("mode", "u1"),
+        ("progress", "<f4"),
+        ("gait_type", "u1"),
+        ("foot_raise_height", "<f4"),
+        ("position", CARTESIAN_DTYPE),
+        ("body_height", "<f4"),
+        ("velocity", VELOCITY_DTYPE),
+        ("yaw_speed", "<f4"),
+        ("range_obstacle", "<f4", (4,)),
+        ("foot_position_to_body", FOOT_POSE_DTYPE),
+        ("foot_speed_to_body", FOOT_SPEED_DTYPE),
+        ("wireless_remote", "u1", (40,)),
+        ("reserve", "u1", (4,)),
+        ("crc", "u1", (4,)),
+    ]
+)
+
+HIGH_STATE_SIZE = HIGH_STATE_DTYPE.itemsize
+
+
+def field_offset(path: str) -> int:
+    """Byte offset of a (dotted) field inside the HighState frame.
+
+    Parameters
+    ----------
+
+    path: str
+        The field name, e.g. ``"imu.quaternion"`` or ``"velocity"``.
+    """
+    dtype = HIGH_STATE_DTYPE
+    offset = 0
+    for name in path.split("."):
+        dtype, relative_offset = dtype.fields[name][:2]
+        offset += relative_offset
+
+    return offset
+
+
+def view_frames(data: Buffer) -> np.ndarray:
+    """View one or more concatenated HighState frames as a record array."""
+    return np.frombuffer(data, dtype=HIGH_STATE_DTYPE)
+
+
+def as_vector(record: np.void) -> np.ndarray:
+    """View a homogeneous float record (e.g. ``position``) as a vector."""
+    return record.view((np.float32, len(record.dtype.names)))
+
+
+class RecordView(object):
+    """Attribute access over a NumPy structured record.
+
+    Nested structured fields are returned as ``RecordView``, arrays of
+    records as ``RecordArrayView``, sub-arrays as NumPy arrays and scalars
+    as Python numbers.
+    """
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record: np.void) -> None:
+        self._record = record
+
+    def __getattr__(self, name: str):
+        try:
+            value = self._record[name]
+        except (KeyError, ValueError):
+            raise AttributeError(name) from None
+
+        return _wrap(value)
+
+    def __getitem__(self, idx: int):
+        return _wrap(self._record[idx])
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self._record.dtype.names)
+
+    def __len__(self) -> int:
+        return len(self._record.dtype.names)
+
+    def __repr__(self) -> str:
+        items = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self._record.dtype.names
+        )
+        return f"({items})"
+
+
+class RecordArrayView(object):
+    """Sequence access over an array of structured records."""
+
+    __slots__ = ("_records",)
+
+    def __init__(self, records: np.ndarray) -> None:
+        self._records = records
+
+    def __getitem__(self, idx: int) -> RecordView:
+        return RecordView(self._records[idx])
+
+    def __iter__(self):
+        return (RecordView(record) for record in self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        """Column access, e.g. ``motor_states.temperature``."""
+        try:
+            return self._records[name]
+        except (KeyError, ValueError):
+            raise AttributeError(name) from None
+
+
+def _wrap(value):
+    if isinstance(value, np.void):
+        return RecordView(value)
+    if isinstance(value, np.ndarray):
+        if value.dtype.names is not None:
+            return RecordArrayView(value)
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+class CompactHighState(object):
+    """HighState backed by a single preallocated frame buffer.
+
+    ``update`` copies a new frame in place, and ``snapshot`` returns an
+    immutable copy that only holds the raw 1087 bytes and the timestamp,
+    so keeping a long state history stays cheap.
+    """
+
+    __slots__ = ("_buffer", "_record", "timestamp")
+
+    def __init__(
+        self, frame: Optional[Buffer] = None, timestamp: float = 0.0
+    ) -> None:
+        self._buffer = bytearray(HIGH_STATE_SIZE)
+        self._record = None
+        self.timestamp = timestamp
+        if frame is not None:
+            self.update(frame, timestamp)
+
+    @classmethod
+    def frozen(cls, frame: bytes, timestamp: float) -> "CompactHighState":
+        """Create a read-only state sharing the given ``bytes`` frame."""
+        state = cls.__new__(cls)
+        state._buffer = frame
+        state._record = None
+        state.timestamp = timestamp
+
+        return state
+
+    @property
+    def readonly(self) -> bool:
+        return isinstance(self._buffer, bytes)
+
+    def update(self, frame: Buffer, timestamp: float) -> None:
+        """Copy ``frame`` into the state buffer in place."""
+        if self.readonly:
+            raise TypeError("Snapshot of CompactHighState is read-only.")
+        if len(frame) != HIGH_STATE_SIZE:
+            raise ValueError(
+                f"Expected HighState frame of {HIGH_STATE_SIZE} bytes, "
+                f"got {len(frame)}."
+            )
+        self._buffer[:] = frame
+        self.timestamp = timestamp
+
+    def snapshot(self) -> "CompactHighState":
+        """Return an immutable copy of the current state."""
+        return CompactHighState.frozen(bytes(self._buffer), self.timestamp)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._buffer)
+
+    @property
+    def record(self) -> np.void:
+        """The raw structured record viewing the frame buffer."""
+        if self._record is None:
+            self._record = view_frames(self._buffer)[0]
+
+        return self._record
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            value = self.record[name]
+        except (KeyError, ValueError):
+            raise AttributeError(name) from None
+
+        return _wrap(value)
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + self._buffer.__sizeof__()
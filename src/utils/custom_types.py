@@ -1,4 +1,7 @@
-from typing import NamedTuple, Tuple
+from typing import Callable, NamedTuple, Tuple
+
+# Called with a raw HighState frame and its receive time.
+ReceiveCallback = Callable[[bytes, float], None]
 
 
 class Velocity(NamedTuple):
@@ -115,3 +118,23 @@ class FootSpeed(NamedTuple):
     front_left: Velocity
     rear_right: Velocity
     rear_left: Velocity
+
+
+class Odometry(NamedTuple):
+    """Represent an estimated pose and velocity."""
+
+    timestamp: float
+    position: Cartesian
+    velocity: Velocity  # body frame
+    orientation: Quaternion
+
+
+class RemoteState(NamedTuple):
+    """Represent the Unitree wireless remote, sticks range -1~1."""
+
+    buttons: int  # RemoteButton bits
+    lx: float
+    rx: float
+    ry: float
+    l2: float  # analog L2 trigger
+    ly: float
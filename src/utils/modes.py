@@ -1,4 +1,4 @@
-from enum import Enum, StrEnum
+from enum import Enum, IntFlag, StrEnum
 
 
 class Mode(StrEnum):
@@ -78,3 +78,24 @@ class ModelName(Enum):
     EDU = 3
     PC = 4
     XX = 5
+
+
+class RemoteButton(IntFlag):
+    """Button bits of the Unitree wireless remote."""
+
+    R1 = 1 << 0
+    L1 = 1 << 1
+    START = 1 << 2
+    SELECT = 1 << 3
+    R2 = 1 << 4
+    L2 = 1 << 5
+    F1 = 1 << 6
+    F2 = 1 << 7
+    A = 1 << 8
+    B = 1 << 9
+    X = 1 << 10
+    Y = 1 << 11
+    UP = 1 << 12
+    RIGHT = 1 << 13
+    DOWN = 1 << 14
+    LEFT = 1 << 15
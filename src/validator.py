@@ -0,0 +1,86 @@
+import threading
+from typing import Dict, Optional
+
+from src.utils.common import encrypt_crc, gen_crc
+
+HIGH_STATE_SIZE = 1087
+HIGH_STATE_HEAD = b"\xfe\xef"
+# The CRC covers the whole uint32 words before it, (1087 >> 2) - 1 words.
+_CRC_COVERED = ((HIGH_STATE_SIZE >> 2) - 1) * 4
+_CRC_OFFSET = HIGH_STATE_SIZE - 4
+
+REJECT_LENGTH = "length"
+REJECT_HEAD = "head"
+REJECT_DUPLICATE = "duplicate"
+REJECT_CRC = "crc"
+
+
+class FrameValidator(object):
+    """Check the HighState frames before they are decoded.
+
+    The checks go from the cheapest to the most expensive: length, head,
+    duplicate of the last accepted frame, then CRC. Both the plain and the
+    encrypted CRC are accepted. Rejections are counted by reason.
+    """
+
+    def __init__(self, check_crc: bool = True) -> None:
+        """Create a frame validator.
+
+        Parameters
+        ----------
+
+        check_crc: bool
+            Verify the frame CRC, the most expensive check (~25 us).
+        """
+        self.check_crc = check_crc
+        self.accepted = 0
+        self.rejected: Dict[str, int] = {
+            REJECT_LENGTH: 0,
+            REJECT_HEAD: 0,
+            REJECT_DUPLICATE: 0,
+            REJECT_CRC: 0,
+        }
+        self._lock = threading.Lock()
+        self._last = None
+
+    def validate(self, frame) -> Optional[str]:
+        """Returns None for a valid new frame, else the rejection reason."""
+        reason = self._check(frame)
+        with self._lock:
+            if reason is None:
+                self.accepted += 1
+                self._last = frame
+            else:
+                self.rejected[reason] += 1
+        return reason
+
+    def _check(self, frame) -> Optional[str]:
+        if len(frame) != HIGH_STATE_SIZE:
+            return REJECT_LENGTH
+        if frame[0:2] != HIGH_STATE_HEAD:
+            return REJECT_HEAD
+
+        last = self._last
+        if last is not None and (frame is last or frame == last):
+            return REJECT_DUPLICATE
+
+        if self.check_crc:
+            crc = gen_crc(frame[:_CRC_COVERED])
+            received = frame[_CRC_OFFSET:]
+            if received != crc and received != encrypt_crc(crc):
+                return REJECT_CRC
+
+        return None
+
+    def rejection_ratio(self) -> float:
+        with self._lock:
+            rejected = sum(self.rejected.values())
+            total = rejected + self.accepted
+        return rejected / total if total else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.accepted = 0
+            for reason in self.rejected:
+                self.rejected[reason] = 0
+            self._last = None
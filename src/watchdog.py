@@ -0,0 +1,296 @@
+import threading
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from src.connections import Go1Mqtt
+from src.utils.codec import Buffer
+from src.utils.compact_types import MOTOR_STATE_DTYPE, field_offset
+from src.utils.custom_types import Velocity
+from src.utils.modes import Mode
+
+
+class SafetyAction(IntEnum):
+    """Reactions from the least to the most drastic."""
+
+    NONE = 0
+    ZERO_VELOCITY = 1
+    STAND_DOWN = 2
+    DAMPING = 3
+
+
+class SafetyRule(NamedTuple):
+    limit: Optional[float]  # None disables the rule
+    action: SafetyAction
+
+
+class SafetyEvent(NamedTuple):
+    timestamp: float
+    rule: str
+    value: float
+    action: SafetyAction
+
+
+DEFAULT_RULES = {
+    # (unit: s) a non-zero velocity command not refreshed for that long.
+    "command_timeout": SafetyRule(1.0, SafetyAction.ZERO_VELOCITY),
+    # (unit: s) no HighState received for that long, at the nominal polling
+    # period, scaled with it (see ``scale_state_timeout``).
+    "state_timeout": SafetyRule(0.5, SafetyAction.ZERO_VELOCITY),
+    # (unit: %) battery state of charge.
+    "min_soc": SafetyRule(10.0, SafetyAction.STAND_DOWN),
+    # (unit: °C) any of the 12 leg motors.
+    "max_motor_temperature": SafetyRule(80.0, SafetyAction.STAND_DOWN),
+    # (unit: rad) absolute roll or pitch.
+    "max_tilt": SafetyRule(0.7, SafetyAction.DAMPING),
+    # (unit: m) any valid (positive) range_obstacle reading.
+    "min_obstacle_range": SafetyRule(None, SafetyAction.ZERO_VELOCITY),
+}
+FRAME_RULES = (
+    "min_soc",
+    "max_motor_temperature",
+    "max_tilt",
+    "min_obstacle_range",
+)
+
+
+class SafetyWatchdog(object):
+    """Check safety rules and stop the robot when one fails.
+
+    The frame rules (battery, motor temperature, tilt, obstacle range) are
+    gathered from the raw HighState frame and compared to their limits at
+    once with NumPy on every frame, the staleness rules are checked by a
+    timer thread since they must fire when nothing arrives. A rule triggers
+    its action when it starts failing and re-arms once it passes again.
+    """
+
+    def __init__(
+        self,
+        go1_mqttc: Go1Mqtt,
+        rules: Optional[Dict[str, SafetyRule]] = None,
+        period: float = 0.05,
+    ) -> None:
+        """Create a safety watchdog.
+
+        Parameters
+        ----------
+
+        go1_mqttc: Go1Mqtt
+            The MQTT connection to send the safety actions through.
+        rules: Optional[Dict[str, SafetyRule]]
+            Overrides of the ``DEFAULT_RULES`` by name.
+        period: float
+            (unit: s) period of the staleness checks.
+        """
+        self._go1_mqttc = go1_mqttc
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
+        unknown = set(self.rules) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown safety rules: {sorted(unknown)}")
+        self.period = period
+
+        self._lock = threading.Lock()
+        self._tripped = set()
+        self._callbacks: List[Callable[[SafetyEvent], None]] = []
+        self.events = deque(maxlen=100)
+        self.last_state_time = None
+        self._state_timeout_scale = 1.0
+
+        self._build_checks()
+
+        self._stop = threading.Event()
+        self._watchdog_thread = threading.Thread(
+            target=self._watchdog_thread_func, args=(self._stop,)
+        )
+        self._watchdog_thread.daemon = True
+        self._watchdog_thread.start()
+
+    def _build_checks(self) -> None:
+        """Byte indices and bounds of every value the frame rules check."""
+        uint8_checks = []  # (byte offset, rule, low, high)
+        float_checks = []
+
+        def add(checks, offset, name, low, high):
+            checks.append((offset, FRAME_RULES.index(name), low, high))
+
+        limit = self.rules["min_soc"].limit
+        if limit is not None:
+            add(
+                uint8_checks, field_offset("bms.SOC"), "min_soc", limit, np.inf
+            )
+
+        limit = self.rules["max_motor_temperature"].limit
+        if limit is not None:
+            first = field_offset("motor_states")
+            temperature = MOTOR_STATE_DTYPE.fields["temperature"][1]
+            for idx in range(12):
+                offset = first + idx * MOTOR_STATE_DTYPE.itemsize + temperature
+                add(
+                    uint8_checks,
+                    offset,
+                    "max_motor_temperature",
+                    -np.inf,
+                    limit,
+                )
+
+        limit = self.rules["max_tilt"].limit
+        if limit is not None:
+            for name in ("roll", "pitch"):
+                offset = field_offset(f"imu.rpy.{name}")
+                add(float_checks, offset, "max_tilt", -limit, limit)
+
+        limit = self.rules["min_obstacle_range"].limit
+        if limit is not None:
+            first = field_offset("range_obstacle")
+            for idx in range(4):
+                add(
+                    float_checks,
+                    first + idx * 4,
+                    "min_obstacle_range",
+                    limit,
+                    np.inf,
+                )
+
+        checks = uint8_checks + float_checks
+        # One gather of the uint8 values and of the 4 bytes of every float.
+        self._index = np.array(
+            [check[0] for check in uint8_checks]
+            + [check[0] + idx for check in float_checks for idx in range(4)],
+            dtype=np.intp,
+        )
+        self._gathered = np.empty(len(self._index), dtype=np.uint8)
+        split = len(uint8_checks)
+        self._gathered_uint8 = self._gathered[:split]
+        self._gathered_float = self._gathered[split:].view("<f4")
+        self._split = split
+
+        self._rule_of = np.array([check[1] for check in checks], dtype=int)
+        self._low = np.array([check[2] for check in checks])
+        self._high = np.array([check[3] for check in checks])
+        # A value must also be above the floor to fail its low limit, no
+        # obstacle reading is reported as zero.
+        self._floor = np.where(
+            self._rule_of == FRAME_RULES.index("min_obstacle_range"),
+            0.0,
+            -np.inf,
+        )
+
+        self._values = np.empty(len(checks))
+        self._failing = np.empty(len(checks), dtype=bool)
+        self._scratch = np.empty(len(checks), dtype=bool)
+
+    def add_callback(self, callback: Callable[[SafetyEvent], None]) -> None:
+        """Call ``callback(event)`` before a safety action is taken."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[SafetyEvent], None]):
+        self._callbacks.remove(callback)
+
+    def scale_state_timeout(self, scale: float) -> None:
+        """Scale ``state_timeout`` with the HighState polling period.
+
+        The robot replies once per keep-alive, a slower polling stretches
+        the normal gaps between states by the same factor.
+        """
+        self._state_timeout_scale = scale
+
+    @property
+    def tripped(self) -> List[str]:
+        """The rules currently failing."""
+        with self._lock:
+            return sorted(self._tripped)
+
+    ###########################################
+    # Checks
+    def on_state(self, frame: Buffer, timestamp: float) -> None:
+        """Check the frame rules, a ``Go1UDP`` receive callback."""
+        self.last_state_time = timestamp
+        if not len(self._values):
+            return
+
+        data = np.frombuffer(frame, dtype=np.uint8)
+        np.take(data, self._index, out=self._gathered)
+        values = self._values
+        values[: self._split] = self._gathered_uint8
+        values[self._split :] = self._gathered_float
+
+        failing = self._failing
+        scratch = self._scratch
+        np.less(values, self._low, out=failing)
+        np.greater(values, self._floor, out=scratch)
+        failing &= scratch
+        np.greater(values, self._high, out=scratch)
+        failing |= scratch
+
+        if not np.count_nonzero(failing):
+            if self._tripped.isdisjoint(FRAME_RULES):
+                return
+            failed_rules = ()
+        else:
+            failed_rules = set(self._rule_of[failing])
+
+        for idx, name in enumerate(FRAME_RULES):
+            if idx in failed_rules:
+                rule_values = values[failing & (self._rule_of == idx)]
+                worst = rule_values[np.argmax(np.abs(rule_values))]
+                self._update(name, True, float(worst), timestamp)
+            else:
+                self._update(name, False, 0.0, timestamp)
+
+    def _check_staleness(self, now: float) -> None:
+        limit = self.rules["state_timeout"].limit
+        if limit is not None and self.last_state_time is not None:
+            limit *= self._state_timeout_scale
+            age = now - self.last_state_time
+            self._update("state_timeout", age > limit, age, now)
+
+        limit = self.rules["command_timeout"].limit
+        cmd_time = self._go1_mqttc.last_cmd_vel_time
+        if limit is not None and cmd_time is not None:
+            age = now - cmd_time
+            moving = any(self._go1_mqttc.last_cmd_vel)
+            self._update("command_timeout", moving and age > limit, age, now)
+
+    def _update(
+        self, name: str, failing: bool, value: float, timestamp: float
+    ) -> None:
+        with self._lock:
+            if not failing:
+                self._tripped.discard(name)
+                return
+            if name in self._tripped:
+                return
+            self._tripped.add(name)
+
+        event = SafetyEvent(timestamp, name, value, self.rules[name].action)
+        self.events.append(event)
+        print(
+            f"[Watchdog] {name} failed ({value:.2f}), "
+            f"{event.action.name.lower()}."
+        )
+        for callback in self._callbacks:
+            callback(event)
+        self._execute(event.action)
+
+    def _execute(self, action: SafetyAction) -> None:
+        if action >= SafetyAction.ZERO_VELOCITY:
+            self._go1_mqttc.send_cmd_vel(Velocity(0.0, 0.0, 0.0))
+        if action == SafetyAction.STAND_DOWN:
+            self._go1_mqttc.switch_mode(Mode.stand_down)
+        elif action == SafetyAction.DAMPING:
+            self._go1_mqttc.switch_mode(Mode.damping)
+
+    def _watchdog_thread_func(self, event) -> None:
+        while not event.wait(self.period):
+            try:
+                self._check_staleness(time.monotonic())
+            except Exception as e:
+                print(f"[Watchdog] Error: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        self._watchdog_thread.join()
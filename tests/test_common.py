@@ -0,0 +1,40 @@
+import random
+import struct
+
+import pytest
+
+from src.utils.common import gen_crc
+
+
+def bit_loop_crc(data: bytes) -> bytes:
+    """The original per-bit implementation of ``gen_crc``."""
+    crc = 0xFFFFFFFF
+    for word in struct.unpack("<%dI" % (len(data) // 4), data):
+        for b in range(32):
+            x = (crc >> 31) & 1
+            crc <<= 1
+            crc &= 0xFFFFFFFF
+            if x ^ (1 & (word >> (31 - b))):
+                crc ^= 0x04C11DB7
+    return struct.pack("<I", crc)
+
+
+@pytest.mark.parametrize("words", [0, 1, 2, 32, 270, 1000])
+def test_gen_crc_matches_bit_loop(words):
+    rng = random.Random(words)
+    for _ in range(5):
+        data = bytes(rng.getrandbits(8) for _ in range(4 * words))
+        assert gen_crc(data) == bit_loop_crc(data)
+
+
+def test_gen_crc_accepts_buffers():
+    data = bytes(range(256)) * 4
+    expected = bit_loop_crc(data)
+    assert gen_crc(bytearray(data)) == expected
+    assert gen_crc(memoryview(data)) == expected
+
+
+@pytest.mark.parametrize("size", [1, 3, 5, 1082])
+def test_gen_crc_rejects_partial_words(size):
+    with pytest.raises(ValueError):
+        gen_crc(bytes(size))
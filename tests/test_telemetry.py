@@ -0,0 +1,211 @@
+import math
+import random
+import struct
+import time
+
+import pytest
+
+from src.telemetry import (TelemetryForwarder, TelemetryReceiver, decode_batch,
+                           encode_batch)
+from src.utils.common import gen_crc
+from src.utils.compact_types import (HIGH_STATE_SIZE, MOTOR_STATE_DTYPE,
+                                     field_offset)
+
+# 500 Hz states sent at 20 Hz, the defaults of the config.
+FRAMES_PER_DATAGRAM = 25
+
+
+def walking_frames(count: int, rate: float = 500.0, seed: int = 0):
+    """HighState frames of a trotting robot with noisy sensors."""
+    rng = random.Random(seed)
+    frame = bytearray(HIGH_STATE_SIZE)
+    frame[0:2] = bytes.fromhex("FEEF")
+    frame[field_offset("bms.SOC")] = 80
+    first = field_offset("motor_states")
+    q = MOTOR_STATE_DTYPE.fields["q"][1]
+
+    frames = []
+    for idx in range(count):
+        t = idx / rate
+        struct.pack_into(
+            "<4f",
+            frame,
+            field_offset("imu.quaternion"),
+            math.cos(0.05 * t),
+            0.0,
+            0.0,
+            math.sin(0.05 * t),
+        )
+        struct.pack_into(
+            "<6f",
+            frame,
+            field_offset("imu.gyroscope"),
+            *[rng.gauss(0.0, 0.01) for _ in range(3)],
+            rng.gauss(0.0, 0.05),
+            rng.gauss(0.0, 0.05),
+            9.8 + rng.gauss(0.0, 0.05),
+        )
+        for motor in range(12):
+            phase = 4.0 * math.pi * t + motor
+            struct.pack_into(
+                "<2f",
+                frame,
+                first + motor * MOTOR_STATE_DTYPE.itemsize + q,
+                0.8 * math.sin(phase),
+                10.0 * math.cos(phase) + rng.gauss(0.0, 0.5),
+            )
+        struct.pack_into(
+            "<4H",
+            frame,
+            field_offset("foot_force"),
+            *[
+                max(0, int(100 * math.sin(4.0 * math.pi * t + foot * math.pi)))
+                for foot in range(4)
+            ],
+        )
+        frame[1083:1087] = gen_crc(frame[:1080])
+        frames.append(bytes(frame))
+    return frames
+
+
+def batches(frames, size=FRAMES_PER_DATAGRAM):
+    for idx in range(0, len(frames), size):
+        batch = frames[idx : idx + size]
+        yield batch, [idx / 500.0 + k * 0.002 for k in range(len(batch))]
+
+
+def encode_stream(frames, keyframe_interval=4, first_seq=0):
+    """The datagrams of a forwarder, with the same keyframe policy."""
+    datagrams = []
+    previous = None
+    for idx, (batch, timestamps) in enumerate(batches(frames)):
+        seq = (first_seq + idx) & 0xFFFFFFFF
+        if idx % keyframe_interval == 0:
+            previous = None
+        datagrams.append(encode_batch(seq, batch, timestamps, previous))
+        previous = batch[-1]
+    return datagrams
+
+
+@pytest.fixture
+def receiver():
+    receiver = TelemetryReceiver(0, host="127.0.0.1")
+    received = []
+    receiver.add_receive_callback(lambda frame, ts: received.append(frame))
+    yield receiver, received
+    receiver.close()
+
+
+def test_keyframe_round_trip():
+    frames = walking_frames(FRAMES_PER_DATAGRAM)
+    timestamps = [idx * 0.002 for idx in range(len(frames))]
+    datagram = encode_batch(7, frames, timestamps, None)
+
+    # A keyframe decodes without the previous frame.
+    seq, keyframe, decoded = decode_batch(datagram, b"ignored")
+    assert (seq, keyframe) == (7, True)
+    assert [frame for _, frame in decoded] == frames
+    assert [stamp for stamp, _ in decoded] == timestamps
+
+
+def test_delta_round_trip():
+    frames = walking_frames(10 * FRAMES_PER_DATAGRAM)
+    previous = None
+    decoded = []
+    for datagram in encode_stream(frames):
+        _, _, batch = decode_batch(datagram, previous)
+        decoded += [frame for _, frame in batch]
+        previous = decoded[-1]
+    assert decoded == frames
+
+
+def test_delta_without_previous_is_rejected():
+    frames = walking_frames(2 * FRAMES_PER_DATAGRAM)
+    datagram = encode_stream(frames)[1]
+    with pytest.raises(ValueError):
+        decode_batch(datagram, None)
+
+
+def test_random_frames_round_trip():
+    rng = random.Random(1)
+    frames = [
+        bytes(rng.getrandbits(8) for _ in range(HIGH_STATE_SIZE))
+        for _ in range(2 * FRAMES_PER_DATAGRAM)
+    ]
+    decoded = []
+    previous = None
+    for datagram in encode_stream(frames):
+        _, _, batch = decode_batch(datagram, previous)
+        decoded += [frame for _, frame in batch]
+        previous = decoded[-1]
+    assert decoded == frames
+
+
+def test_lost_datagram_resyncs_on_keyframe(receiver):
+    receiver, received = receiver
+    frames = walking_frames(8 * FRAMES_PER_DATAGRAM)
+    datagrams = encode_stream(frames, keyframe_interval=4)
+
+    # Datagram 1 is lost, 2 and 3 are deltas and wait for keyframe 4.
+    for idx, datagram in enumerate(datagrams):
+        if idx != 1:
+            receiver.handle(datagram)
+
+    kept = frames[:FRAMES_PER_DATAGRAM] + frames[4 * FRAMES_PER_DATAGRAM :]
+    assert received == kept
+    assert receiver.lost_datagrams == 1
+    assert receiver.dropped_datagrams == 2
+    assert receiver.latest_frame == frames[-1]
+
+
+def test_sequence_wrap(receiver):
+    receiver, received = receiver
+    frames = walking_frames(6 * FRAMES_PER_DATAGRAM)
+    datagrams = encode_stream(frames, first_seq=0xFFFFFFFD)
+
+    for datagram in datagrams:
+        receiver.handle(datagram)
+    assert received == frames
+    assert receiver.lost_datagrams == 0
+
+
+def test_loss_across_sequence_wrap(receiver):
+    receiver, received = receiver
+    frames = walking_frames(6 * FRAMES_PER_DATAGRAM)
+    # Sequences 0xFFFFFFFE, 0xFFFFFFFF, 0, 1, 2 and 3, every other one is a
+    # keyframe. The lost keyframe 0 also drops delta 1.
+    datagrams = encode_stream(frames, keyframe_interval=2, first_seq=-2)
+
+    for idx, datagram in enumerate(datagrams):
+        if idx != 2:
+            receiver.handle(datagram)
+    assert receiver.lost_datagrams == 1
+    assert receiver.dropped_datagrams == 1
+    assert received == (
+        frames[: 2 * FRAMES_PER_DATAGRAM] + frames[4 * FRAMES_PER_DATAGRAM :]
+    )
+
+
+def test_forwarder_to_receiver(receiver):
+    receiver, received = receiver
+    port = receiver._sock.getsockname()[1]
+    frames = walking_frames(10 * FRAMES_PER_DATAGRAM)
+    # A slow rate, the datagrams are only sent by flush.
+    forwarder = TelemetryForwarder(
+        "127.0.0.1", port, rate=0.1, keyframe_interval=4
+    )
+    try:
+        for batch, timestamps in batches(frames):
+            for frame, timestamp in zip(batch, timestamps):
+                forwarder.on_state(frame, timestamp)
+            forwarder.flush()
+
+        deadline = time.monotonic() + 2.0
+        while len(received) < len(frames) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        forwarder.close()
+
+    assert received == frames
+    # About 8.5x on this stream, real sensor noise compresses less.
+    assert forwarder.compression_ratio > 5.0
@@ -0,0 +1,163 @@
+import queue
+import struct
+import time
+
+import pytest
+
+from src.connections import Go1Mqtt
+from src.transport import LoopbackTransport
+from src.utils.compact_types import (HIGH_STATE_SIZE, MOTOR_STATE_DTYPE,
+                                     field_offset)
+from src.utils.modes import Mode
+from src.utils.topics import PubTopic
+from src.watchdog import SafetyAction, SafetyRule, SafetyWatchdog
+
+ZERO_STICK = struct.pack("<4f", 0.0, 0.0, 0.0, 0.0)
+# The staleness rules are tested on their own, with a controlled timer.
+NO_TIMEOUTS = {
+    "command_timeout": SafetyRule(None, SafetyAction.ZERO_VELOCITY),
+    "state_timeout": SafetyRule(None, SafetyAction.ZERO_VELOCITY),
+}
+
+
+def make_frame(
+    soc=80, temperature=40, roll=0.0, pitch=0.0, obstacle=0.0
+) -> bytes:
+    """A HighState frame, only the fields the watchdog checks are set."""
+    frame = bytearray(HIGH_STATE_SIZE)
+    frame[field_offset("bms.SOC")] = soc
+    first = field_offset("motor_states")
+    offset = MOTOR_STATE_DTYPE.fields["temperature"][1]
+    for idx in range(12):
+        frame[first + idx * MOTOR_STATE_DTYPE.itemsize + offset] = 40
+    frame[first + offset] = temperature
+    struct.pack_into("<f", frame, field_offset("imu.rpy.roll"), roll)
+    struct.pack_into("<f", frame, field_offset("imu.rpy.pitch"), pitch)
+    struct.pack_into(
+        "<4f", frame, field_offset("range_obstacle"), *[obstacle] * 4
+    )
+    return bytes(frame)
+
+
+@pytest.fixture
+def loopback():
+    transport = LoopbackTransport()
+    mqttc = Go1Mqtt("127.0.0.1", 0, 5, transport=transport)
+    assert mqttc.connected.wait(1.0)
+    watchdogs = []
+
+    def create(rules=None, period=0.05):
+        rules = {**NO_TIMEOUTS, **(rules or {})}
+        watchdog = SafetyWatchdog(mqttc, rules, period=period)
+        watchdogs.append(watchdog)
+        return watchdog
+
+    yield transport, mqttc, create
+    for watchdog in watchdogs:
+        watchdog.close()
+    mqttc.disconnect()
+    transport.close()
+
+
+def published(transport, mqttc):
+    """The ``(topic, payload)`` messages the robot received so far."""
+    assert mqttc.flush(1.0)
+    messages = []
+    while True:
+        try:
+            message = transport.robot.get_message(timeout=0.05)
+        except queue.Empty:
+            return messages
+        messages.append((message.topic, message.payload))
+
+
+def test_safe_frame_publishes_nothing(loopback):
+    transport, mqttc, create = loopback
+    watchdog = create()
+    watchdog.on_state(make_frame(), 1.0)
+
+    assert published(transport, mqttc) == []
+    assert watchdog.tripped == []
+
+
+@pytest.mark.parametrize(
+    "frame, rule, mode",
+    [
+        (make_frame(soc=5), "min_soc", Mode.stand_down),
+        (make_frame(temperature=95), "max_motor_temperature", Mode.stand_down),
+        (make_frame(roll=-1.0), "max_tilt", Mode.damping),
+        (make_frame(pitch=0.9), "max_tilt", Mode.damping),
+    ],
+)
+def test_frame_rule_publishes_action(loopback, frame, rule, mode):
+    transport, mqttc, create = loopback
+    watchdog = create()
+    watchdog.on_state(frame, 1.0)
+
+    assert published(transport, mqttc) == [
+        (PubTopic.stick, ZERO_STICK),
+        (PubTopic.action, mode.encode()),
+    ]
+    assert watchdog.tripped == [rule]
+    assert watchdog.events[-1].rule == rule
+
+
+def test_rule_triggers_once_and_rearms(loopback):
+    transport, mqttc, create = loopback
+    watchdog = create()
+    expected = [
+        (PubTopic.stick, ZERO_STICK),
+        (PubTopic.action, Mode.stand_down.encode()),
+    ]
+
+    watchdog.on_state(make_frame(soc=5), 1.0)
+    watchdog.on_state(make_frame(soc=4), 1.1)
+    assert published(transport, mqttc) == expected
+
+    watchdog.on_state(make_frame(), 1.2)
+    assert watchdog.tripped == []
+    assert published(transport, mqttc) == []
+
+    watchdog.on_state(make_frame(soc=5), 1.3)
+    assert published(transport, mqttc) == expected
+
+
+def test_obstacle_rule_ignores_missing_readings(loopback):
+    transport, mqttc, create = loopback
+    rules = {"min_obstacle_range": SafetyRule(0.5, SafetyAction.ZERO_VELOCITY)}
+    watchdog = create(rules)
+
+    # No obstacle is reported as zero.
+    watchdog.on_state(make_frame(obstacle=0.0), 1.0)
+    assert published(transport, mqttc) == []
+
+    watchdog.on_state(make_frame(obstacle=0.3), 1.1)
+    assert published(transport, mqttc) == [(PubTopic.stick, ZERO_STICK)]
+    assert watchdog.events[-1].value == pytest.approx(0.3)
+
+
+def test_disabled_and_none_rules(loopback):
+    transport, mqttc, create = loopback
+    rules = {
+        "min_soc": SafetyRule(None, SafetyAction.STAND_DOWN),
+        "max_tilt": SafetyRule(0.7, SafetyAction.NONE),
+    }
+    watchdog = create(rules)
+    watchdog.on_state(make_frame(soc=5, roll=1.0), 1.0)
+
+    # The tilt is reported, but nothing is sent.
+    assert published(transport, mqttc) == []
+    assert watchdog.tripped == ["max_tilt"]
+
+
+def test_state_timeout_zeroes_velocity(loopback):
+    transport, mqttc, create = loopback
+    rules = {"state_timeout": SafetyRule(0.05, SafetyAction.ZERO_VELOCITY)}
+    watchdog = create(rules, period=0.01)
+    watchdog.on_state(make_frame(), time.monotonic())
+
+    deadline = time.monotonic() + 1.0
+    while not watchdog.tripped and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert watchdog.tripped == ["state_timeout"]
+    assert published(transport, mqttc) == [(PubTopic.stick, ZERO_STICK)]